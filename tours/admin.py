@@ -1,8 +1,10 @@
 from django.contrib import admin
-import uuid
+from django.utils import timezone
 
-from .models import RouteGeneration
+from .models import DailyStats, RouteGeneration, UpstreamRateBucket
 from .models import Poi, PoiPhoto, UserProfile, Route, RoutePoint, Review
+from .services.route_cache import bump_route_version
+from .services import route_sharing
 
 
 class PoiPhotoInline(admin.TabularInline):
@@ -12,12 +14,12 @@ class PoiPhotoInline(admin.TabularInline):
 
 @admin.register(Poi)
 class PoiAdmin(admin.ModelAdmin):
-    list_display = ("name", "type", "region", "season", "price_level", "base_cost", "avg_rating", "has_coords")
+    list_display = ("name", "type", "region", "season", "price_level", "base_cost", "avg_rating", "usage_count", "has_coords")
     list_filter = ("type", "region", "season", "price_level", "physical_level")
     search_fields = ("name", "region", "short_description")
     ordering = ("-avg_rating", "name")
     inlines = [PoiPhotoInline]
-    readonly_fields = ("created_at", "updated_at", "avg_rating")
+    readonly_fields = ("created_at", "updated_at", "avg_rating", "rating_count")
     list_select_related = False
 
     @admin.display(boolean=True, description="Координаты")
@@ -54,7 +56,7 @@ class RouteAdmin(admin.ModelAdmin):
     list_filter = ("is_shared", "days_count", "created_at")
     search_fields = ("name", "user__username")
     inlines = [RoutePointInline]
-    readonly_fields = ("created_at",)
+    readonly_fields = ("created_at", "last_viewed_at", "edited_at")
     autocomplete_fields = ("user",)
     actions = ("enable_sharing", "disable_sharing", "regenerate_share_uuid")
 
@@ -62,19 +64,33 @@ class RouteAdmin(admin.ModelAdmin):
     def short_share_uuid(self, obj: Route):
         return str(obj.share_uuid)[:8]
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # точки правятся инлайном — сбрасываем кеш и снапшот публичной страницы
+        route = form.instance
+        if route.is_shared and route.shared_at is None:
+            bump_route_version(route, shared_at=timezone.now())
+        else:
+            bump_route_version(route)
+        if route.is_shared:
+            route_sharing.publish_share_snapshot(route)
+        else:
+            route_sharing.unpublish_share_snapshot(route.share_uuid)
+
     @admin.action(description="Включить доступ по ссылке")
     def enable_sharing(self, request, queryset):
-        queryset.update(is_shared=True)
+        for r in queryset:
+            route_sharing.set_route_shared(r, True)
 
     @admin.action(description="Отключить доступ по ссылке")
     def disable_sharing(self, request, queryset):
-        queryset.update(is_shared=False)
+        for r in queryset:
+            route_sharing.set_route_shared(r, False)
 
     @admin.action(description="Перегенерировать UUID ссылки")
     def regenerate_share_uuid(self, request, queryset):
         for r in queryset:
-            r.share_uuid = uuid.uuid4()
-            r.save(update_fields=["share_uuid"])
+            route_sharing.regenerate_share_uuid(r)
 
 
 @admin.register(RoutePoint)
@@ -98,3 +114,16 @@ class RouteGenerationAdmin(admin.ModelAdmin):
     list_display = ("user", "route", "days_count", "max_budget", "created_at")
     search_fields = ("user__username", "route__name")
     readonly_fields = ("created_at",)
+
+
+@admin.register(UpstreamRateBucket)
+class UpstreamRateBucketAdmin(admin.ModelAdmin):
+    list_display = ("upstream", "tokens", "refilled_at")
+    readonly_fields = ("tokens", "refilled_at")
+
+
+@admin.register(DailyStats)
+class DailyStatsAdmin(admin.ModelAdmin):
+    list_display = ("day", "routes_created", "reviews_created", "routes_shared", "generations", "computed_at")
+    readonly_fields = ("computed_at",)
+    date_hierarchy = "day"
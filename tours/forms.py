@@ -37,11 +37,24 @@ class RouteRequestForm(forms.Form):
 class PoiFilterForm(forms.Form):
     q = forms.CharField(required=False, label="Поиск")
     type = forms.ChoiceField(required=False, choices=[("", "Все")] + list(PoiType.choices), label="Тип")
-    region = forms.CharField(required=False, label="Регион / район")
+    region = forms.CharField(
+        required=False,
+        label="Регион / район",
+        widget=forms.TextInput(attrs={"list": "poi-region-options"}),
+    )
     season = forms.ChoiceField(required=False, choices=[("", "Все")] + list(Season.choices), label="Сезон")
     price_level = forms.ChoiceField(required=False, choices=[("", "Все")] + list(PriceLevel.choices), label="Уровень цен")
     physical_level = forms.ChoiceField(required=False, choices=[("", "Все")] + list(PhysicalLevel.choices), label="Сложность")
 
+    def apply_facet_counts(self, facets: dict) -> None:
+        """Добавляет к вариантам выбора число подходящих объектов: «Музей (12)»."""
+        for name in ("type", "season", "price_level", "physical_level"):
+            counts = facets.get(name, {})
+            field = self.fields[name]
+            field.choices = [field.choices[0]] + [
+                (value, f"{label} ({counts.get(value, 0)})") for value, label in field.choices[1:]
+            ]
+
 
 class ReviewForm(forms.ModelForm):
     rating = forms.TypedChoiceField(
@@ -57,9 +70,16 @@ class ReviewForm(forms.ModelForm):
         labels = {"text": "Текст отзыва"}
 
 class RoutePointAddForm(forms.Form):
-    poi = forms.ModelChoiceField(
-        queryset=Poi.objects.all().order_by("name"),
-        label="Точка интереса"
+    # выбирается через автодополнение (poi_autocomplete), в форму приходит только id
+    poi = forms.IntegerField(widget=forms.HiddenInput)
+    poi_name = forms.CharField(
+        label="Точка интереса",
+        required=False,
+        widget=forms.TextInput(attrs={
+            "autocomplete": "off",
+            "list": "poi-autocomplete-options",
+            "placeholder": "Начните вводить название",
+        }),
     )
     day_number = forms.IntegerField(
         label="День",
@@ -70,4 +90,10 @@ class RoutePointAddForm(forms.Form):
         label="Примечание",
         required=False,
         widget=forms.Textarea(attrs={"rows": 2})
-    )
\ No newline at end of file
+    )
+
+    def clean_poi(self):
+        poi = Poi.objects.filter(pk=self.cleaned_data["poi"]).first()
+        if poi is None:
+            raise forms.ValidationError("Выберите точку из списка.")
+        return poi
@@ -0,0 +1,154 @@
+import random
+import statistics
+import time
+from contextlib import contextmanager
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Q
+
+from tours.models import PhysicalLevel, Poi, PoiType, PriceLevel, Season
+from tours.services.poi_search import filter_region, search_pois
+
+PAGE_SIZE = 12
+
+REGIONS = [
+    "Тува, Кызыл", "Тува, Чедер", "Тува, Тоджа", "Тува, Эрзин", "Тува, Монгун-Тайга",
+    "Тува, Каа-Хем", "Тува, Улуг-Хем", "Тува, Бай-Тайга", "Тува, Тес-Хем", "Тува, Пий-Хем",
+]
+NAME_HEADS = [
+    "Озеро", "Перевал", "Водопад", "Музей", "Долина", "Гора", "Курган", "Аржаан",
+    "Урочище", "Храм", "Стоянка", "Пещера", "Ущелье", "Источник", "Гостевой дом",
+]
+NAME_SYLLABLES = ["ка", "ра", "хем", "тай", "га", "чы", "даг", "ол", "шу", "ан", "тос", "бел", "ки", "ыш"]
+DESC_WORDS = [
+    "шаманская", "святыня", "минеральное", "горное", "живописное", "древнее", "каменное",
+    "изваяние", "тропа", "вид", "озеро", "степь", "тайга", "юрта", "кочевники", "петроглифы",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет задержку поиска каталога (poi_list): старый icontains "
+        "против триграммного поиска. Печатает p50/p95/max в мс."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--synthetic", type=int, default=0,
+            help="Сгенерировать N синтетических POI на время замера (откатываются в конце).",
+        )
+        parser.add_argument("--queries", type=int, default=200, help="Сколько поисковых запросов прогнать.")
+        parser.add_argument("--typo-rate", type=float, default=0.3, help="Доля запросов с опечаткой.")
+        parser.add_argument("--seed", type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+
+        with transaction.atomic():
+            if options["synthetic"]:
+                self._generate(options["synthetic"], rng)
+
+            names = list(Poi.objects.values_list("name", flat=True)[:5000])
+            if not names:
+                self.stdout.write(self.style.ERROR("Каталог пуст: добавьте POI или запустите с --synthetic N."))
+                return
+
+            queries = [self._query(rng.choice(names), rng, options["typo_rate"]) for _ in range(options["queries"])]
+
+            self.stdout.write(f"База: {connection.vendor}, POI: {Poi.objects.count()}, запросов: {len(queries)}")
+            with self._without_trigram_indexes():
+                self._report("до (icontains)", [self._time(self._legacy, q) for q in queries])
+            self._report("после (search_pois)", [self._time(self._trigram, q) for q in queries])
+
+            # синтетика нужна только на время замера
+            transaction.set_rollback(True)
+
+    @staticmethod
+    @contextmanager
+    def _without_trigram_indexes():
+        """
+        На PostgreSQL icontains компилируется в UPPER(col::text) LIKE, который
+        тоже обслуживают триграммные GIN-индексы. GIN читается только bitmap-
+        сканом — без него замер «до» идёт без индексов, как до миграций.
+        """
+        if connection.vendor != "postgresql":
+            yield
+            return
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_bitmapscan = off")
+        try:
+            yield
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_bitmapscan = on")
+
+    # --- запросы ---
+
+    @staticmethod
+    def _legacy(q: str, region: str):
+        qs = Poi.objects.filter(Q(name__icontains=q) | Q(short_description__icontains=q))
+        if region:
+            qs = qs.filter(region__icontains=region)
+        return qs.order_by("-avg_rating", "base_cost", "name")
+
+    @staticmethod
+    def _trigram(q: str, region: str):
+        qs = filter_region(search_pois(Poi.objects.all(), q), region)
+        return qs.order_by("-search_rank", "-avg_rating", "base_cost", "name")
+
+    @staticmethod
+    def _time(search, query: tuple[str, str]) -> float:
+        start = time.perf_counter()
+        qs = search(*query)
+        # то же, что делает страница: count для пагинатора и первая страница
+        qs.count()
+        list(qs[:PAGE_SIZE])
+        return (time.perf_counter() - start) * 1000.0
+
+    def _report(self, label: str, samples: list[float]) -> None:
+        samples = sorted(samples)
+        p95 = samples[min(len(samples) - 1, int(round(len(samples) * 0.95)) - 1)]
+        self.stdout.write(
+            f"{label:18} p50={statistics.median(samples):.2f} мс  p95={p95:.2f} мс  max={samples[-1]:.2f} мс"
+        )
+
+    # --- синтетический каталог ---
+
+    @staticmethod
+    def _query(name: str, rng: random.Random, typo_rate: float) -> tuple[str, str]:
+        word = max(name.split(), key=len)
+        size = min(len(word), rng.randint(4, 8))
+        start = rng.randint(0, len(word) - size)
+        q = word[start:start + size]
+
+        if len(q) > 4 and rng.random() < typo_rate:
+            i = rng.randrange(1, len(q) - 1)
+            q = q[:i] + q[i + 1] + q[i] + q[i + 2:]
+
+        region = rng.choice(REGIONS).split(", ")[1][:4] if rng.random() < 0.2 else ""
+        return q, region
+
+    def _generate(self, count: int, rng: random.Random) -> None:
+        def word():
+            return "".join(rng.choice(NAME_SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+
+        batch = []
+        for i in range(count):
+            batch.append(Poi(
+                name=f"{rng.choice(NAME_HEADS)} {word()} {i}",
+                short_description=" ".join(rng.choice(DESC_WORDS) for _ in range(rng.randint(5, 12))),
+                type=rng.choice(PoiType.values),
+                region=rng.choice(REGIONS),
+                season=rng.choice(Season.values),
+                physical_level=rng.choice(PhysicalLevel.values),
+                price_level=rng.choice(PriceLevel.values),
+                base_cost=rng.choice([None, 0, 300, 500, 1000, 2500]),
+                avg_rating=rng.choice([None, 3.5, 4.0, 4.5, 5.0]),
+            ))
+            if len(batch) == 1000:
+                Poi.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            Poi.objects.bulk_create(batch)
+        self.stdout.write(f"Сгенерировано синтетических POI: {count}")
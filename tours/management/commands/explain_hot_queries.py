@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from tours.services.query_advisor import HOT_QUERIES, TIMED_CALLS, explain_hot_queries
+
+
+class Command(BaseCommand):
+    help = (
+        "Прогоняет EXPLAIN (ANALYZE на PostgreSQL) по горячим запросам сервисов "
+        "на текущей БД: какие индексы выбраны, где seq scan, сколько заняло."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--only", nargs="+", choices=sorted([*HOT_QUERIES, *TIMED_CALLS]),
+            help="Только перечисленные запросы.",
+        )
+        parser.add_argument("--no-analyze", action="store_true", help="EXPLAIN без выполнения запроса.")
+        parser.add_argument("--plans", action="store_true", help="Печатать планы целиком.")
+
+    def handle(self, *args, **options):
+        reports = explain_hot_queries(analyze=not options["no_analyze"], only=options["only"])
+        if not reports:
+            self.stdout.write(self.style.ERROR("Нет данных для примеров: нужны хотя бы один пользователь и POI."))
+            return
+
+        self.stdout.write(f"База: {connection.vendor}")
+        for r in reports:
+            if r.error:
+                self.stdout.write(self.style.ERROR(f"{r.name:24} ошибка: {r.error}"))
+                continue
+
+            timing = f"{r.sql_ms:8.2f} мс"
+            if r.db_ms is not None:
+                timing += f" (в БД {r.db_ms:.2f} мс)"
+            line = f"{r.name:24} строк={r.rows:<5} {timing}"
+            if r.seq_scans:
+                self.stdout.write(self.style.WARNING(f"{line}  seq scan: {', '.join(r.seq_scans)}"))
+            else:
+                self.stdout.write(line)
+            if r.scans:
+                self.stdout.write(f"{'':24} {'; '.join(r.scans)}")
+            if options["plans"] and r.plan:
+                self.stdout.write(r.plan)
+                self.stdout.write("")
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from tours.services.route_retention import purge_abandoned_routes
+
+
+class Command(BaseCommand):
+    help = (
+        "Удаляет брошенные сгенерированные маршруты: автоназвание, без правок и "
+        "доступа по ссылке, давно не открывались. Пачками, в коротких транзакциях."
+    )
+
+    def add_arguments(self, parser):
+        days = getattr(settings, "ROUTE_PURGE_AFTER_DAYS", 90)
+        parser.add_argument("--older-than", type=int, default=days, help="Возраст маршрута, дней.")
+        parser.add_argument(
+            "--unviewed", type=int, default=days, help="Сколько дней маршрут не открывали."
+        )
+        parser.add_argument("--batch-size", type=int, default=500, help="Маршрутов в одной транзакции.")
+        parser.add_argument(
+            "--pause", type=float, default=0.2, help="Пауза между пачками, секунд (0 — без пауз)."
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Только посчитать.")
+
+    def handle(self, *args, **options):
+        def report(progress):
+            self.stdout.write(
+                f"Пачка {progress.batches}: удалено {progress.routes}/{progress.total} маршрутов, "
+                f"{progress.points} точек"
+            )
+
+        progress = purge_abandoned_routes(
+            older_than_days=max(1, options["older_than"]),
+            unviewed_days=max(1, options["unviewed"]),
+            batch_size=max(1, options["batch_size"]),
+            pause=max(0.0, options["pause"]),
+            dry_run=options["dry_run"],
+            on_batch=report,
+        )
+
+        verb = "Будет удалено" if options["dry_run"] else "Удалено"
+        self.stdout.write(
+            self.style.SUCCESS(f"{verb} маршрутов: {progress.routes}, точек: {progress.points}")
+        )
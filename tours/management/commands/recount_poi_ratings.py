@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from tours.services.poi_ratings import recount_poi_ratings
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает счётчики оценок POI (rating_sum, rating_count, "
+        "rating_1..rating_5, avg_rating) по таблице отзывов одним UPDATE."
+    )
+
+    def handle(self, *args, **options):
+        updated = recount_poi_ratings()
+        self.stdout.write(self.style.SUCCESS(f"Пересчитано POI: {updated}"))
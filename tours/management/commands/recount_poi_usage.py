@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from tours.services.poi_usage import recount_poi_usage
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает Poi.usage_count (число точек маршрутов с этим POI) одним UPDATE."
+
+    def handle(self, *args, **options):
+        updated = recount_poi_usage()
+        self.stdout.write(self.style.SUCCESS(f"Пересчитано POI: {updated}"))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from tours.services.route_logistics import logistics_pending, pending_logistics_routes, refresh_route_logistics
+
+
+class Command(BaseCommand):
+    help = (
+        "Запрашивает у провайдера логистику маршрутов, где она не посчитана или "
+        "стоит оценка по прямой (провайдер был недоступен, лимит, фон не успел). "
+        "Запускать по cron, например раз в 10 минут."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=200, help="Сколько маршрутов обработать за запуск.")
+
+    def handle(self, *args, **options):
+        routes = pending_logistics_routes().order_by("-updated_at")[: max(1, options["limit"])]
+        refreshed = still_pending = 0
+        for route in routes:
+            refresh_route_logistics(route)
+            refreshed += 1
+            still_pending += logistics_pending(route)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Обновлено маршрутов: {refreshed}, остались с оценками: {still_pending}")
+        )
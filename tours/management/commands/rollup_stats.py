@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from tours.services.stats_rollups import rollup_daily_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает суточные срезы админ-статистики (DailyStats, PoiUsageDaily) "
+        "за последние дни. Запускать по cron, например раз в 10 минут."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=3, help="Сколько последних дней пересчитать.")
+        parser.add_argument("--full", action="store_true", help="Пересчитать всю историю.")
+
+    def handle(self, *args, **options):
+        written = rollup_daily_stats(None if options["full"] else max(1, options["days"]))
+        self.stdout.write(self.style.SUCCESS(f"Записано дней: {written}"))
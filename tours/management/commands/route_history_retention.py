@@ -0,0 +1,59 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from tours.services.history_partitions import ensure_partitions, is_partitioned, retire_old_history
+
+
+class Command(BaseCommand):
+    help = (
+        "Обслуживает историю генераций: создаёт месячные секции наперёд и убирает "
+        "месяцы старше срока хранения (с архивом в .jsonl.gz). Запускать по cron, "
+        "например раз в сутки."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--keep-months",
+            type=int,
+            default=getattr(settings, "ROUTE_HISTORY_RETENTION_MONTHS", 13),
+            help="Сколько полных месяцев хранить, кроме текущего.",
+        )
+        parser.add_argument(
+            "--months-ahead", type=int, default=3, help="На сколько месяцев вперёд создавать секции."
+        )
+        parser.add_argument("--archive-dir", help="Каталог архивов (по умолчанию ROUTE_HISTORY_ARCHIVE_DIR).")
+        parser.add_argument("--no-archive", action="store_true", help="Удалять без архива.")
+        parser.add_argument("--dry-run", action="store_true", help="Только показать, что будет удалено.")
+
+    def handle(self, *args, **options):
+        dry_run = options["dry_run"]
+
+        if is_partitioned():
+            if dry_run:
+                self.stdout.write("Секции наперёд не создаются (--dry-run).")
+            else:
+                for name in ensure_partitions(max(0, options["months_ahead"])):
+                    self.stdout.write(f"Создана секция {name}")
+        else:
+            self.stdout.write("Таблица не секционирована: старые строки удаляются пачками.")
+
+        archive_dir = None
+        if not options["no_archive"]:
+            archive_dir = Path(options["archive_dir"] or settings.ROUTE_HISTORY_ARCHIVE_DIR)
+
+        retired = retire_old_history(
+            keep_months=max(1, options["keep_months"]),
+            archive_dir=archive_dir,
+            dry_run=dry_run,
+        )
+        for item in retired:
+            line = f"{item.month:%Y-%m}: {item.rows} строк"
+            if item.archive:
+                line += f" -> {item.archive}"
+            self.stdout.write(line)
+
+        verb = "Будет удалено" if dry_run else "Удалено"
+        total = sum(item.rows for item in retired)
+        self.stdout.write(self.style.SUCCESS(f"{verb} месяцев: {len(retired)}, строк: {total}"))
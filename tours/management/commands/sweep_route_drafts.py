@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from tours.services.route_drafts import sweep_route_drafts
+
+
+class Command(BaseCommand):
+    help = (
+        "Удаляет из кеша просроченные несохранённые черновики маршрутов. "
+        "Запускать по cron, например раз в час."
+    )
+
+    def handle(self, *args, **options):
+        removed = sweep_route_drafts()
+        self.stdout.write(self.style.SUCCESS(f"Удалено черновиков: {removed}"))
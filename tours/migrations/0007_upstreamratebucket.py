@@ -0,0 +1,47 @@
+# Generated by Django 6.0 on 2026-10-19 14:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tours", "0006_routegeneration"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UpstreamRateBucket",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "upstream",
+                    models.CharField(
+                        max_length=50, unique=True, verbose_name="Внешний сервис"
+                    ),
+                ),
+                (
+                    "tokens",
+                    models.FloatField(default=0.0, verbose_name="Доступно запросов"),
+                ),
+                (
+                    "refilled_at",
+                    models.FloatField(
+                        default=0.0, verbose_name="Последнее пополнение (unix)"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Лимит внешнего сервиса",
+                "verbose_name_plural": "Лимиты внешних сервисов",
+            },
+        ),
+    ]
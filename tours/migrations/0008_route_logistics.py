@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-19 14:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tours", "0007_upstreamratebucket"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="route",
+            name="logistics",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                verbose_name="Логистика по дням",
+            ),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 6.0 on 2026-10-19 14:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tours", "0008_route_logistics"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="route",
+            name="version",
+            field=models.PositiveIntegerField(
+                default=1, editable=False, verbose_name="Версия"
+            ),
+        ),
+    ]
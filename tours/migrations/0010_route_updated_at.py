@@ -0,0 +1,24 @@
+# Generated by Django 6.0 on 2026-10-19 15:10
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tours", "0009_route_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="route",
+            name="updated_at",
+            field=models.DateTimeField(
+                auto_now=True,
+                default=django.utils.timezone.now,
+                verbose_name="Обновлено",
+            ),
+            preserve_default=False,
+        ),
+    ]
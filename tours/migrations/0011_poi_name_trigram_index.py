@@ -0,0 +1,43 @@
+# Generated by Django 6.0 on 2026-10-19 15:30
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+NAME_TRGM_INDEX = django.contrib.postgres.indexes.GinIndex(
+    django.contrib.postgres.indexes.OpClass(
+        django.db.models.functions.text.Upper("name"), name="gin_trgm_ops"
+    ),
+    name="poi_name_upper_trgm",
+)
+
+
+# Индекс только в БД, не в состоянии миграций и не в Poi.Meta.indexes:
+# иначе пересоздание таблицы на SQLite (AddField и т. п.) выдаёт
+# «gin_trgm_ops» в CREATE INDEX и падает. Так же сделаны 0012 и 0013.
+
+
+def add_index(apps, schema_editor):
+    # GIN + pg_trgm есть только в PostgreSQL; на других СУБД поиск без индекса
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.add_index(apps.get_model("tours", "Poi"), NAME_TRGM_INDEX)
+
+
+def remove_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.remove_index(apps.get_model("tours", "Poi"), NAME_TRGM_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tours", "0010_route_updated_at"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.RunPython(add_index, remove_index),
+    ]
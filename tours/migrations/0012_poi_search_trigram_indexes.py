@@ -0,0 +1,49 @@
+# Generated by Django 6.0 on 2026-10-19 16:05
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.db import migrations
+
+SEARCH_TRGM_INDEXES = [
+    django.contrib.postgres.indexes.GinIndex(
+        django.contrib.postgres.indexes.OpClass(
+            django.db.models.functions.text.Upper("short_description"),
+            name="gin_trgm_ops",
+        ),
+        name="poi_short_desc_upper_trgm",
+    ),
+    django.contrib.postgres.indexes.GinIndex(
+        django.contrib.postgres.indexes.OpClass(
+            django.db.models.functions.text.Upper("region"), name="gin_trgm_ops"
+        ),
+        name="poi_region_upper_trgm",
+    ),
+]
+
+
+def add_indexes(apps, schema_editor):
+    # как и в 0011: GIN + pg_trgm только на PostgreSQL
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    Poi = apps.get_model("tours", "Poi")
+    for index in SEARCH_TRGM_INDEXES:
+        schema_editor.add_index(Poi, index)
+
+
+def remove_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    Poi = apps.get_model("tours", "Poi")
+    for index in SEARCH_TRGM_INDEXES:
+        schema_editor.remove_index(Poi, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tours", "0011_poi_name_trigram_index"),
+    ]
+
+    operations = [
+        migrations.RunPython(add_indexes, remove_indexes),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 6.0 on 2026-10-19 16:40
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+
+SEARCH_VECTOR_INDEX = django.contrib.postgres.indexes.GinIndex(
+    fields=["search_vector"], name="poi_search_vector_gin"
+)
+
+
+def add_index_and_fill(apps, schema_editor):
+    # tsvector, GIN и словарь russian есть только в PostgreSQL
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    Poi = apps.get_model("tours", "Poi")
+    schema_editor.add_index(Poi, SEARCH_VECTOR_INDEX)
+    Poi.objects.update(
+        search_vector=(
+            SearchVector("name", weight="A", config="russian")
+            + SearchVector("short_description", weight="B", config="russian")
+            + SearchVector("region", weight="B", config="russian")
+            + SearchVector("detailed_description", weight="C", config="russian")
+        )
+    )
+
+
+def remove_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.remove_index(apps.get_model("tours", "Poi"), SEARCH_VECTOR_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tours", "0012_poi_search_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="poi",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True, verbose_name="Поисковый вектор"
+            ),
+        ),
+        migrations.RunPython(add_index_and_fill, remove_index),
+    ]
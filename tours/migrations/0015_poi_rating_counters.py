@@ -0,0 +1,102 @@
+# Generated by Django 6.0 on 2026-10-19 15:00
+
+from django.db import migrations, models
+from django.db.models import (
+    Count,
+    FloatField,
+    IntegerField,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Cast, Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    Poi = apps.get_model("tours", "Poi")
+    Review = apps.get_model("tours", "Review")
+
+    def per_poi(aggregate, output_field):
+        return Subquery(
+            Review.objects.filter(poi=OuterRef("pk"))
+            .order_by()
+            .values("poi")
+            .annotate(v=aggregate)
+            .values("v")[:1],
+            output_field=output_field,
+        )
+
+    fields = {
+        "rating_sum": Coalesce(per_poi(Sum("rating"), IntegerField()), Value(0)),
+        "rating_count": Coalesce(per_poi(Count("id"), IntegerField()), Value(0)),
+        "avg_rating": per_poi(
+            Cast(Sum("rating"), FloatField()) / Count("id"), FloatField()
+        ),
+    }
+    for value in range(1, 6):
+        fields[f"rating_{value}"] = Coalesce(
+            per_poi(Count("id", filter=Q(rating=value)), IntegerField()), Value(0)
+        )
+    Poi.objects.update(**fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tours", "0014_catalogversion"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="poi",
+            name="rating_1",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Оценок «1»"
+            ),
+        ),
+        migrations.AddField(
+            model_name="poi",
+            name="rating_2",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Оценок «2»"
+            ),
+        ),
+        migrations.AddField(
+            model_name="poi",
+            name="rating_3",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Оценок «3»"
+            ),
+        ),
+        migrations.AddField(
+            model_name="poi",
+            name="rating_4",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Оценок «4»"
+            ),
+        ),
+        migrations.AddField(
+            model_name="poi",
+            name="rating_5",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Оценок «5»"
+            ),
+        ),
+        migrations.AddField(
+            model_name="poi",
+            name="rating_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Число оценок"
+            ),
+        ),
+        migrations.AddField(
+            model_name="poi",
+            name="rating_sum",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Сумма оценок"
+            ),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 6.0 on 2026-10-19 15:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tours", "0015_poi_rating_counters"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="poiphoto",
+            index=models.Index(
+                fields=["poi", "-created_at", "-id"], name="poiphoto_poi_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="review",
+            index=models.Index(
+                fields=["poi", "-created_at", "-id"], name="review_poi_created_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,140 @@
+# Generated by Django 6.0 on 2026-10-19 15:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_shared_at(apps, schema_editor):
+    # точное время открытия доступа не хранилось — берём последнее изменение
+    Route = apps.get_model("tours", "Route")
+    Route.objects.filter(is_shared=True).update(shared_at=F("updated_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tours", "0016_poi_detail_page_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DailyStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField(unique=True, verbose_name="День")),
+                (
+                    "routes_created",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Новых маршрутов"
+                    ),
+                ),
+                (
+                    "reviews_created",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Новых отзывов"
+                    ),
+                ),
+                (
+                    "routes_shared",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Открыто по ссылке"
+                    ),
+                ),
+                (
+                    "generations",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Подборов маршрута"
+                    ),
+                ),
+                (
+                    "poi_total",
+                    models.PositiveIntegerField(
+                        blank=True, null=True, verbose_name="POI всего"
+                    ),
+                ),
+                (
+                    "routes_total",
+                    models.PositiveIntegerField(
+                        blank=True, null=True, verbose_name="Маршрутов всего"
+                    ),
+                ),
+                (
+                    "reviews_total",
+                    models.PositiveIntegerField(
+                        blank=True, null=True, verbose_name="Отзывов всего"
+                    ),
+                ),
+                (
+                    "shared_total",
+                    models.PositiveIntegerField(
+                        blank=True, null=True, verbose_name="Доступно по ссылке"
+                    ),
+                ),
+                (
+                    "computed_at",
+                    models.DateTimeField(auto_now=True, verbose_name="Пересчитано"),
+                ),
+            ],
+            options={
+                "verbose_name": "Статистика за день",
+                "verbose_name_plural": "Статистика по дням",
+                "ordering": ["-day"],
+            },
+        ),
+        migrations.AddField(
+            model_name="route",
+            name="shared_at",
+            field=models.DateTimeField(
+                blank=True, editable=False, null=True, verbose_name="Доступ открыт"
+            ),
+        ),
+        migrations.CreateModel(
+            name="PoiUsageDaily",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("day", models.DateField(verbose_name="День")),
+                (
+                    "points",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Добавлений в маршруты"
+                    ),
+                ),
+                (
+                    "poi",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="usage_daily",
+                        to="tours.poi",
+                        verbose_name="Объект",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Использование POI за день",
+                "verbose_name_plural": "Использование POI по дням",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("day", "poi"), name="uniq_poi_usage_day"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(fill_shared_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 6.0 on 2026-10-19 15:05
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def fill_usage_count(apps, schema_editor):
+    Poi = apps.get_model("tours", "Poi")
+    RoutePoint = apps.get_model("tours", "RoutePoint")
+    uses = (
+        RoutePoint.objects.filter(poi=OuterRef("pk"))
+        .order_by()
+        .values("poi")
+        .annotate(n=Count("id"))
+        .values("n")[:1]
+    )
+    Poi.objects.update(
+        usage_count=Coalesce(Subquery(uses, output_field=IntegerField()), Value(0))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tours", "0017_daily_stats"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="poi",
+            name="usage_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Добавлений в маршруты"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="poi",
+            index=models.Index(fields=["-usage_count"], name="poi_usage_count_idx"),
+        ),
+        migrations.RunPython(fill_usage_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 6.0 on 2026-10-19 15:06
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tours", "0018_poi_usage_count"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="poi",
+            index=models.Index(
+                fields=["season", "physical_level", "price_level", "-avg_rating"],
+                name="poi_profile_filter_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="route",
+            index=models.Index(
+                fields=["user", "-created_at"], name="route_user_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="routegeneration",
+            index=models.Index(
+                fields=["user", "-created_at", "id"], name="routegen_user_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="routepoint",
+            index=models.Index(
+                fields=["route", "day_number", "order_index", "id"],
+                name="routepoint_route_order_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,136 @@
+# Generated by Django 6.0 on 2026-10-19 17:30
+
+from datetime import date, datetime
+
+from django.conf import settings
+from django.db import migrations
+from django.utils import timezone
+
+# tours_routegeneration -> таблица, секционированная по месяцам created_at.
+# Первичный ключ секционированной таблицы обязан содержать ключ секции,
+# поэтому в БД он (id, created_at); для Django первичным ключом остаётся id
+# (значения по-прежнему уникальны — их выдаёт одна последовательность).
+# Только PostgreSQL: на остальных БД миграция ничего не делает.
+
+TABLE = "tours_routegeneration"
+PLAIN = "tours_routegeneration_plain"
+SEQUENCE = "tours_routegeneration_id_seq"
+MONTHS_AHEAD = 3
+
+
+def _add_months(value, months):
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _bound(value):
+    return timezone.make_aware(datetime(value.year, value.month, 1))
+
+
+def _set_aside(schema_editor):
+    """
+    Переименовывает таблицу в PLAIN вместе с объектами, имена которых нужны
+    новой таблице: переименование таблицы не трогает последовательность id,
+    индекс первичного ключа и индекс истории (0019).
+    """
+    qn = schema_editor.quote_name
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [TABLE])
+        (sequence,) = cursor.fetchone()
+
+    schema_editor.execute(f"ALTER TABLE {qn(TABLE)} RENAME TO {qn(PLAIN)}")
+    if sequence:
+        schema_editor.execute(f"ALTER SEQUENCE {sequence} RENAME TO {qn(PLAIN + '_id_seq')}")
+    schema_editor.execute(
+        f"ALTER TABLE {qn(PLAIN)} RENAME CONSTRAINT {qn(TABLE + '_pkey')} TO {qn(PLAIN + '_pkey')}"
+    )
+    schema_editor.execute("ALTER INDEX routegen_user_created_idx RENAME TO routegen_user_created_idx_plain")
+
+
+def partition(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    RouteGeneration = apps.get_model("tours", "RouteGeneration")
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    Route = apps.get_model("tours", "Route")
+    connection = schema_editor.connection
+    qn = schema_editor.quote_name
+
+    def column(name):
+        return RouteGeneration._meta.get_field(name).db_type(connection)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT min(created_at), max(id) FROM {qn(TABLE)}")
+        oldest, max_id = cursor.fetchone()
+
+    _set_aside(schema_editor)
+    schema_editor.execute(f"CREATE SEQUENCE {qn(SEQUENCE)}")
+    schema_editor.execute(
+        f"""
+        CREATE TABLE {qn(TABLE)} (
+            id bigint NOT NULL DEFAULT nextval('{SEQUENCE}'),
+            user_id {column("user")} NOT NULL
+                REFERENCES {qn(User._meta.db_table)} (id) DEFERRABLE INITIALLY DEFERRED,
+            route_id {column("route")} NULL
+                REFERENCES {qn(Route._meta.db_table)} (id) DEFERRABLE INITIALLY DEFERRED,
+            days_count {column("days_count")} NOT NULL CHECK (days_count >= 0),
+            max_budget {column("max_budget")} NULL CHECK (max_budget >= 0),
+            created_at {column("created_at")} NOT NULL,
+            PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+        """
+    )
+    schema_editor.execute(f"ALTER SEQUENCE {qn(SEQUENCE)} OWNED BY {qn(TABLE)}.id")
+    schema_editor.execute(f"CREATE TABLE {qn(TABLE + '_default')} PARTITION OF {qn(TABLE)} DEFAULT")
+
+    this_month = timezone.localdate().replace(day=1)
+    month = timezone.localtime(oldest).date().replace(day=1) if oldest else this_month
+    while month <= _add_months(this_month, MONTHS_AHEAD):
+        schema_editor.execute(
+            f"CREATE TABLE {qn(f'{TABLE}_p{month:%Y%m}')} PARTITION OF {qn(TABLE)} "
+            f"FOR VALUES FROM (%s) TO (%s)",
+            [_bound(month), _bound(_add_months(month, 1))],
+        )
+        month = _add_months(month, 1)
+
+    # имена индексов совпадают с состоянием миграций (0019)
+    schema_editor.execute(
+        f"CREATE INDEX routegen_user_created_idx ON {qn(TABLE)} (user_id, created_at DESC, id)"
+    )
+    schema_editor.execute(f"CREATE INDEX routegen_route_id_idx ON {qn(TABLE)} (route_id)")
+
+    columns = "id, user_id, route_id, days_count, max_budget, created_at"
+    schema_editor.execute(f"INSERT INTO {qn(TABLE)} ({columns}) SELECT {columns} FROM {qn(PLAIN)}")
+    schema_editor.execute("SELECT setval(%s, %s, false)", [SEQUENCE, (max_id or 0) + 1])
+    schema_editor.execute(f"DROP TABLE {qn(PLAIN)}")
+
+
+def unpartition(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+
+    RouteGeneration = apps.get_model("tours", "RouteGeneration")
+    qn = schema_editor.quote_name
+    columns = "id, user_id, route_id, days_count, max_budget, created_at"
+
+    _set_aside(schema_editor)
+    schema_editor.create_model(RouteGeneration)
+    schema_editor.execute(f"INSERT INTO {qn(TABLE)} ({columns}) OVERRIDING SYSTEM VALUE SELECT {columns} FROM {qn(PLAIN)}")
+    schema_editor.execute(
+        f"SELECT setval(pg_get_serial_sequence(%s, 'id'), coalesce((SELECT max(id) FROM {qn(TABLE)}), 0) + 1, false)",
+        [TABLE],
+    )
+    schema_editor.execute(f"DROP TABLE {qn(PLAIN)} CASCADE")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tours", "0019_hot_query_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(partition, unpartition),
+    ]
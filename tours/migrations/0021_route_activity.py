@@ -0,0 +1,39 @@
+# Generated by Django 6.0 on 2026-10-19 18:10
+
+from django.db import migrations, models
+from django.db.models import F
+from django.utils import timezone
+
+
+def fill_activity(apps, schema_editor):
+    # просмотры не отслеживались: отсчёт ROUTE_PURGE_AFTER_DAYS для всех
+    # существующих маршрутов начинается с развёртывания; version > 1 —
+    # маршрут меняли, считаем его правленым
+    Route = apps.get_model("tours", "Route")
+    Route.objects.update(last_viewed_at=timezone.now())
+    Route.objects.filter(version__gt=1).update(edited_at=F("updated_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tours", "0020_partition_routegeneration"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="route",
+            name="edited_at",
+            field=models.DateTimeField(
+                blank=True, editable=False, null=True, verbose_name="Изменён владельцем"
+            ),
+        ),
+        migrations.AddField(
+            model_name="route",
+            name="last_viewed_at",
+            field=models.DateTimeField(
+                blank=True, editable=False, null=True, verbose_name="Последний просмотр"
+            ),
+        ),
+        migrations.RunPython(fill_activity, migrations.RunPython.noop),
+    ]
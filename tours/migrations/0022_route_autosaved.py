@@ -0,0 +1,31 @@
+# Generated by Django 6.0 on 2026-10-19 21:30
+
+from django.db import migrations, models
+
+# Все маршруты, существующие до черновиков, записал сам подбор: колонка
+# добавляется с DEFAULT true (без перезаписи таблицы на PostgreSQL 11+),
+# новые строки дальше получают false.
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tours", "0021_route_activity"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="route",
+            name="autosaved",
+            field=models.BooleanField(
+                default=True, editable=False, verbose_name="Записан подбором автоматически"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="route",
+            name="autosaved",
+            field=models.BooleanField(
+                default=False, editable=False, verbose_name="Записан подбором автоматически"
+            ),
+        ),
+    ]
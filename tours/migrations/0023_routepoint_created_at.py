@@ -0,0 +1,45 @@
+# Generated by Django 6.0 on 2026-10-19 23:40
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def fill_created_at(apps, schema_editor):
+    # когда добавлялись старые точки, неизвестно: считаем, что вместе с маршрутом
+    Route = apps.get_model("tours", "Route")
+    RoutePoint = apps.get_model("tours", "RoutePoint")
+    RoutePoint.objects.update(
+        created_at=Subquery(Route.objects.filter(pk=OuterRef("route_id")).values("created_at")[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("tours", "0022_route_autosaved"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="routepoint",
+            name="created_at",
+            field=models.DateTimeField(null=True, verbose_name="Добавлена"),
+        ),
+        migrations.RunPython(fill_created_at, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="routepoint",
+            name="created_at",
+            field=models.DateTimeField(auto_now_add=True, verbose_name="Добавлена"),
+        ),
+        migrations.AddIndex(
+            model_name="routepoint",
+            index=models.Index(fields=["created_at"], name="routepoint_created_idx"),
+        ),
+        migrations.AlterField(
+            model_name="route",
+            name="shared_at",
+            field=models.DateTimeField(
+                blank=True, editable=False, null=True, verbose_name="Доступ впервые открыт"
+            ),
+        ),
+    ]
@@ -1,6 +1,7 @@
 import uuid
 
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
 
@@ -89,12 +90,41 @@ class Poi(models.Model):
 
     avg_rating = models.FloatField("Средний рейтинг", null=True, blank=True)
 
+    # счётчики отзывов, меняются F-выражениями при создании / правке / удалении
+    # Review (services.poi_ratings); avg_rating = rating_sum / rating_count
+    rating_sum = models.PositiveIntegerField("Сумма оценок", default=0, editable=False)
+    rating_count = models.PositiveIntegerField("Число оценок", default=0, editable=False)
+    rating_1 = models.PositiveIntegerField("Оценок «1»", default=0, editable=False)
+    rating_2 = models.PositiveIntegerField("Оценок «2»", default=0, editable=False)
+    rating_3 = models.PositiveIntegerField("Оценок «3»", default=0, editable=False)
+    rating_4 = models.PositiveIntegerField("Оценок «4»", default=0, editable=False)
+    rating_5 = models.PositiveIntegerField("Оценок «5»", default=0, editable=False)
+
+    # сколько раз POI стоит в маршрутах (services.poi_usage); точный счётчик
+    # вместо GROUP BY по RoutePoint, используется и при равенстве в ранжировании
+    usage_count = models.PositiveIntegerField("Добавлений в маршруты", default=0, editable=False)
+
+    # to_tsvector('russian', ...) по текстовым полям, обновляется после save()
+    # (см. signals.update_poi_search_vector); только для PostgreSQL
+    search_vector = SearchVectorField("Поисковый вектор", null=True, editable=False)
+
     created_at = models.DateTimeField("Создано", auto_now_add=True)
     updated_at = models.DateTimeField("Обновлено", auto_now=True)
 
     class Meta:
         verbose_name = "Объект (POI)"
         verbose_name_plural = "Объекты (POI)"
+        # GIN-индексы поиска (триграммы по UPPER(name/short_description/region)
+        # и search_vector) создаются миграциями 0011–0013 только на PostgreSQL
+        # и в состояние моделей не входят — SQLite не умеет GIN
+        indexes = [
+            models.Index(fields=["-usage_count"], name="poi_usage_count_idx"),
+            # фильтр профиля (apply_profile_preferences) и каталог по рейтингу
+            models.Index(
+                fields=["season", "physical_level", "price_level", "-avg_rating"],
+                name="poi_profile_filter_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -115,6 +145,10 @@ class PoiPhoto(models.Model):
     class Meta:
         verbose_name = "Фото объекта"
         verbose_name_plural = "Фотографии объектов"
+        indexes = [
+            # порционная выдача на странице POI: новые сверху
+            models.Index(fields=["poi", "-created_at", "-id"], name="poiphoto_poi_created_idx"),
+        ]
 
     def __str__(self):
         return f"Фото {self.poi.name}"
@@ -177,8 +211,14 @@ class Route(models.Model):
         "Ориентировочная стоимость (₽)", null=True, blank=True
     )
     equipment = models.TextField("Необходимая экипировка", blank=True)
+    logistics = models.JSONField(
+        "Логистика по дням", default=dict, blank=True, editable=False
+    )
+    # растёт при каждом изменении маршрута, входит в ключи кеша страниц
+    version = models.PositiveIntegerField("Версия", default=1, editable=False)
 
     created_at = models.DateTimeField("Создано", auto_now_add=True)
+    updated_at = models.DateTimeField("Обновлено", auto_now=True)
 
     share_uuid = models.UUIDField(
         "Токен для ссылки",
@@ -187,10 +227,25 @@ class Route(models.Model):
         editable=False,
     )
     is_shared = models.BooleanField("Доступ по ссылке", default=False)
+    # когда доступ по ссылке открыли впервые; при закрытии не сбрасывается
+    # (по нему rollup_stats считает открытия по дням)
+    shared_at = models.DateTimeField("Доступ впервые открыт", null=True, blank=True, editable=False)
+
+    # признаки «живого» маршрута для команды purge_abandoned_routes
+    # (services.route_retention): просмотр владельцем и его правки.
+    # autosaved — маршрут записал сам подбор (до черновиков); сохранённые
+    # кнопкой «Сохранить» команда не трогает
+    autosaved = models.BooleanField("Записан подбором автоматически", default=False, editable=False)
+    last_viewed_at = models.DateTimeField("Последний просмотр", null=True, blank=True, editable=False)
+    edited_at = models.DateTimeField("Изменён владельцем", null=True, blank=True, editable=False)
 
     class Meta:
         verbose_name = "Маршрут"
         verbose_name_plural = "Маршруты"
+        indexes = [
+            # «Мои маршруты»: маршруты пользователя, новые сверху
+            models.Index(fields=["user", "-created_at"], name="route_user_created_idx"),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.user.username})"
@@ -209,11 +264,18 @@ class RoutePoint(models.Model):
     visit_time_estimate = models.DecimalField(
         "Планируемое время (часы)", max_digits=4, decimal_places=1, default=2.0
     )
+    created_at = models.DateTimeField("Добавлена", auto_now_add=True)
 
     class Meta:
         verbose_name = "Точка маршрута"
         verbose_name_plural = "Точки маршрута"
         ordering = ["day_number", "order_index"]
+        indexes = [
+            # снапшот маршрута и перестановки точек внутри дня
+            models.Index(fields=["route", "day_number", "order_index", "id"], name="routepoint_route_order_idx"),
+            # rollup_stats: точки, добавленные за последние дни
+            models.Index(fields=["created_at"], name="routepoint_created_idx"),
+        ]
 
 
 class Review(models.Model):
@@ -243,6 +305,10 @@ class Review(models.Model):
         constraints = [
             models.UniqueConstraint(fields=["user", "poi"], name="uniq_review_user_poi"),
         ]
+        indexes = [
+            # порционная выдача на странице POI: новые сверху
+            models.Index(fields=["poi", "-created_at", "-id"], name="review_poi_created_idx"),
+        ]
 
     def __str__(self):
         return f"Отзыв {self.user.username} о {self.poi.name}"
@@ -269,7 +335,95 @@ class RouteGeneration(models.Model):
     class Meta:
         verbose_name = "История подбора маршрута"
         verbose_name_plural = "История подбора маршрутов"
+        # на PostgreSQL таблица секционирована по месяцам created_at (миграция 0020)
         ordering = ["-created_at"]
+        indexes = [
+            # история пользователя: keyset по (-created_at, id)
+            models.Index(fields=["user", "-created_at", "id"], name="routegen_user_created_idx"),
+        ]
 
     def __str__(self):
         return f"{self.user} — {self.days_count}д (до {self.max_budget or '—'}₽)"
+
+
+class UpstreamRateBucket(models.Model):
+    upstream = models.CharField("Внешний сервис", max_length=50, unique=True)
+    tokens = models.FloatField("Доступно запросов", default=0.0)
+    refilled_at = models.FloatField("Последнее пополнение (unix)", default=0.0)
+
+    class Meta:
+        verbose_name = "Лимит внешнего сервиса"
+        verbose_name_plural = "Лимиты внешних сервисов"
+
+    def __str__(self):
+        return f"{self.upstream}: {self.tokens:.1f}"
+
+
+class CatalogVersion(models.Model):
+    """
+    Одна строка (pk=1): растёт при любом изменении POI. По ней воркеры
+    понимают, что кеши каталога (колоночный снапшот и т.п.) устарели.
+    """
+
+    version = models.PositiveBigIntegerField("Версия каталога", default=1)
+    updated_at = models.DateTimeField("Обновлено", auto_now=True)
+
+    class Meta:
+        verbose_name = "Версия каталога"
+        verbose_name_plural = "Версия каталога"
+
+    def __str__(self):
+        return f"v{self.version}"
+
+
+class DailyStats(models.Model):
+    """
+    Суточный срез для админ-статистики, пересчитывается командой
+    rollup_stats. Счётчики — по дню создания записей (routes_shared — по дню
+    первого открытия доступа), *_total — общее
+    число на момент последнего пересчёта этого дня.
+    """
+
+    day = models.DateField("День", unique=True)
+    routes_created = models.PositiveIntegerField("Новых маршрутов", default=0)
+    reviews_created = models.PositiveIntegerField("Новых отзывов", default=0)
+    routes_shared = models.PositiveIntegerField("Открыто по ссылке", default=0)
+    generations = models.PositiveIntegerField("Подборов маршрута", default=0)
+
+    poi_total = models.PositiveIntegerField("POI всего", null=True, blank=True)
+    routes_total = models.PositiveIntegerField("Маршрутов всего", null=True, blank=True)
+    reviews_total = models.PositiveIntegerField("Отзывов всего", null=True, blank=True)
+    shared_total = models.PositiveIntegerField("Доступно по ссылке", null=True, blank=True)
+
+    computed_at = models.DateTimeField("Пересчитано", auto_now=True)
+
+    class Meta:
+        verbose_name = "Статистика за день"
+        verbose_name_plural = "Статистика по дням"
+        ordering = ["-day"]
+
+    def __str__(self):
+        return f"{self.day:%d.%m.%Y}"
+
+
+class PoiUsageDaily(models.Model):
+    """Сколько раз POI добавили в маршруты в этот день (rollup_stats)."""
+
+    day = models.DateField("День")
+    poi = models.ForeignKey(
+        Poi,
+        on_delete=models.CASCADE,
+        related_name="usage_daily",
+        verbose_name="Объект",
+    )
+    points = models.PositiveIntegerField("Добавлений в маршруты", default=0)
+
+    class Meta:
+        verbose_name = "Использование POI за день"
+        verbose_name_plural = "Использование POI по дням"
+        constraints = [
+            models.UniqueConstraint(fields=["day", "poi"], name="uniq_poi_usage_day"),
+        ]
+
+    def __str__(self):
+        return f"{self.poi} — {self.day:%d.%m.%Y}: {self.points}"
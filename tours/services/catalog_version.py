@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+import time
+
+from django.conf import settings
+from django.db.models import F
+
+from ..models import CatalogVersion
+
+# процессный кеш: в БД ходим не чаще раза в CATALOG_VERSION_CHECK_S секунд
+_checked_at = 0.0
+_cached_version = 0
+
+
+def bump_catalog_version() -> None:
+    global _checked_at
+    if not CatalogVersion.objects.filter(pk=1).update(version=F("version") + 1):
+        CatalogVersion.objects.get_or_create(pk=1, defaults={"version": 2})
+    # свой процесс видит изменение сразу
+    _checked_at = 0.0
+
+
+def _is_stale(now: float) -> bool:
+    return now - _checked_at >= getattr(settings, "CATALOG_VERSION_CHECK_S", 5.0)
+
+
+def get_catalog_version() -> int:
+    global _checked_at, _cached_version
+    now = time.monotonic()
+    if _is_stale(now):
+        _cached_version = (
+            CatalogVersion.objects.filter(pk=1).values_list("version", flat=True).first() or 1
+        )
+        _checked_at = now
+    return _cached_version
+
+
+async def aget_catalog_version() -> int:
+    global _checked_at, _cached_version
+    now = time.monotonic()
+    if _is_stale(now):
+        _cached_version = (
+            await CatalogVersion.objects.filter(pk=1).values_list("version", flat=True).afirst() or 1
+        )
+        _checked_at = now
+    return _cached_version
@@ -1,10 +1,12 @@
-from .provider import ExternalConditionsProvider
-from .factory import get_external_conditions_provider
+from .provider import AsyncExternalConditionsProvider, ExternalConditionsProvider
+from .factory import get_async_external_conditions_provider, get_external_conditions_provider
 
 get_external_provider = get_external_conditions_provider
 
 __all__ = [
+    "AsyncExternalConditionsProvider",
     "ExternalConditionsProvider",
+    "get_async_external_conditions_provider",
     "get_external_conditions_provider",
     "get_external_provider",
 ]
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Optional
+from weakref import WeakKeyDictionary
+
+import httpx
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+
+from .provider import DrivingLeg, WeatherNow, PlaceInfo
+from .rate_limit import OSRM, OPEN_METEO, OVERPASS, try_acquire
+from .real_http import (
+    USER_AGENT,
+    RealHttpExternalConditionsProvider,
+    fallback_leg,
+    open_meteo_params,
+    osrm_path,
+    overpass_query,
+    parse_open_meteo,
+    parse_osrm_leg,
+    parse_overpass,
+    point_coords,
+)
+
+
+# Один httpx-клиент (пул соединений, keep-alive, TLS-сессии) на event loop:
+# под ASGI это один клиент на воркер. Клиент привязан к своему loop, поэтому
+# под WSGI, где async_to_sync поднимает loop на запрос, он свой у запроса.
+_CLIENTS: "WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = WeakKeyDictionary()
+
+
+def shared_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _CLIENTS.get(loop)
+    if client is None or client.is_closed:
+        client = _CLIENTS[loop] = httpx.AsyncClient(headers={"User-Agent": USER_AGENT})
+    return client
+
+
+def _acquire_in_thread(acquire):
+    """
+    Лимитер ходит в БД синхронно. thread_sensitive=False — каждая проверка
+    в потоке пула, а не в единственном главном sync-потоке, где все корутины
+    стояли бы в очереди друг за другом. Соединение потока пула закрываем
+    сами: request_finished до него не доходит.
+    """
+    def run(upstream: str) -> bool:
+        try:
+            return acquire(upstream)
+        finally:
+            close_old_connections()
+
+    return sync_to_async(run, thread_sensitive=False)
+
+
+class AsyncRealHttpExternalConditionsProvider:
+    """
+    Неблокирующий вариант RealHttp-провайдера на httpx: те же сервисы,
+    разбор ответов и запасные варианты, но запросы по точкам идут параллельно.
+    """
+
+    name = "real_http"
+
+    def __init__(
+            self,
+            *,
+            timeout_s: int = 8,
+            base_urls: Optional[dict[str, str]] = None,
+            acquire=try_acquire,
+            client: Optional[httpx.AsyncClient] = None,
+    ) -> None:
+        self.base_urls = {
+            **RealHttpExternalConditionsProvider.base_urls,
+            **getattr(settings, "EXTERNAL_CONDITIONS_BASE_URLS", {}),
+            **(base_urls or {}),
+        }
+        self.timeout_s = timeout_s
+        self.acquire = _acquire_in_thread(acquire)
+        # переданный клиент закрывает тот, кто его создал
+        self._client = client
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        return self._client or shared_client()
+
+    def _url(self, upstream: str, path: str) -> str:
+        return self.base_urls[upstream].rstrip("/") + path
+
+    async def driving_leg(self, lat1: float, lon1: float, lat2: float, lon2: float) -> DrivingLeg:
+        if not await self.acquire(OSRM):
+            return fallback_leg(lat1, lon1, lat2, lon2, "rate_limited")
+        try:
+            url = self._url(OSRM, osrm_path(lat1, lon1, lat2, lon2))
+            r = await self.client.get(url, params={"overview": "false"}, timeout=self.timeout_s)
+            r.raise_for_status()
+            leg = parse_osrm_leg(r.json())
+            if leg is not None:
+                return leg
+        except Exception:
+            pass
+        return fallback_leg(lat1, lon1, lat2, lon2, "fallback:haversine")
+
+    async def weather_now(self, lat: float, lon: float) -> WeatherNow:
+        if not await self.acquire(OPEN_METEO):
+            return WeatherNow(source="rate_limited")
+        try:
+            r = await self.client.get(
+                self._url(OPEN_METEO, "/v1/forecast"), params=open_meteo_params(lat, lon), timeout=self.timeout_s
+            )
+            r.raise_for_status()
+            return parse_open_meteo(r.json())
+        except Exception:
+            return WeatherNow()
+
+    async def place_info(self, lat: float, lon: float) -> PlaceInfo:
+        if not await self.acquire(OVERPASS):
+            return PlaceInfo(source="rate_limited")
+        try:
+            r = await self.client.post(
+                self._url(OVERPASS, "/api/interpreter"), content=overpass_query(lat, lon), timeout=self.timeout_s
+            )
+            r.raise_for_status()
+            return parse_overpass(r.json())
+        except Exception:
+            return PlaceInfo()
+
+    async def _point_conditions(self, p) -> dict[str, Any]:
+        coords = point_coords(p)
+        if coords is None:
+            return {"point": p, "weather": WeatherNow(), "place": PlaceInfo()}
+
+        weather, place = await asyncio.gather(
+            self.weather_now(*coords),
+            self.place_info(*coords),
+        )
+        return {"point": p, "weather": weather, "place": place}
+
+    async def get_conditions(self, route, points) -> dict[str, Any]:
+        items = await asyncio.gather(*(self._point_conditions(p) for p in points))
+        return {
+            "provider": self.name,
+            "points": list(items),
+        }
+
+    async def aclose(self) -> None:
+        # общий клиент живёт дольше провайдера и переиспользуется
+        return None
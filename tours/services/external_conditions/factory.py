@@ -3,18 +3,42 @@ from __future__ import annotations
 from django.conf import settings
 
 from .stub import StubExternalConditionsProvider
+from .threaded import ThreadedAsyncProvider
 
 try:
     from .real_http import RealHttpExternalConditionsProvider
+    from .replay import RECORD, REPLAY, ReplayExternalConditionsProvider
 except Exception:
     RealHttpExternalConditionsProvider = None
+    ReplayExternalConditionsProvider = None
 
+try:
+    from .async_http import AsyncRealHttpExternalConditionsProvider
+except Exception:
+    AsyncRealHttpExternalConditionsProvider = None
 
-def get_external_conditions_provider():
+REAL_HTTP_KEYS = {"real_http", "realhttp", "real"}
+
+
+def _provider_key() -> str:
     raw = getattr(settings, "EXTERNAL_CONDITIONS_PROVIDER", "") or ""
-    key = raw.strip().lower()
+    return raw.strip().lower()
+
 
-    if key in {"real_http", "realhttp", "real"} and RealHttpExternalConditionsProvider is not None:
+def get_external_conditions_provider():
+    key = _provider_key()
+
+    if key in REAL_HTTP_KEYS and RealHttpExternalConditionsProvider is not None:
         return RealHttpExternalConditionsProvider()
 
+    if ReplayExternalConditionsProvider is not None and key in {RECORD, REPLAY}:
+        return ReplayExternalConditionsProvider(mode=key)
+
     return StubExternalConditionsProvider()
+
+
+def get_async_external_conditions_provider():
+    if _provider_key() in REAL_HTTP_KEYS and AsyncRealHttpExternalConditionsProvider is not None:
+        return AsyncRealHttpExternalConditionsProvider()
+
+    return ThreadedAsyncProvider(get_external_conditions_provider())
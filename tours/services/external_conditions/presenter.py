@@ -1,17 +1,35 @@
 from __future__ import annotations
 
-from django.utils import timezone
+from typing import Optional
 
-from .factory import get_external_conditions_provider
-from ...models import Route, RoutePoint
+from django.utils import timezone
 
+from .factory import get_async_external_conditions_provider, get_external_conditions_provider
+from ..route_snapshot import RouteSnapshot, abuild_route_snapshot, build_route_snapshot
+from ...models import Route
 
-def build_external_conditions_context(*, route: Route) -> dict:
-    points = list(RoutePoint.objects.filter(route=route).select_related("poi").order_by("day_number", "order_index", "id"))
-    provider = get_external_conditions_provider()
-    data = provider.get_conditions(route=route, points=points)
 
+def _conditions_context(data: dict) -> dict:
     return {
         "external_conditions": data,
         "external_conditions_updated_at": timezone.localtime(timezone.now()),
     }
+
+
+def build_external_conditions_context(*, route: Route, snapshot: Optional[RouteSnapshot] = None) -> dict:
+    snapshot = snapshot or build_route_snapshot(route)
+    provider = get_external_conditions_provider()
+    data = provider.get_conditions(route=route, points=snapshot.points)
+
+    return _conditions_context(data)
+
+
+async def abuild_external_conditions_context(*, route: Route, snapshot: Optional[RouteSnapshot] = None) -> dict:
+    snapshot = snapshot or await abuild_route_snapshot(route)
+    provider = get_async_external_conditions_provider()
+    try:
+        data = await provider.get_conditions(route=route, points=snapshot.points)
+    finally:
+        await provider.aclose()
+
+    return _conditions_context(data)
@@ -11,17 +11,21 @@ if TYPE_CHECKING:
 class DrivingLeg:
     distance_km: float
     duration_min: int
+    source: Optional[str] = None
 
 
 @dataclass(frozen=True)
 class WeatherNow:
     temperature_c: Optional[float] = None
     wind_speed_ms: Optional[float] = None
+    weather_code: Optional[int] = None
+    source: Optional[str] = None
 
 
 @dataclass(frozen=True)
 class PlaceInfo:
     opening_hours: Optional[str] = None
+    source: Optional[str] = None
 
 
 class ExternalConditionsProvider(Protocol):
@@ -33,3 +37,12 @@ class ExternalConditionsProvider(Protocol):
     def place_info(self, lat: float, lon: float) -> PlaceInfo: ...
 
     def get_conditions(self, route: "Route", points: list["RoutePoint"]) -> dict[str, Any]: ...
+
+
+class AsyncExternalConditionsProvider(Protocol):
+
+    name: str
+
+    async def driving_leg(self, lat1: float, lon1: float, lat2: float, lon2: float) -> DrivingLeg: ...
+    async def get_conditions(self, route: "Route", points: list["RoutePoint"]) -> dict[str, Any]: ...
+    async def aclose(self) -> None: ...
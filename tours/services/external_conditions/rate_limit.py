@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+
+from ...models import UpstreamRateBucket
+
+OSRM = "osrm"
+OPEN_METEO = "open_meteo"
+OVERPASS = "overpass"
+
+# Публичные инстансы просят не больше ~1 запроса в секунду с одного клиента.
+DEFAULT_RATE_LIMITS: dict[str, dict[str, float]] = {
+    OSRM: {"rate_per_s": 1.0, "burst": 5},
+    OPEN_METEO: {"rate_per_s": 2.0, "burst": 10},
+    OVERPASS: {"rate_per_s": 0.5, "burst": 3},
+}
+
+
+@dataclass(frozen=True)
+class BucketConfig:
+    rate_per_s: float
+    burst: float
+
+
+def get_bucket_config(upstream: str) -> Optional[BucketConfig]:
+    limits = getattr(settings, "EXTERNAL_CONDITIONS_RATE_LIMITS", None)
+    if limits is None:
+        limits = DEFAULT_RATE_LIMITS
+
+    raw = limits.get(upstream)
+    if not raw:
+        return None
+    return BucketConfig(
+        rate_per_s=float(raw.get("rate_per_s", 1.0)),
+        burst=float(raw.get("burst", 1)),
+    )
+
+
+def try_acquire(upstream: str, cost: float = 1.0) -> bool:
+    """
+    Забирает `cost` токенов из общего (на все воркеры) ведра сервиса.
+    Не ждёт: если токенов нет, сразу возвращает False и вызывающий
+    идёт по запасному пути.
+    """
+    cfg = get_bucket_config(upstream)
+    if cfg is None:
+        return True
+
+    now = time.time()
+    try:
+        with transaction.atomic():
+            bucket, _ = (
+                UpstreamRateBucket.objects
+                .select_for_update()
+                .get_or_create(
+                    upstream=upstream,
+                    defaults={"tokens": cfg.burst, "refilled_at": now},
+                )
+            )
+            elapsed = max(0.0, now - bucket.refilled_at)
+            available = min(cfg.burst, bucket.tokens + elapsed * cfg.rate_per_s)
+
+            granted = available >= cost
+            if granted:
+                available -= cost
+
+            bucket.tokens = available
+            bucket.refilled_at = now
+            bucket.save(update_fields=["tokens", "refilled_at"])
+            return granted
+    except DatabaseError:
+        # лимитер не должен ронять страницу — без БД пропускаем запрос
+        return True
@@ -5,7 +5,12 @@ from typing import Any, Optional
 import math
 import requests
 
+from django.conf import settings
+
 from .provider import DrivingLeg, WeatherNow, PlaceInfo
+from .rate_limit import OSRM, OPEN_METEO, OVERPASS, try_acquire
+
+USER_AGENT = "TyvaTrail/1.0 (external conditions)"
 
 
 def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
@@ -20,110 +25,167 @@ def _haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     return r * c
 
 
+def fallback_leg(lat1: float, lon1: float, lat2: float, lon2: float, source: str) -> DrivingLeg:
+    km = _haversine_km(lat1, lon1, lat2, lon2) * 1.25
+    return DrivingLeg(distance_km=km, duration_min=int(max(1, round(km))), source=source)
+
+
+def osrm_path(lat1: float, lon1: float, lat2: float, lon2: float) -> str:
+    return f"/route/v1/driving/{lon1},{lat1};{lon2},{lat2}"
+
+
+def parse_osrm_leg(data: dict[str, Any]) -> Optional[DrivingLeg]:
+    route = (data.get("routes") or [None])[0]
+    if not route:
+        return None
+    dist_m = float(route.get("distance") or 0.0)
+    dur_s = float(route.get("duration") or 0.0)
+    return DrivingLeg(
+        distance_km=dist_m / 1000.0,
+        duration_min=int(round(dur_s / 60.0)),
+        source=OSRM,
+    )
+
+
+def open_meteo_params(lat: float, lon: float) -> dict[str, Any]:
+    return {
+        "latitude": lat,
+        "longitude": lon,
+        "current": "temperature_2m,wind_speed_10m",
+        "timezone": "auto",
+    }
+
+
+def parse_open_meteo(data: dict[str, Any]) -> WeatherNow:
+    cur = data.get("current") or {}
+    t = cur.get("temperature_2m")
+    w = cur.get("wind_speed_10m")
+
+    return WeatherNow(
+        temperature_c=float(t) if t is not None else None,
+        wind_speed_ms=(float(w) / 3.6) if w is not None else None,  # open-meteo часто даёт км/ч
+        source=OPEN_METEO,
+    )
+
+
+def overpass_query(lat: float, lon: float) -> bytes:
+    query = f"""[out:json][timeout:10];
+(
+  node(around:200,{lat},{lon})[opening_hours];
+  way(around:200,{lat},{lon})[opening_hours];
+  relation(around:200,{lat},{lon})[opening_hours];
+);
+out tags 1;
+"""
+    return query.encode("utf-8")
+
+
+def parse_overpass(data: dict[str, Any]) -> PlaceInfo:
+    els = data.get("elements") or []
+    if els:
+        tags = (els[0].get("tags") or {})
+        oh = tags.get("opening_hours")
+        return PlaceInfo(opening_hours=str(oh) if oh else None, source=OVERPASS)
+    return PlaceInfo()
+
+
+def point_coords(p) -> Optional[tuple[float, float]]:
+    poi = getattr(p, "poi", None)
+    lat = getattr(poi, "latitude", None) if poi else None
+    lon = getattr(poi, "longitude", None) if poi else None
+    if lat is None or lon is None:
+        return None
+    return float(lat), float(lon)
+
+
 class RealHttpExternalConditionsProvider:
 
     name = "real_http"
 
-    def __init__(self, *, timeout_s: int = 8) -> None:
+    base_urls: dict[str, str] = {
+        OSRM: "https://router.project-osrm.org",
+        OPEN_METEO: "https://api.open-meteo.com",
+        OVERPASS: "https://overpass-api.de",
+    }
+
+    def __init__(
+            self,
+            *,
+            timeout_s: int = 8,
+            base_urls: Optional[dict[str, str]] = None,
+            acquire=try_acquire,
+    ) -> None:
         self.timeout_s = timeout_s
+        self.base_urls = {
+            **self.base_urls,
+            **getattr(settings, "EXTERNAL_CONDITIONS_BASE_URLS", {}),
+            **(base_urls or {}),
+        }
+        self.acquire = acquire
         self.session = requests.Session()
         self.session.headers.update({
-            "User-Agent": "TyvaTrail/1.0 (external conditions)"
+            "User-Agent": USER_AGENT
         })
 
+    def _url(self, upstream: str, path: str) -> str:
+        return self.base_urls[upstream].rstrip("/") + path
+
     def driving_leg(self, lat1: float, lon1: float, lat2: float, lon2: float) -> DrivingLeg:
+        if not self.acquire(OSRM):
+            return fallback_leg(lat1, lon1, lat2, lon2, "rate_limited")
         try:
-            url = (
-                "https://router.project-osrm.org/route/v1/driving/"
-                f"{lon1},{lat1};{lon2},{lat2}"
-            )
+            url = self._url(OSRM, osrm_path(lat1, lon1, lat2, lon2))
             r = self.session.get(url, params={"overview": "false"}, timeout=self.timeout_s)
             r.raise_for_status()
-            data: dict[str, Any] = r.json()
-            route = (data.get("routes") or [None])[0]
-            if route:
-                dist_m = float(route.get("distance") or 0.0)
-                dur_s = float(route.get("duration") or 0.0)
-                return DrivingLeg(distance_km=dist_m / 1000.0, duration_min=int(round(dur_s / 60.0)))
+            leg = parse_osrm_leg(r.json())
+            if leg is not None:
+                return leg
         except Exception:
             pass
-
-        km = _haversine_km(lat1, lon1, lat2, lon2) * 1.25
-        return DrivingLeg(distance_km=km, duration_min=int(max(1, round(km))))
+        return fallback_leg(lat1, lon1, lat2, lon2, "fallback:haversine")
 
     def weather_now(self, lat: float, lon: float) -> WeatherNow:
+        if not self.acquire(OPEN_METEO):
+            return WeatherNow(source="rate_limited")
         try:
-            url = "https://api.open-meteo.com/v1/forecast"
-            params = {
-                "latitude": lat,
-                "longitude": lon,
-                "current": "temperature_2m,wind_speed_10m",
-                "timezone": "auto",
-            }
-            r = self.session.get(url, params=params, timeout=self.timeout_s)
+            url = self._url(OPEN_METEO, "/v1/forecast")
+            r = self.session.get(url, params=open_meteo_params(lat, lon), timeout=self.timeout_s)
             r.raise_for_status()
-            data: dict[str, Any] = r.json()
-            cur = data.get("current") or {}
-            t = cur.get("temperature_2m")
-            w = cur.get("wind_speed_10m")
-
-            return WeatherNow(
-                temperature_c=float(t) if t is not None else None,
-                wind_speed_ms=(float(w) / 3.6) if w is not None else None,  # open-meteo часто даёт км/ч
-            )
+            return parse_open_meteo(r.json())
         except Exception:
             return WeatherNow()
 
     def place_info(self, lat: float, lon: float) -> PlaceInfo:
+        if not self.acquire(OVERPASS):
+            return PlaceInfo(source="rate_limited")
         try:
-            url = "https://overpass-api.de/api/interpreter"
-            query = f"""[out:json][timeout:10];
-(
-  node(around:200,{lat},{lon})[opening_hours];
-  way(around:200,{lat},{lon})[opening_hours];
-  relation(around:200,{lat},{lon})[opening_hours];
-);
-out tags 1;
-"""
-            r = self.session.post(url, data=query.encode("utf-8"), timeout=self.timeout_s)
+            url = self._url(OVERPASS, "/api/interpreter")
+            r = self.session.post(url, data=overpass_query(lat, lon), timeout=self.timeout_s)
             r.raise_for_status()
-            data: dict[str, Any] = r.json()
-            els = data.get("elements") or []
-            if els:
-                tags = (els[0].get("tags") or {})
-                oh = tags.get("opening_hours")
-                return PlaceInfo(opening_hours=str(oh) if oh else None)
+            return parse_overpass(r.json())
         except Exception:
-            pass
-        return PlaceInfo()
+            return PlaceInfo()
 
-    def get_conditions(self, route, points) -> dict[str, Any]:
-        items: list[dict[str, Any]] = []
-
-        for p in points:
-            poi = getattr(p, "poi", None)
-            lat = getattr(poi, "latitude", None) if poi else None
-            lon = getattr(poi, "longitude", None) if poi else None
-
-            weather = WeatherNow()
-            place = PlaceInfo()
-
-            if lat is not None and lon is not None:
-                try:
-                    lat_f = float(lat)
-                    lon_f = float(lon)
-                    weather = self.weather_now(lat_f, lon_f)
-                    place = self.place_info(lat_f, lon_f)
-                except Exception:
-                    pass
-
-            items.append({
-                "point": p,
-                "weather": weather,
-                "place": place,
-            })
+    def point_conditions(self, p) -> dict[str, Any]:
+        weather = WeatherNow()
+        place = PlaceInfo()
 
+        coords = point_coords(p)
+        if coords is not None:
+            try:
+                weather = self.weather_now(*coords)
+                place = self.place_info(*coords)
+            except Exception:
+                pass
+
+        return {
+            "point": p,
+            "weather": weather,
+            "place": place,
+        }
+
+    def get_conditions(self, route, points) -> dict[str, Any]:
         return {
             "provider": self.name,
-            "points": items,
+            "points": [self.point_conditions(p) for p in points],
         }
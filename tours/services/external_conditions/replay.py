@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import random
+import time
+from pathlib import Path
+from typing import Any, Optional
+from urllib.parse import urlencode
+
+import requests
+from django.conf import settings
+
+from .real_http import USER_AGENT, RealHttpExternalConditionsProvider
+
+RECORD = "record"
+REPLAY = "replay"
+
+
+class ReplayResponse:
+    """Минимальный аналог requests.Response для воспроизведённых ответов."""
+
+    def __init__(self, *, url: str, status_code: int, payload: Any) -> None:
+        self.url = url
+        self.status_code = status_code
+        self._payload = payload
+
+    def raise_for_status(self) -> None:
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} for url: {self.url}", response=self)
+
+    def json(self) -> Any:
+        return self._payload
+
+
+class UpstreamProfile:
+    """
+    Поведение одного сервиса при воспроизведении:
+    задержка (распределение), доля ошибок и доля таймаутов.
+    """
+
+    def __init__(self, raw: Optional[dict[str, Any]] = None) -> None:
+        raw = raw or {}
+        self.latency = raw.get("latency_ms") or {"dist": "fixed", "ms": 0}
+        self.error_rate = float(raw.get("error_rate", 0.0))
+        self.timeout_rate = float(raw.get("timeout_rate", 0.0))
+
+    def sample_latency_s(self, rng: random.Random) -> float:
+        spec = self.latency
+        dist = spec.get("dist", "fixed")
+
+        if dist == "uniform":
+            ms = rng.uniform(float(spec.get("min", 0)), float(spec.get("max", 0)))
+        elif dist == "normal":
+            ms = rng.gauss(float(spec.get("mean", 0)), float(spec.get("std", 0)))
+        elif dist == "lognormal":
+            # median = exp(mu), хвост задаётся sigma
+            median = max(float(spec.get("median", 1)), 1e-3)
+            ms = rng.lognormvariate(math.log(median), float(spec.get("sigma", 0.5)))
+        else:
+            ms = float(spec.get("ms", 0))
+
+        return max(0.0, ms) / 1000.0
+
+
+class FixtureSession:
+    """
+    Подменяет requests.Session внутри RealHttp-провайдера.
+
+    RECORD — ходит в сеть и складывает успешные (2xx) ответы в файлы-фикстуры;
+    REPLAY — отдаёт ответы из фикстур без сети, добавляя задержки,
+    ошибки и таймауты по профилю сервиса.
+    """
+
+    def __init__(
+            self,
+            *,
+            mode: str,
+            fixtures_dir: Path,
+            base_urls: dict[str, str],
+            profiles: dict[str, UpstreamProfile],
+            seed: Optional[int] = None,
+    ) -> None:
+        self.mode = mode
+        self.fixtures_dir = Path(fixtures_dir)
+        self.base_urls = base_urls
+        self.profiles = profiles
+        self.rng = random.Random(seed)
+        self.headers: dict[str, str] = {}
+        self._live = requests.Session() if mode == RECORD else None
+
+    def get(self, url: str, params: Optional[dict] = None, timeout: Optional[float] = None):
+        return self._request("GET", url, params=params, data=None, timeout=timeout)
+
+    def post(self, url: str, data: Optional[bytes] = None, timeout: Optional[float] = None):
+        return self._request("POST", url, params=None, data=data, timeout=timeout)
+
+    def _upstream_for(self, url: str) -> tuple[str, str]:
+        by_length = sorted(self.base_urls.items(), key=lambda kv: len(kv[1]), reverse=True)
+        for upstream, base in by_length:
+            base = base.rstrip("/")
+            if url.startswith(base):
+                return upstream, url[len(base):]
+        return "unknown", url
+
+    def _fixture_path(self, method: str, upstream: str, path: str, params, data) -> Path:
+        body = data.decode("utf-8") if isinstance(data, bytes) else (data or "")
+        key = "\n".join([
+            method,
+            path,
+            urlencode(sorted((params or {}).items())),
+            body,
+        ])
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:20]
+        return self.fixtures_dir / upstream / f"{digest}.json"
+
+    def _request(self, method: str, url: str, *, params, data, timeout):
+        upstream, path = self._upstream_for(url)
+        fixture = self._fixture_path(method, upstream, path, params, data)
+
+        if self.mode == RECORD:
+            return self._record(method, url, params=params, data=data, timeout=timeout, fixture=fixture)
+        return self._replay(upstream, url, fixture=fixture, timeout=timeout)
+
+    def _record(self, method: str, url: str, *, params, data, timeout, fixture: Path):
+        self._live.headers.update(self.headers)
+        r = self._live.request(method, url, params=params, data=data, timeout=timeout)
+        # пишем только 2xx: 429 или 5xx — случайность записи, а не ответ
+        # сервиса, такая фикстура навсегда превратила бы запрос в ошибку (или
+        # затёрла бы хорошую). Сбои при воспроизведении задаёт профиль (error_rate)
+        if not 200 <= r.status_code < 300:
+            return r
+        try:
+            payload = r.json()
+        except ValueError:
+            payload = None
+
+        fixture.parent.mkdir(parents=True, exist_ok=True)
+        fixture.write_text(
+            json.dumps(
+                {"method": method, "url": r.url, "status_code": r.status_code, "payload": payload},
+                ensure_ascii=False,
+                indent=1,
+            ),
+            encoding="utf-8",
+        )
+        return r
+
+    def _replay(self, upstream: str, url: str, *, fixture: Path, timeout: Optional[float]):
+        profile = self.profiles.get(upstream) or UpstreamProfile()
+        delay = profile.sample_latency_s(self.rng)
+
+        if timeout is not None and (delay >= timeout or self.rng.random() < profile.timeout_rate):
+            time.sleep(timeout)
+            raise requests.Timeout(f"replay: {upstream} timed out after {timeout}s")
+
+        time.sleep(delay)
+
+        if self.rng.random() < profile.error_rate:
+            return ReplayResponse(url=url, status_code=503, payload=None)
+
+        if not fixture.exists():
+            raise requests.ConnectionError(f"replay: no fixture {fixture.name} for {upstream}")
+
+        saved = json.loads(fixture.read_text(encoding="utf-8"))
+        return ReplayResponse(url=url, status_code=int(saved.get("status_code", 200)), payload=saved.get("payload"))
+
+
+class ReplayExternalConditionsProvider(RealHttpExternalConditionsProvider):
+    """
+    RealHttp-провайдер поверх фикстур: режим "record" пишет реальные ответы,
+    режим "replay" работает офлайн с настраиваемыми задержками и сбоями.
+    """
+
+    def __init__(self, *, mode: str = REPLAY, **kwargs) -> None:
+        conf = getattr(settings, "EXTERNAL_CONDITIONS_REPLAY", {}) or {}
+
+        if mode == REPLAY:
+            # офлайн лимиты публичных сервисов не нужны
+            kwargs.setdefault("acquire", lambda upstream: True)
+        super().__init__(**kwargs)
+
+        self.mode = mode
+        self.name = mode
+        self.session = FixtureSession(
+            mode=mode,
+            fixtures_dir=Path(conf.get("fixtures_dir") or settings.BASE_DIR / "fixtures" / "external_conditions"),
+            base_urls=self.base_urls,
+            profiles={
+                upstream: UpstreamProfile(raw)
+                for upstream, raw in (conf.get("upstreams") or {}).items()
+            },
+            seed=conf.get("seed"),
+        )
+        self.session.headers.update({
+            "User-Agent": USER_AGENT
+        })
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any
+
+from django.db import close_old_connections
+
+from .provider import DrivingLeg
+
+# свой пул: дефолтный executor на маленьких машинах всего на несколько потоков
+_EXECUTOR = ThreadPoolExecutor(max_workers=32, thread_name_prefix="external-conditions")
+
+
+def _closing_connections(fn, *args):
+    # провайдер в режиме record берёт токены лимитера через БД; соединение
+    # потока пула иначе не закрыл бы никто (request_finished сюда не доходит)
+    try:
+        return fn(*args)
+    finally:
+        close_old_connections()
+
+
+def _in_thread(fn, *args):
+    return asyncio.get_running_loop().run_in_executor(_EXECUTOR, partial(_closing_connections, fn, *args))
+
+
+class ThreadedAsyncProvider:
+    """
+    Асинхронная обёртка над синхронным провайдером (stub, replay/record):
+    каждый вызов уходит в пул потоков, поэтому ноги маршрута и точки
+    (если провайдер умеет point_conditions) обрабатываются параллельно.
+    """
+
+    def __init__(self, provider) -> None:
+        self.provider = provider
+        self.name = getattr(provider, "name", "stub")
+
+    async def driving_leg(self, lat1: float, lon1: float, lat2: float, lon2: float) -> DrivingLeg:
+        return await _in_thread(self.provider.driving_leg, lat1, lon1, lat2, lon2)
+
+    async def get_conditions(self, route, points) -> dict[str, Any]:
+        point_conditions = getattr(self.provider, "point_conditions", None)
+        if point_conditions is None:
+            return await _in_thread(
+                lambda: self.provider.get_conditions(route=route, points=points)
+            )
+
+        items = await asyncio.gather(*(_in_thread(point_conditions, p) for p in points))
+        return {
+            "provider": self.name,
+            "points": list(items),
+        }
+
+    async def aclose(self) -> None:
+        return None
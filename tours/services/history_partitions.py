@@ -0,0 +1,221 @@
+from __future__ import annotations
+
+import gzip
+import json
+from dataclasses import dataclass
+from datetime import date, datetime
+from pathlib import Path
+from typing import Iterator, Optional
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils import timezone
+
+from ..models import RouteGeneration
+
+# На PostgreSQL tours_routegeneration — таблица, секционированная по месяцам
+# created_at (миграция 0020): секции tours_routegeneration_pYYYYMM плюс
+# секция по умолчанию. Старые секции архивируются в .jsonl.gz и удаляются
+# целиком (DETACH + DROP) — без DELETE, блокировок и нагрузки на VACUUM.
+# Строки месяцев, для которых секцию не успели создать, оседают в секции по
+# умолчанию; ensure_partitions переносит их в собственные секции, так что
+# и они архивируются и удаляются вместе со своим месяцем.
+# На других БД та же команда архивирует и удаляет строки пачками.
+
+TABLE = RouteGeneration._meta.db_table
+DEFAULT_PARTITION = f"{TABLE}_default"
+ARCHIVE_FIELDS = ("id", "user_id", "route_id", "days_count", "max_budget", "created_at")
+DELETE_BATCH = 5000
+
+
+@dataclass
+class RetiredMonth:
+    month: date
+    rows: int
+    archive: Optional[Path]
+
+
+def month_start(value: date) -> date:
+    return value.replace(day=1)
+
+
+def add_months(value: date, months: int) -> date:
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _bound(value: date) -> datetime:
+    return timezone.make_aware(datetime(value.year, value.month, value.day))
+
+
+def partition_name(month: date) -> str:
+    return f"{TABLE}_p{month:%Y%m}"
+
+
+def is_partitioned() -> bool:
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)", [TABLE]
+        )
+        return cursor.fetchone() is not None
+
+
+def existing_partitions() -> dict[date, str]:
+    """Месячные секции {первое число месяца: имя таблицы}."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT c.relname FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = to_regclass(%s)
+            """,
+            [TABLE],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+
+    prefix = f"{TABLE}_p"
+    months = {}
+    for name in names:
+        if name.startswith(prefix) and name[len(prefix):].isdigit():
+            suffix = name[len(prefix):]
+            months[date(int(suffix[:4]), int(suffix[4:]), 1)] = name
+    return months
+
+
+def create_month_partition(month: date) -> str:
+    """
+    Создаёт секцию месяца. Строки этого месяца, успевшие попасть в секцию
+    по умолчанию, переносятся в неё до ATTACH (иначе ATTACH не пройдёт).
+    """
+    name = partition_name(month)
+    qn = connection.ops.quote_name
+    start, end = _bound(month), _bound(add_months(month, 1))
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"CREATE TABLE {qn(name)} (LIKE {qn(TABLE)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+        cursor.execute(
+            f"""
+            WITH moved AS (
+                DELETE FROM {qn(DEFAULT_PARTITION)}
+                WHERE created_at >= %s AND created_at < %s
+                RETURNING *
+            )
+            INSERT INTO {qn(name)} SELECT * FROM moved
+            """,
+            [start, end],
+        )
+        cursor.execute(
+            f"ALTER TABLE {qn(TABLE)} ATTACH PARTITION {qn(name)} FOR VALUES FROM (%s) TO (%s)",
+            [start, end],
+        )
+    return name
+
+
+def default_partition_months() -> list[date]:
+    """Месяцы (по местному времени, как границы секций), чьи строки лежат в секции по умолчанию."""
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT DISTINCT date_trunc('month', created_at AT TIME ZONE %s) FROM {qn(DEFAULT_PARTITION)}",
+            [timezone.get_current_timezone_name()],
+        )
+        return sorted(row[0].date() for row in cursor.fetchall())
+
+
+def ensure_partitions(months_ahead: int = 3) -> list[str]:
+    """
+    Секции на текущий месяц и months_ahead вперёд, а также на месяцы,
+    строки которых попали в секцию по умолчанию.
+    """
+    existing = existing_partitions()
+    this_month = month_start(timezone.localdate())
+    wanted = {add_months(this_month, offset) for offset in range(months_ahead + 1)}
+    wanted.update(default_partition_months())
+    return [create_month_partition(month) for month in sorted(wanted) if month not in existing]
+
+
+def _archive_rows(rows: Iterator[dict], path: Path) -> int:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    count = 0
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False))
+            f.write("\n")
+            count += 1
+    return count
+
+
+def _month_rows(start: datetime, end: datetime) -> Iterator[dict]:
+    qs = RouteGeneration.objects.filter(created_at__gte=start, created_at__lt=end).order_by("created_at", "id")
+    return qs.values(*ARCHIVE_FIELDS).iterator(chunk_size=2000)
+
+
+def _archive_path(archive_dir: Path, month: date) -> Path:
+    return archive_dir / f"route_generation_{month:%Y%m}.jsonl.gz"
+
+
+def retire_old_history(
+    *,
+    keep_months: int,
+    archive_dir: Optional[Path] = None,
+    dry_run: bool = False,
+) -> list[RetiredMonth]:
+    """
+    Убирает месяцы старше keep_months (текущий месяц не считается).
+    archive_dir=None — удалить без архива.
+    """
+    cutoff = add_months(month_start(timezone.localdate()), -keep_months)
+    partitioned = is_partitioned()
+
+    if partitioned:
+        existing = existing_partitions()
+        months = sorted(m for m in set(existing).union(default_partition_months()) if m < cutoff)
+    else:
+        oldest = RouteGeneration.objects.order_by("created_at").values_list("created_at", flat=True).first()
+        months = []
+        if oldest is not None:
+            month = month_start(timezone.localtime(oldest).date())
+            while month < cutoff:
+                months.append(month)
+                month = add_months(month, 1)
+
+    retired = []
+    for month in months:
+        start, end = _bound(month), _bound(add_months(month, 1))
+        month_qs = RouteGeneration.objects.filter(created_at__gte=start, created_at__lt=end)
+        if not partitioned and not month_qs.exists():
+            continue
+        if dry_run:
+            retired.append(RetiredMonth(month=month, rows=month_qs.count(), archive=None))
+            continue
+
+        if partitioned and month not in existing:
+            # месяц целиком в секции по умолчанию: сначала своя секция
+            create_month_partition(month)
+
+        path = _archive_path(archive_dir, month) if archive_dir else None
+        archived = _archive_rows(_month_rows(start, end), path) if path else None
+        if partitioned:
+            rows = archived if archived is not None else month_qs.count()
+            _drop_partition(partition_name(month))
+        else:
+            rows = _delete_in_batches(month_qs)
+        retired.append(RetiredMonth(month=month, rows=rows, archive=path))
+    return retired
+
+
+def _drop_partition(name: str) -> None:
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {qn(TABLE)} DETACH PARTITION {qn(name)}")
+        cursor.execute(f"DROP TABLE {qn(name)}")
+
+
+def _delete_in_batches(qs) -> int:
+    deleted = 0
+    while True:
+        ids = list(qs.values_list("id", flat=True)[:DELETE_BATCH])
+        if not ids:
+            return deleted
+        deleted += RouteGeneration.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Mapping, Optional, Sequence
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db.models import Field, Q, QuerySet
+from django.utils import timezone
+
+# Ключ сортировки: (имя поля или аннотации, по убыванию?). Последним ключом
+# должен идти уникальный столбец (id), иначе курсор неоднозначен.
+# Курсор — base64 от JSON-объекта {ключ: значение}. Он приходит из URL, так
+# что при разборе проверяются набор ключей и тип каждого значения; испорченный
+# курсор даёт первую страницу, а не 500.
+Key = tuple[str, bool]
+
+
+def _json_default(value: Any) -> str:
+    # isoformat без округления: курсор должен совпадать со значением в БД до микросекунды
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} не подходит для курсора")
+
+
+def encode_cursor(values: Mapping[str, Any]) -> str:
+    raw = json.dumps(dict(values), default=_json_default, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def keyset_ordering(keys: Sequence[Key]) -> list[str]:
+    """Аргументы order_by для ключей (прямой порядок)."""
+    return [f"{'-' if desc else ''}{field}" for field, desc in keys]
+
+
+def decode_cursor(cursor: str, fields: Mapping[str, Field]) -> Optional[list[Any]]:
+    """
+    Значения ключей в порядке fields, приведённые полем (to_python).
+    None — курсор испорчен: не тот набор ключей, чужой тип, NULL.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        packed = json.loads(raw)
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(packed, dict) or packed.keys() != fields.keys():
+        return None
+
+    values = []
+    for name, field in fields.items():
+        value = packed[name]
+        if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+            return None
+        try:
+            value = field.to_python(value)
+        except (ValidationError, TypeError, ValueError):
+            return None
+        if value is None or (isinstance(value, datetime) and timezone.is_naive(value)):
+            return None
+        values.append(value)
+    return values
+
+
+def _seek(keys: Sequence[Key], values: list[Any], *, forward: bool) -> Q:
+    """(k1, k2, ...) строго после / до values с учётом направлений ключей."""
+    q = Q()
+    for i, (field, desc) in enumerate(keys):
+        step = Q(**{f"{field}__{'lt' if desc == forward else 'gt'}": values[i]})
+        for j, (prev_field, _) in enumerate(keys[:i]):
+            step &= Q(**{prev_field: values[j]})
+        q |= step
+    return q
+
+
+@dataclass
+class KeysetPage:
+    object_list: list
+    has_next: bool
+    has_previous: bool
+    next_cursor: Optional[str]
+    previous_cursor: Optional[str]
+    total: Optional[int] = None
+
+
+class KeysetPaginator:
+    """
+    Пагинация по курсору: страница N стоит столько же, сколько первая
+    (WHERE по ключам вместо OFFSET), COUNT(*) не выполняется.
+    """
+
+    def __init__(self, qs: QuerySet, keys: Sequence[Key], per_page: int) -> None:
+        self.qs = qs
+        self.keys = list(keys)
+        self.per_page = per_page
+        self.fields = {field: qs.query.resolve_ref(field).output_field for field, _ in self.keys}
+
+    def _ordering(self, *, forward: bool) -> list[str]:
+        return [f"{'-' if desc == forward else ''}{field}" for field, desc in self.keys]
+
+    def _cursor(self, obj) -> str:
+        return encode_cursor({field: getattr(obj, field) for field, _ in self.keys})
+
+    def page(self, *, after: Optional[str] = None, before: Optional[str] = None) -> KeysetPage:
+        qs = self.qs
+        forward = True
+
+        values = decode_cursor(after, self.fields) if after else None
+        if values is None and before:
+            values = decode_cursor(before, self.fields)
+            forward = values is None
+        if values is not None:
+            qs = qs.filter(_seek(self.keys, values, forward=forward))
+
+        rows = list(qs.order_by(*self._ordering(forward=forward))[: self.per_page + 1])
+        more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+
+        if forward:
+            has_next, has_previous = more, values is not None
+        else:
+            rows.reverse()
+            has_next, has_previous = True, more
+
+        return KeysetPage(
+            object_list=rows,
+            has_next=has_next and bool(rows),
+            has_previous=has_previous and bool(rows),
+            next_cursor=self._cursor(rows[-1]) if rows else None,
+            previous_cursor=self._cursor(rows[0]) if rows else None,
+        )
+
+
+def cached_count(qs: QuerySet, *, namespace: str, timeout: int = 300) -> int:
+    """
+    COUNT(*) по выборке, закешированный по её SQL. namespace должен менять
+    значение при изменении данных (например, включать версию каталога).
+    """
+    sql, params = qs.query.sql_with_params()
+    digest = hashlib.sha1(f"{sql}|{params!r}".encode("utf-8")).hexdigest()
+    key = f"tours:count:{namespace}:{digest}"
+
+    total = cache.get(key)
+    if total is None:
+        total = qs.count()
+        cache.set(key, total, timeout)
+    return total
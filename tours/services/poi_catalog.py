@@ -0,0 +1,238 @@
+from __future__ import annotations
+
+import bisect
+import re
+import threading
+import time
+from typing import Optional
+
+from django.conf import settings
+from django.db import connection
+
+from .catalog_version import get_catalog_version
+from .poi_preferences import (
+    STYLE_TO_TYPES,
+    interest_lexemes,
+    interest_terms,
+    interest_tokens,
+    profile_constraints,
+)
+from ..models import Poi, PhysicalLevel, PoiType, PriceLevel, Season
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+# Колоночный снапшот каталога для движка "numpy" в build_route_for_user.
+# Категориальные поля хранятся кодами (индекс в списке choices), числа —
+# float-массивами с NaN вместо NULL. Снапшот только на чтение, один на
+# процесс, перестраивается при смене CatalogVersion и не реже раза в
+# ROUTE_TEMPLATE_TIMEOUT (см. settings).
+# Интересы профиля ищутся по обратному индексу: на PostgreSQL — по
+# лексемам Poi.search_vector (те же термы, что и в SQL-пути), на других БД —
+# подстрокой в словах (как icontains). Тексты читаются потоком и сразу
+# сводятся к словам: в снапшоте остаются только массивы и индекс.
+
+_TYPE_CODES = {v: i for i, v in enumerate(PoiType.values)}
+_SEASON_CODES = {v: i for i, v in enumerate(Season.values)}
+_PHYSICAL_CODES = {v: i for i, v in enumerate(PhysicalLevel.values)}
+_PRICE_CODES = {v: i for i, v in enumerate(PriceLevel.values)}
+
+_FIELDS = (
+    "id", "name", "type", "season", "physical_level", "price_level", "base_cost",
+    "visit_duration_hours", "avg_rating", "latitude", "longitude", "usage_count",
+)
+# откуда берутся слова индекса на БД без search_vector
+_TEXT_FIELDS = ("name", "short_description", "region", "detailed_description")
+
+# шаг квантования pref_score при сведении сортировки к одному ключу
+_SCORE_SCALE = 1000
+
+_lock = threading.Lock()
+_catalog: Optional["PoiCatalog"] = None
+
+
+def numpy_available() -> bool:
+    return np is not None
+
+
+def _codes(values, mapping) -> "np.ndarray":
+    return np.fromiter((mapping.get(v, -1) for v in values), dtype=np.int16, count=len(values))
+
+
+def _floats(values) -> "np.ndarray":
+    return np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+
+
+def _words(texts) -> set[str]:
+    return set(re.findall(r"\w+", " ".join(t or "" for t in texts).lower()))
+
+
+def _lexemes(vector) -> set[str]:
+    # текст tsvector: 'гор':3 'шаманск':1A,5C — лексемы в кавычках, ' внутри удвоена
+    if not vector:
+        return set()
+    return {m.replace("''", "'") for m in re.findall(r"'((?:[^']|'')*)'", str(vector))}
+
+
+class PoiCatalog:
+    """Массивы по всем POI плюс обратный индекс «слово (лексема) -> номера POI»."""
+
+    def __init__(self, version: int, rows: list[tuple], terms: list[set[str]], *, uses_lexemes: bool) -> None:
+        """rows — значения _FIELDS, terms — слова (лексемы) индекса для каждой строки."""
+        self.version = version
+        self.built_at = time.monotonic()
+        cols = list(zip(*rows)) if rows else [()] * len(_FIELDS)
+        (ids, names, types, seasons, physical, prices, cost, duration, rating, lat, lon, usage) = cols
+
+        self.ids = np.array(ids, dtype=np.int64)
+        self.size = len(self.ids)
+        self.type = _codes(types, _TYPE_CODES)
+        self.season = _codes(seasons, _SEASON_CODES)
+        self.physical = _codes(physical, _PHYSICAL_CODES)
+        self.price = _codes(prices, _PRICE_CODES)
+        self.cost = _floats(cost)
+        self.duration = _floats(duration)
+        self.rating = np.nan_to_num(_floats(rating), nan=0.0)
+        self.lat = _floats(lat)
+        self.lon = _floats(lon)
+
+        # порядок SQL-пути при равном pref_score: -rating0, -usage_count,
+        # base_cost, name (NULL-стоимость в PostgreSQL при ASC идёт последней).
+        # avg_rating и usage_count берутся на момент сборки снапшота
+        cost_key = np.where(np.isnan(self.cost), np.inf, self.cost)
+        usage_key = -np.array(usage, dtype=np.int64)
+        name_rank = np.argsort(np.argsort(np.array(names, dtype=object), kind="stable"), kind="stable")
+        order = np.lexsort((name_rank, cost_key, usage_key, -self.rating))
+        self.base_rank = np.empty(self.size, dtype=np.int64)
+        self.base_rank[order] = np.arange(self.size)
+
+        self.uses_lexemes = uses_lexemes
+        self._build_index(terms)
+
+    def _build_index(self, row_terms: list[set[str]]) -> None:
+        postings: dict[str, list[int]] = {}
+        for i, row in enumerate(row_terms):
+            for term in row:
+                postings.setdefault(term, []).append(i)
+        self.tokens = sorted(postings)
+        self.postings = [np.array(postings[t], dtype=np.int64) for t in self.tokens]
+
+    def term_rows(self, term: str) -> "np.ndarray":
+        i = bisect.bisect_left(self.tokens, term)
+        if i < len(self.tokens) and self.tokens[i] == term:
+            return self.postings[i]
+        return np.empty(0, dtype=np.int64)
+
+    def prefix_rows(self, prefix: str) -> "np.ndarray":
+        lo = bisect.bisect_left(self.tokens, prefix)
+        hi = bisect.bisect_left(self.tokens, prefix + "\uffff")
+        if lo == hi:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(self.postings[lo:hi]))
+
+    def substring_rows(self, part: str) -> "np.ndarray":
+        found = [self.postings[i] for i, token in enumerate(self.tokens) if part in token]
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(found))
+
+    def _interest_rows(self, profile) -> list["np.ndarray"]:
+        tokens = interest_tokens(profile.interests)
+        if self.uses_lexemes:
+            return [
+                self.prefix_rows(term) if prefix else self.term_rows(term)
+                for term, prefix in interest_terms(interest_lexemes(tokens))
+            ]
+        return [self.substring_rows(t) for t in tokens]
+
+    # --- фильтры и оценка ---
+
+    def _mask(self, profile) -> "np.ndarray":
+        seasons, allowed, price_levels = profile_constraints(profile)
+        mask = np.isin(self.season, [_SEASON_CODES[s] for s in seasons if s in _SEASON_CODES])
+        mask &= np.isin(self.physical, [_PHYSICAL_CODES[p] for p in allowed])
+        if price_levels is not None:
+            mask &= np.isin(self.price, [_PRICE_CODES[p] for p in price_levels])
+        return mask
+
+    def _scores(self, profile) -> "np.ndarray":
+        score = np.zeros(self.size, dtype=np.float64)
+
+        preferred = STYLE_TO_TYPES.get(profile.travel_style, [])
+        if preferred:
+            score += np.where(np.isin(self.type, [_TYPE_CODES[t] for t in preferred]), 3.0, 0.0)
+
+        interest_rows = self._interest_rows(profile)
+        if interest_rows:
+            # как в SQL-пути: совпадение даёт 1, плюс доля совпавших интересов
+            # вместо ts_rank
+            hits = np.zeros(self.size, dtype=np.float64)
+            for rows in interest_rows:
+                hits[rows] += 1.0
+            score += np.where(hits > 0, 1.0 + hits / len(interest_rows), 0.0)
+
+        return score
+
+    def rank(self, profile, limit: int) -> list[int]:
+        """id лучших `limit` POI в том же порядке, что и apply_profile_preferences."""
+        if profile is None:
+            rows = np.arange(self.size)
+            score = np.zeros(self.size)
+        else:
+            rows = np.flatnonzero(self._mask(profile))
+            score = self._scores(profile)[rows]
+
+        if not len(rows):
+            return []
+
+        # (-pref_score, base_rank) одним целым ключом: argpartition + сортировка k
+        key = -np.round(score * _SCORE_SCALE).astype(np.int64) * self.size + self.base_rank[rows]
+        k = min(limit, len(rows))
+        top = np.argpartition(key, k - 1)[:k] if k < len(rows) else np.arange(len(rows))
+        top = top[np.argsort(key[top], kind="stable")]
+        return self.ids[rows[top]].tolist()
+
+    def max_points_per_day(self, hours_per_day: float = 8.0) -> int:
+        durations = self.duration[~np.isnan(self.duration) & (self.duration > 0)]
+        shortest = float(durations.min()) if len(durations) else 2.0
+        return int(hours_per_day // shortest) + 1
+
+
+def _load(version: int) -> PoiCatalog:
+    # на PostgreSQL нужен только search_vector (лексемы уже посчитаны),
+    # тексты описаний из базы не читаются
+    uses_lexemes = connection.vendor == "postgresql"
+    text_fields = ("search_vector",) if uses_lexemes else _TEXT_FIELDS
+    width = len(_FIELDS)
+
+    rows, terms = [], []
+    qs = Poi.objects.order_by("id").values_list(*_FIELDS, *text_fields)
+    for row in qs.iterator(chunk_size=2000):
+        rows.append(row[:width])
+        terms.append(_lexemes(row[width]) if uses_lexemes else _words(row[width:]))
+    return PoiCatalog(version, rows, terms, uses_lexemes=uses_lexemes)
+
+
+def _is_current(catalog: Optional[PoiCatalog], version: int) -> bool:
+    if catalog is None or catalog.version != version:
+        return False
+    return time.monotonic() - catalog.built_at < getattr(settings, "ROUTE_TEMPLATE_TIMEOUT", 60 * 60)
+
+
+def get_poi_catalog() -> PoiCatalog:
+    """Снапшот каталога текущей версии (строится один раз на процесс)."""
+    global _catalog
+    if np is None:
+        raise RuntimeError("numpy не установлен: движок каталога недоступен")
+
+    version = get_catalog_version()
+    catalog = _catalog
+    if _is_current(catalog, version):
+        return catalog
+
+    with _lock:
+        if not _is_current(_catalog, version):
+            _catalog = _load(version)
+        return _catalog
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from .keyset import KeysetPage, KeysetPaginator
+from .poi_ratings import RATING_VALUES
+from ..models import Poi, PoiPhoto, Review
+
+# Отзывы и фото на странице POI листаются порциями по курсору;
+# индексы (poi, -created_at, -id) покрывают и фильтр, и сортировку.
+REVIEWS_PAGE_SIZE = 10
+PHOTOS_PAGE_SIZE = 9
+NEWEST_FIRST = [("created_at", True), ("id", True)]
+
+
+def reviews_page(poi_id: int, *, after: Optional[str] = None) -> KeysetPage:
+    qs = Review.objects.filter(poi_id=poi_id).select_related("user")
+    return KeysetPaginator(qs, NEWEST_FIRST, REVIEWS_PAGE_SIZE).page(after=after)
+
+
+def photos_page(poi_id: int, *, after: Optional[str] = None) -> KeysetPage:
+    qs = PoiPhoto.objects.filter(poi_id=poi_id)
+    return KeysetPaginator(qs, NEWEST_FIRST, PHOTOS_PAGE_SIZE).page(after=after)
+
+
+def user_review(poi: Poi, user) -> Optional[Review]:
+    """Свой отзыв пользователя — один запрос по уникальному индексу (user, poi)."""
+    if not user.is_authenticated:
+        return None
+    return Review.objects.filter(user=user, poi=poi).first()
+
+
+def rating_summary(poi: Poi) -> dict:
+    """Сводка по счётчикам Poi (rating_*), без обращения к отзывам."""
+    total = poi.rating_count
+    distribution = []
+    for value in reversed(RATING_VALUES):
+        count = getattr(poi, f"rating_{value}")
+        distribution.append({
+            "rating": value,
+            "count": count,
+            "percent": round(100 * count / total) if total else 0,
+        })
+    return {"count": total, "avg": poi.avg_rating, "distribution": distribution}
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, QuerySet
+
+from .catalog_version import get_catalog_version
+from .keyset import KeysetPage, KeysetPaginator, cached_count, decode_cursor, encode_cursor, keyset_ordering
+from .poi_search import catalog_ordering, filter_region, search_pois
+from ..models import Poi
+
+# Фасеты каталога (poi_list). Всё кешируется по нормализованной сигнатуре
+# фильтра и версии каталога: правка или удаление Poi поднимает CatalogVersion,
+# и старые ключи просто перестают читаться.
+
+FILTER_FIELDS = ("q", "type", "region", "season", "price_level", "physical_level")
+CHOICE_FACETS = ("type", "season", "price_level", "physical_level")
+REGION_FACET_LIMIT = 20
+
+
+def normalize_filters(cleaned_data: Optional[dict]) -> dict:
+    filters = {}
+    for name in FILTER_FIELDS:
+        value = " ".join(str((cleaned_data or {}).get(name) or "").split())
+        if name in ("q", "region"):
+            value = value.lower()
+        if value:
+            filters[name] = value
+    return filters
+
+
+def _signature(filters: dict) -> str:
+    raw = json.dumps(filters, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _cache_key(part: str, filters: dict) -> str:
+    return f"tours:facets:v{get_catalog_version()}:{part}:{_signature(filters)}"
+
+
+def _timeout() -> int:
+    return getattr(settings, "POI_FACETS_CACHE_TIMEOUT", 3600)
+
+
+def apply_filters(qs: QuerySet, filters: dict) -> QuerySet:
+    if filters.get("q"):
+        qs = search_pois(qs, filters["q"])
+    if filters.get("region"):
+        qs = filter_region(qs, filters["region"])
+    for name in CHOICE_FACETS:
+        if filters.get(name):
+            qs = qs.filter(**{name: filters[name]})
+    return qs
+
+
+def _compute_facets(filters: dict) -> dict:
+    # для каждого фасета его собственный фильтр не применяется:
+    # счётчики показывают, сколько будет, если выбрать другое значение
+    facets = {}
+    for name in CHOICE_FACETS:
+        others = {k: v for k, v in filters.items() if k != name}
+        rows = apply_filters(Poi.objects.all(), others).order_by().values(name).annotate(n=Count("id"))
+        facets[name] = {row[name]: row["n"] for row in rows}
+
+    others = {k: v for k, v in filters.items() if k != "region"}
+    rows = (
+        apply_filters(Poi.objects.exclude(region=""), others)
+        .order_by().values("region").annotate(n=Count("id")).order_by("-n", "region")[:REGION_FACET_LIMIT]
+    )
+    facets["region"] = [(row["region"], row["n"]) for row in rows]
+    return facets
+
+
+def get_facet_counts(filters: dict) -> dict:
+    """{фасет: {значение: число}}, для region — список (значение, число)."""
+    key = _cache_key("counts", filters)
+    facets = cache.get(key)
+    if facets is None:
+        facets = _compute_facets(filters)
+        cache.set(key, facets, _timeout())
+    return facets
+
+
+def get_result_ids(filters: dict) -> Optional[list[int]]:
+    """
+    Упорядоченные id выдачи. None — выдача больше POI_FACETS_MAX_IDS,
+    такой список не кешируется и страница идёт обычным keyset-запросом.
+    """
+    key = _cache_key("ids", filters)
+    ids = cache.get(key)
+    if ids is None:
+        limit = getattr(settings, "POI_FACETS_MAX_IDS", 5000)
+        qs, keys = catalog_ordering(apply_filters(Poi.objects.all(), filters))
+        ids = list(qs.order_by(*keyset_ordering(keys)).values_list("id", flat=True)[: limit + 1])
+        if len(ids) > limit:
+            ids = False
+        cache.set(key, ids, _timeout())
+    return None if ids is False else ids
+
+
+def _page_from_ids(ids: list[int], per_page: int, after: Optional[str], before: Optional[str]) -> KeysetPage:
+    # курсор — id крайнего POI страницы, позиция ищется в закешированном списке
+    position = {pk: i for i, pk in enumerate(ids)}
+    start = 0
+    cursor_fields = {"id": Poi._meta.pk}
+    after_id = decode_cursor(after, cursor_fields) if after else None
+    before_id = decode_cursor(before, cursor_fields) if before and not after_id else None
+    if after_id and after_id[0] in position:
+        start = position[after_id[0]] + 1
+    elif before_id and before_id[0] in position:
+        start = max(0, position[before_id[0]] - per_page)
+
+    page_ids = ids[start:start + per_page]
+    objects = Poi.objects.in_bulk(page_ids)
+    rows = [objects[pk] for pk in page_ids if pk in objects]
+    return KeysetPage(
+        object_list=rows,
+        has_next=start + per_page < len(ids),
+        has_previous=start > 0,
+        next_cursor=encode_cursor({"id": page_ids[-1]}) if page_ids else None,
+        previous_cursor=encode_cursor({"id": page_ids[0]}) if page_ids else None,
+        total=len(ids),
+    )
+
+
+def get_catalog_page(
+    filters: dict, per_page: int, *, after: Optional[str] = None, before: Optional[str] = None
+) -> KeysetPage:
+    ids = get_result_ids(filters)
+    if ids is not None:
+        return _page_from_ids(ids, per_page, after, before)
+
+    qs = apply_filters(Poi.objects.all(), filters)
+    total = cached_count(qs, namespace=f"poi_list:v{get_catalog_version()}")
+    qs, keys = catalog_ordering(qs)
+    page = KeysetPaginator(qs, keys, per_page).page(after=after, before=before)
+    page.total = total
+    return page
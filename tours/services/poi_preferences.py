@@ -1,11 +1,17 @@
 from __future__ import annotations
 
+import re
+from functools import lru_cache
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
 from django.db.models import (
-    Q, Case, When, Value, IntegerField, F, ExpressionWrapper,
+    Q, Case, When, Value, IntegerField, FloatField, F, ExpressionWrapper,
 )
 from django.db.models.functions import Coalesce
 
 from ..models import (
+    Poi,
     Season,
     PhysicalLevel,
     PriceLevel,
@@ -27,15 +33,57 @@ PHYSICAL_ALLOWED: dict[str, list[str]] = {
     PhysicalLevel.HARD: [PhysicalLevel.EASY, PhysicalLevel.MEDIUM, PhysicalLevel.HARD],
 }
 
+# интересы: основы длиннее STEM_PREFIX_MIN ищутся префиксом (см. interest_terms)
+STEM_PREFIX_MIN = 5
+STEM_PREFIX_CUT = 3
 
-def _interest_q(interests: str | None) -> Q | None:
-    if not interests:
-        return None
-    raw = [t.strip() for t in interests.replace(",", " ").split()]
-    tokens = [t for t in raw if len(t) >= 3][:3]
-    if not tokens:
-        return None
 
+def interest_tokens(interests: str | None) -> list[str]:
+    if not interests:
+        return []
+    raw = re.findall(r"\w+", interests.lower())
+    return list(dict.fromkeys(t for t in raw if len(t) >= 3))
+
+
+@lru_cache(maxsize=1024)
+def _russian_lexemes(token: str) -> tuple[str, ...]:
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT tsvector_to_array(to_tsvector('russian', %s))", [token])
+        return tuple(cursor.fetchone()[0])
+
+
+def interest_lexemes(tokens: list[str]) -> list[str]:
+    """Основы russian-словаря для интересов (только PostgreSQL); стоп-слова выпадают."""
+    lexemes = (lexeme for t in tokens for lexeme in _russian_lexemes(t))
+    return list(dict.fromkeys(lexemes))
+
+
+def interest_terms(lexemes: list[str]) -> list[tuple[str, bool]]:
+    """
+    (терм, префикс?) для поиска по search_vector. Словообразование Snowball
+    не сводит к одной основе («шаманизм» -> 'шаманизм', «шаманская» ->
+    'шаманск'), поэтому длинные основы ищутся префиксом без последних
+    STEM_PREFIX_CUT букв ('шаман':*). Короткие — только целиком: 'гор':*
+    совпал бы с «город» и «горячий».
+    """
+    terms: dict[str, bool] = {}
+    for lexeme in lexemes:
+        if len(lexeme) > STEM_PREFIX_MIN:
+            terms[lexeme[:max(STEM_PREFIX_MIN, len(lexeme) - STEM_PREFIX_CUT)]] = True
+        else:
+            terms.setdefault(lexeme, False)
+    return list(terms.items())
+
+
+def _interest_query(terms: list[tuple[str, bool]]) -> SearchQuery:
+    # термы — уже основы russian-словаря, поэтому запрос в simple: повторно
+    # их не стеммить
+    raw = " | ".join("'{}'{}".format(term.replace("'", "''"), ":*" if prefix else "") for term, prefix in terms)
+    return SearchQuery(raw, config="simple", search_type="raw")
+
+
+def _interest_q(tokens: list[str]) -> Q:
+    # без PostgreSQL: подстроки по тем же полям, что и в search_vector
     q = Q()
     for t in tokens:
         q |= (
@@ -47,16 +95,48 @@ def _interest_q(interests: str | None) -> Q | None:
     return q
 
 
-def apply_profile_preferences(qs, profile):
-    qs = qs.filter(season__in=[profile.preferred_season, Season.YEAR_ROUND])
+def _interest_score(tokens: list[str]):
+    if not tokens:
+        return Value(0.0, output_field=FloatField())
+
+    if connection.vendor == "postgresql":
+        terms = interest_terms(interest_lexemes(tokens))
+        if not terms:
+            return Value(0.0, output_field=FloatField())
+        # совпавшие POI — отдельным подзапросом search_vector @@ query, его
+        # обслуживает GIN-индекс; внутри ORDER BY индекс не работает
+        query = _interest_query(terms)
+        matched = Poi.objects.filter(search_vector=query).values("pk")
+        return Case(
+            When(pk__in=matched, then=Value(1.0) + SearchRank(F("search_vector"), query)),
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+
+    return Case(
+        When(_interest_q(tokens), then=Value(1.0)),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )
+
+
+def profile_constraints(profile) -> tuple[list[str], list[str], list[str] | None]:
+    """Допустимые сезоны, уровни сложности и уровни цен (None — любые)."""
+    seasons = [profile.preferred_season, Season.YEAR_ROUND]
 
     allowed = PHYSICAL_ALLOWED.get(profile.physical_level, PHYSICAL_ALLOWED[PhysicalLevel.MEDIUM])
     if profile.with_children:
         allowed = [PhysicalLevel.EASY]
-    qs = qs.filter(physical_level__in=allowed)
 
-    if profile.budget_level == PriceLevel.LOW:
-        qs = qs.filter(price_level__in=[PriceLevel.LOW, PriceLevel.MEDIUM])
+    price_levels = [PriceLevel.LOW, PriceLevel.MEDIUM] if profile.budget_level == PriceLevel.LOW else None
+    return seasons, allowed, price_levels
+
+
+def apply_profile_preferences(qs, profile):
+    seasons, allowed, price_levels = profile_constraints(profile)
+    qs = qs.filter(season__in=seasons, physical_level__in=allowed)
+    if price_levels is not None:
+        qs = qs.filter(price_level__in=price_levels)
 
     preferred_types = STYLE_TO_TYPES.get(profile.travel_style, [])
     style_score = (
@@ -69,16 +149,7 @@ def apply_profile_preferences(qs, profile):
         else Value(0, output_field=IntegerField())
     )
 
-    interest_q = _interest_q(profile.interests)
-    interest_score = (
-        Case(
-            When(interest_q, then=Value(1)),
-            default=Value(0),
-            output_field=IntegerField(),
-        )
-        if interest_q
-        else Value(0, output_field=IntegerField())
-    )
+    interest_score = _interest_score(interest_tokens(profile.interests))
 
     qs = qs.annotate(rating0=Coalesce("avg_rating", Value(0.0)))
 
@@ -88,8 +159,9 @@ def apply_profile_preferences(qs, profile):
     ).annotate(
         pref_score=ExpressionWrapper(
             F("style_score") + F("interest_score"),
-            output_field=IntegerField(),
+            output_field=FloatField(),
         )
     )
 
-    return qs.order_by("-pref_score", "-rating0", "base_cost", "name")
+    # при равных оценке и рейтинге выше то, что чаще берут в маршруты
+    return qs.order_by("-pref_score", "-rating0", "-usage_count", "base_cost", "name")
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+from typing import Optional
+
+from django.db.models import Case, Count, F, FloatField, IntegerField, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce
+
+from .catalog_version import bump_catalog_version
+from ..models import Poi, Review
+
+RATING_VALUES = (1, 2, 3, 4, 5)
+
+
+def apply_review_change(poi_id: int, old_rating: Optional[int], new_rating: Optional[int]) -> None:
+    """
+    Сдвигает счётчики POI одним UPDATE: old_rating=None — отзыв создан,
+    new_rating=None — удалён. Правая часть считается по старым значениям
+    строки, поэтому параллельные отзывы не перетирают друг друга.
+    Версию каталога не меняет (см. ROUTE_TEMPLATE_TIMEOUT в settings).
+    """
+    if old_rating == new_rating:
+        return
+
+    d_sum = (new_rating or 0) - (old_rating or 0)
+    d_count = (new_rating is not None) - (old_rating is not None)
+
+    new_sum = F("rating_sum") + d_sum
+    new_count = F("rating_count") + d_count
+    fields = {
+        "rating_sum": new_sum,
+        "rating_count": new_count,
+        "avg_rating": Case(
+            When(rating_count__gt=-d_count, then=Cast(new_sum, FloatField()) / new_count),
+            default=Value(None),
+            output_field=FloatField(),
+        ),
+    }
+    if old_rating is not None:
+        fields[f"rating_{old_rating}"] = F(f"rating_{old_rating}") - 1
+    if new_rating is not None:
+        fields[f"rating_{new_rating}"] = F(f"rating_{new_rating}") + 1
+
+    Poi.objects.filter(pk=poi_id).update(**fields)
+
+
+def recount_poi_ratings(qs=None) -> int:
+    """
+    Пересчёт всех счётчиков по таблице Review одним UPDATE с
+    коррелированными подзапросами (после bulk-операций и ручных правок).
+    """
+    qs = Poi.objects.all() if qs is None else qs
+
+    def review_agg(aggregate):
+        return Coalesce(
+            Subquery(
+                Review.objects.filter(poi=OuterRef("pk"))
+                .order_by().values("poi").annotate(v=aggregate).values("v")[:1],
+                output_field=IntegerField(),
+            ),
+            Value(0),
+        )
+
+    fields = {
+        "rating_sum": review_agg(Sum("rating")),
+        "rating_count": review_agg(Count("id")),
+        "avg_rating": Subquery(
+            Review.objects.filter(poi=OuterRef("pk"))
+            .order_by().values("poi").annotate(v=Cast(Sum("rating"), FloatField()) / Count("id")).values("v")[:1],
+            output_field=FloatField(),
+        ),
+    }
+    for value in RATING_VALUES:
+        fields[f"rating_{value}"] = review_agg(Count("id", filter=Q(rating=value)))
+
+    updated = qs.update(**fields)
+    bump_catalog_version()
+    return updated
+
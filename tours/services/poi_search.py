@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+from django.contrib.postgres.search import SearchVector, TrigramSimilarity, TrigramWordSimilarity
+from django.db import connection
+from django.db.models import Case, FloatField, IntegerField, Q, QuerySet, Value, When
+from django.db.models.functions import Coalesce, Upper
+
+from ..models import Poi
+
+# поля, которые попадают в Poi.search_vector
+SEARCH_VECTOR_FIELDS = ("name", "short_description", "region", "detailed_description")
+
+AUTOCOMPLETE_LIMIT = 10
+AUTOCOMPLETE_MIN_LENGTH = 2
+
+
+def _normalize(query: str) -> str:
+    return " ".join((query or "").split())
+
+
+def _postgres_qs(q: str):
+    # Все условия идут по UPPER(name) — его покрывает GIN-индекс poi_name_upper_trgm
+    # (gin_trgm_ops): и префикс, и подстрока, и похожесть с опечатками.
+    return (
+        Poi.objects
+        .annotate(uname=Upper("name"))
+        .filter(Q(uname__contains=q) | Q(uname__trigram_similar=q))
+        .annotate(
+            is_prefix=Case(When(uname__startswith=q, then=Value(1)), default=Value(0), output_field=IntegerField()),
+            similarity=TrigramSimilarity("uname", q),
+        )
+        .order_by("-is_prefix", "-similarity", "name")
+    )
+
+
+def _fallback_qs(query: str):
+    # SQLite и прочие: без триграмм, только префикс и подстрока
+    return (
+        Poi.objects
+        .filter(name__icontains=query)
+        .annotate(
+            is_prefix=Case(When(name__istartswith=query, then=Value(1)), default=Value(0), output_field=IntegerField()),
+        )
+        .order_by("-is_prefix", "name")
+    )
+
+
+def autocomplete_pois(query: str, *, limit: int = AUTOCOMPLETE_LIMIT) -> list[dict]:
+    """Топ-k POI по названию: сначала совпадения по началу, затем по похожести."""
+    q = _normalize(query)
+    if len(q) < AUTOCOMPLETE_MIN_LENGTH:
+        return []
+
+    qs = _postgres_qs(q.upper()) if _is_postgres() else _fallback_qs(q)
+    type_labels = dict(Poi._meta.get_field("type").choices)
+    return [
+        {"id": pk, "name": name, "type": type_labels.get(poi_type, poi_type)}
+        for pk, name, poi_type in qs.values_list("id", "name", "type")[:limit]
+    ]
+
+
+# --- поиск в каталоге (poi_list) ---
+#
+# На PostgreSQL условия идут по UPPER(name / short_description / region),
+# их покрывают GIN-индексы gin_trgm_ops: подстрока (LIKE '%..%') и похожесть
+# слова с опечатками (оператор %>) обслуживаются индексом, без seq scan.
+
+
+def _is_postgres() -> bool:
+    return connection.vendor == "postgresql"
+
+
+def search_pois(qs: QuerySet, query: str) -> QuerySet:
+    """
+    Фильтр по названию и краткому описанию с оценкой релевантности
+    в аннотации search_rank (название весит больше описания).
+    """
+    q = _normalize(query)
+    if not q:
+        return qs
+
+    if _is_postgres():
+        uq = q.upper()
+        return (
+            qs.annotate(uname=Upper("name"), udesc=Upper("short_description"))
+            .filter(
+                Q(uname__contains=uq)
+                | Q(udesc__contains=uq)
+                | Q(uname__trigram_word_similar=uq)
+                | Q(udesc__trigram_word_similar=uq)
+            )
+            .annotate(
+                search_rank=TrigramWordSimilarity(uq, "uname") + TrigramWordSimilarity(uq, "udesc") * 0.5,
+            )
+        )
+
+    return (
+        qs.filter(Q(name__icontains=q) | Q(short_description__icontains=q))
+        .annotate(
+            search_rank=Case(
+                When(name__icontains=q, then=Value(1.0)), default=Value(0.5), output_field=FloatField()
+            ),
+        )
+    )
+
+
+def filter_region(qs: QuerySet, region: str) -> QuerySet:
+    region = _normalize(region)
+    if not region:
+        return qs
+
+    if _is_postgres():
+        ur = region.upper()
+        return (
+            qs.annotate(uregion=Upper("region"))
+            .filter(Q(uregion__contains=ur) | Q(uregion__trigram_word_similar=ur))
+        )
+    return qs.filter(region__icontains=region)
+
+
+# NULL-стоимость сортируется последней, как ASC в PostgreSQL
+_NO_COST = 2**31 - 1
+
+
+def catalog_ordering(qs: QuerySet) -> tuple[QuerySet, list[tuple[str, bool]]]:
+    """
+    Ключи сортировки каталога для KeysetPaginator: (-avg_rating, base_cost,
+    name, id), при поиске первым идёт -search_rank. NULL сведены к значениям
+    через Coalesce, чтобы курсор сравнивался обычными < / >.
+    """
+    qs = qs.annotate(
+        rating_key=Coalesce("avg_rating", Value(0.0)),
+        cost_key=Coalesce("base_cost", Value(_NO_COST)),
+    )
+    keys = [("rating_key", True), ("cost_key", False), ("name", False), ("id", False)]
+    if "search_rank" in qs.query.annotations:
+        keys.insert(0, ("search_rank", True))
+    return qs, keys
+
+
+# --- полнотекстовый вектор Poi.search_vector ---
+
+
+def poi_search_vector() -> SearchVector:
+    return (
+        SearchVector("name", weight="A", config="russian")
+        + SearchVector("short_description", weight="B", config="russian")
+        + SearchVector("region", weight="B", config="russian")
+        + SearchVector("detailed_description", weight="C", config="russian")
+    )
+
+
+def update_poi_search_vectors(qs: QuerySet) -> int:
+    """Пересчитывает вектор одним UPDATE (нужно и после bulk_create / update)."""
+    if not _is_postgres():
+        return 0
+    return qs.update(search_vector=poi_search_vector())
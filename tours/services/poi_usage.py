@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from collections import Counter
+from typing import Iterable
+
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from ..models import Poi, RoutePoint
+
+# Poi.usage_count меняется вместе с RoutePoint: одиночные create/delete
+# ловят сигналы, массовые вставки (bulk_create в конструкторе маршрута)
+# вызывают add_poi_usage сами. CatalogVersion не трогаем (см.
+# ROUTE_TEMPLATE_TIMEOUT в settings).
+
+
+def add_poi_usage(poi_ids: Iterable[int], sign: int = 1) -> None:
+    """Сдвигает usage_count на число вхождений id; один UPDATE на каждую кратность."""
+    by_times: dict[int, list[int]] = {}
+    for poi_id, times in Counter(poi_ids).items():
+        by_times.setdefault(times, []).append(poi_id)
+    for times, ids in by_times.items():
+        Poi.objects.filter(pk__in=ids).update(usage_count=F("usage_count") + sign * times)
+
+
+def recount_poi_usage(qs=None) -> int:
+    """Пересчёт usage_count по RoutePoint одним UPDATE (после ручных правок в БД)."""
+    qs = Poi.objects.all() if qs is None else qs
+    uses = (
+        RoutePoint.objects.filter(poi=OuterRef("pk"))
+        .order_by().values("poi").annotate(n=Count("id")).values("n")[:1]
+    )
+    return qs.update(usage_count=Coalesce(Subquery(uses, output_field=IntegerField()), Value(0)))
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import re
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+
+from .keyset import keyset_ordering
+from .poi_detail import NEWEST_FIRST
+from .poi_facets import apply_filters
+from .poi_preferences import apply_profile_preferences
+from .poi_search import autocomplete_pois, catalog_ordering
+from .route_history import history_window_start
+from .route_queries import HISTORY_KEYS, get_user_history, get_user_routes
+from ..models import Poi, Review, Route, RouteGeneration, RoutePoint, Season, UserProfile
+
+# Реестр горячих запросов сервисов для команды explain_hot_queries:
+# имя -> фабрика QuerySet по образцовым данным из текущей БД.
+
+_SCAN_RE = re.compile(
+    r"(Index Only Scan|Index Scan|Bitmap Index Scan|Seq Scan)(?: Backward)?(?: using (\S+))?(?: on (\S+))?"
+)
+_SQLITE_RE = re.compile(r"(SCAN|SEARCH) (\S+)(?: USING (?:COVERING )?INDEX (\S+))?")
+_EXECUTION_RE = re.compile(r"Execution Time: ([\d.]+) ms")
+
+
+@dataclass
+class Sample:
+    user: object
+    profile: Optional[UserProfile]
+    route: Optional[Route]
+    poi: Optional[Poi]
+
+
+@dataclass
+class QueryReport:
+    name: str
+    sql_ms: float
+    rows: int
+    # время исполнения по EXPLAIN ANALYZE (только PostgreSQL)
+    db_ms: Optional[float] = None
+    scans: list[str] = field(default_factory=list)
+    seq_scans: list[str] = field(default_factory=list)
+    plan: str = ""
+    error: str = ""
+
+
+def _sample() -> Sample:
+    route = Route.objects.order_by("-created_at").first()
+    user = route.user if route else get_user_model().objects.order_by("pk").first()
+    profile = UserProfile.objects.filter(user=user).first() if user else None
+    poi = Poi.objects.order_by("-usage_count").first()
+    return Sample(user=user, profile=profile, route=route, poi=poi)
+
+
+def _catalog_page(filters: dict):
+    qs, keys = catalog_ordering(apply_filters(Poi.objects.all(), filters))
+    return qs.order_by(*keyset_ordering(keys))[:13]
+
+
+HOT_QUERIES: dict[str, Callable[[Sample], object]] = {
+    "my_routes": lambda s: get_user_routes(s.user)[:50],
+    "history_page": lambda s: get_user_history(s.user).order_by(*keyset_ordering(HISTORY_KEYS))[:21],
+    "history_count": lambda s: RouteGeneration.objects.filter(user=s.user, created_at__gte=history_window_start()),
+    "route_snapshot_points": lambda s: (
+        RoutePoint.objects.filter(route=s.route).select_related("poi")
+        .order_by("day_number", "order_index", "id")
+    ),
+    "route_day_points": lambda s: (
+        RoutePoint.objects.filter(route=s.route, day_number=1).order_by("order_index", "id")
+    ),
+    "profile_ranking": lambda s: apply_profile_preferences(Poi.objects.all(), s.profile)[:60],
+    "catalog_first_page": lambda s: _catalog_page({}),
+    "catalog_filtered_page": lambda s: _catalog_page({"season": Season.SUMMER}),
+    "catalog_search_page": lambda s: _catalog_page({"q": (s.poi.name.split() or ["озеро"])[0]}),
+    "poi_reviews_page": lambda s: (
+        Review.objects.filter(poi=s.poi).select_related("user").order_by(*keyset_ordering(NEWEST_FIRST))[:11]
+    ),
+    "poi_top_usage": lambda s: Poi.objects.filter(usage_count__gt=0).order_by("-usage_count", "name")[:10],
+}
+
+# автодополнение возвращает список, а не QuerySet — меряем только время
+TIMED_CALLS: dict[str, Callable[[Sample], object]] = {
+    "autocomplete": lambda s: autocomplete_pois(s.poi.name[:4]),
+}
+
+
+def _scans(plan: str) -> tuple[list[str], list[str]]:
+    scans, seq = [], []
+    if connection.vendor == "postgresql":
+        for kind, index, table in _SCAN_RE.findall(plan):
+            label = f"{kind} {index or table}".strip()
+            scans.append(label)
+            if kind == "Seq Scan":
+                seq.append(table)
+    elif connection.vendor == "sqlite":
+        for kind, table, index in _SQLITE_RE.findall(plan):
+            scans.append(f"{kind} {table}" + (f" USING {index}" if index else ""))
+            if kind == "SCAN" and not index:
+                seq.append(table)
+    return scans, seq
+
+
+def explain_hot_queries(*, analyze: bool = True, only: Optional[list[str]] = None) -> list[QueryReport]:
+    sample = _sample()
+    if sample.user is None or sample.poi is None:
+        return []
+
+    reports = []
+    for name, factory in HOT_QUERIES.items():
+        if only and name not in only:
+            continue
+        if name.startswith("route_") and sample.route is None:
+            continue
+        if name == "profile_ranking" and sample.profile is None:
+            continue
+        try:
+            qs = factory(sample)
+            options = {"analyze": True} if analyze and connection.vendor == "postgresql" else {}
+            plan = qs.explain(**options)
+            start = time.perf_counter()
+            rows = len(list(qs))
+            elapsed = (time.perf_counter() - start) * 1000.0
+        except Exception as exc:
+            reports.append(QueryReport(name=name, sql_ms=0.0, rows=0, error=str(exc)))
+            continue
+        scans, seq = _scans(plan)
+        executed = _EXECUTION_RE.search(plan)
+        reports.append(QueryReport(
+            name=name,
+            sql_ms=elapsed,
+            rows=rows,
+            db_ms=float(executed.group(1)) if executed else None,
+            scans=scans,
+            seq_scans=seq,
+            plan=plan,
+        ))
+
+    for name, call in TIMED_CALLS.items():
+        if only and name not in only:
+            continue
+        start = time.perf_counter()
+        rows = len(call(sample))
+        reports.append(QueryReport(name=name, sql_ms=(time.perf_counter() - start) * 1000.0, rows=rows))
+
+    return reports
@@ -0,0 +1,161 @@
+from __future__ import annotations
+
+import math
+from typing import Callable, Optional
+
+from .geo import haversine_km
+from .route_builder import BEST_VARIANT, HOURS_PER_DAY, RoutePlan, candidate_pool, pack_route
+from ..models import Poi
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+# Несколько вариантов маршрута за один подбор: кандидаты берутся одним
+# запросом (candidate_pool), матрица расстояний между ними считается один
+# раз, а стратегии только переставляют этот пул и раскладывают его по дням.
+# Варианты считаются по очереди: это чистый Python под GIL, потоки его не
+# ускоряют.
+
+VARIANT_LABELS = {
+    BEST_VARIANT: "Лучшее по профилю",
+    "compact": "Меньше переездов",
+    "budget": "Экономный",
+    "clusters": "По районам",
+    "rating": "Высокий рейтинг",
+}
+
+Matrix = list[list[float]]
+
+
+def _hours(poi: Poi) -> float:
+    return float(poi.visit_duration_hours or 2.0)
+
+
+def _coords(poi: Poi) -> Optional[tuple[float, float]]:
+    if poi.latitude is None or poi.longitude is None:
+        return None
+    return float(poi.latitude), float(poi.longitude)
+
+
+def distance_matrix(pool: list[Poi]) -> Matrix:
+    """Попарные расстояния (км) по прямой; inf — у POI нет координат."""
+    coords = [_coords(p) for p in pool]
+    n = len(pool)
+    if np is not None and n:
+        lat = np.radians([c[0] if c else np.nan for c in coords])
+        lon = np.radians([c[1] if c else np.nan for c in coords])
+        dlat = lat[:, None] - lat[None, :]
+        dlon = lon[:, None] - lon[None, :]
+        a = np.sin(dlat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlon / 2) ** 2
+        km = 2 * 6371.0 * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+        return np.nan_to_num(km, nan=math.inf).tolist()
+
+    matrix = [[math.inf] * n for _ in range(n)]
+    for i in range(n):
+        if coords[i] is None:
+            continue
+        matrix[i][i] = 0.0
+        for j in range(i + 1, n):
+            if coords[j] is not None:
+                matrix[i][j] = matrix[j][i] = haversine_km(*coords[i], *coords[j])
+    return matrix
+
+
+# --- стратегии: (пул, матрица, дней) -> порядок индексов пула ---
+
+
+def _by_rank(pool: list[Poi], dist: Matrix, days_count: int) -> list[int]:
+    return list(range(len(pool)))
+
+
+def _cheapest_first(pool: list[Poi], dist: Matrix, days_count: int) -> list[int]:
+    # сортировка устойчивая: при равной цене сохраняется порядок профиля
+    return sorted(range(len(pool)), key=lambda i: pool[i].base_cost or 0)
+
+
+def _top_rated_first(pool: list[Poi], dist: Matrix, days_count: int) -> list[int]:
+    return sorted(range(len(pool)), key=lambda i: -(pool[i].avg_rating or 0.0))
+
+
+def _nearest_chain(pool: list[Poi], dist: Matrix, days_count: int) -> list[int]:
+    """От лучшего POI каждый раз к ближайшему непосещённому."""
+    if not pool:
+        return []
+    left = list(range(1, len(pool)))
+    order = [0]
+    while left:
+        last = order[-1]
+        nxt = min(left, key=lambda i: (dist[last][i], i))
+        left.remove(nxt)
+        order.append(nxt)
+    return order
+
+
+def _day_clusters(pool: list[Poi], dist: Matrix, days_count: int) -> list[int]:
+    """
+    День начинается с лучшего свободного POI и добирается ближайшими к нему,
+    пока хоть что-то влезает в день, — раскладка по дням совпадает с кластерами.
+    """
+    left = list(range(len(pool)))
+    order = []
+    for _ in range(days_count):
+        if not left:
+            break
+        seed = left.pop(0)
+        order.append(seed)
+        hours = _hours(pool[seed])
+        while True:
+            fits = [i for i in left if hours + _hours(pool[i]) <= HOURS_PER_DAY]
+            if not fits:
+                break
+            nxt = min(fits, key=lambda i: (dist[seed][i], i))
+            left.remove(nxt)
+            order.append(nxt)
+            hours += _hours(pool[nxt])
+    return order
+
+
+STRATEGIES: dict[str, Callable[[list[Poi], Matrix, int], list[int]]] = {
+    BEST_VARIANT: _by_rank,
+    "compact": _nearest_chain,
+    "budget": _cheapest_first,
+    "clusters": _day_clusters,
+    "rating": _top_rated_first,
+}
+
+
+def plan_route_alternatives(
+        user,
+        days_count: int,
+        max_budget: Optional[int] = None,
+        *,
+        k: int = 4,
+        engine: Optional[str] = None,
+) -> list[RoutePlan]:
+    """
+    До k разных вариантов (первый — обычный подбор по профилю). Варианты,
+    совпавшие по точкам с уже найденными, отбрасываются.
+    """
+    profile = getattr(user, "profile", None)
+    pool = candidate_pool(profile, days_count, engine=engine)
+    dist = distance_matrix(pool)
+
+    def run(variant: str) -> RoutePlan:
+        order = STRATEGIES[variant](pool, dist, days_count)
+        return pack_route((pool[i] for i in order), days_count, max_budget, profile, variant=variant)
+
+    variants = list(STRATEGIES)[:max(1, k)]
+    return unique_plans([run(variant) for variant in variants])
+
+
+def unique_plans(plans: list[RoutePlan]) -> list[RoutePlan]:
+    """Без повторов по (день, POI); порядок вариантов сохраняется."""
+    unique, seen = [], set()
+    for plan in plans:
+        signature = tuple((p.day_number, p.poi.pk) for p in plan.points)
+        if signature not in seen:
+            seen.add(signature)
+            unique.append(plan)
+    return unique
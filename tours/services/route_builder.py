@@ -1,7 +1,15 @@
-from typing import Optional
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Iterable, Optional
 
-from .route_equipment import update_route_equipment
+from django.conf import settings
+from django.db import transaction
+
+from .route_equipment import build_equipment
+from .poi_catalog import get_poi_catalog, numpy_available
 from .poi_preferences import apply_profile_preferences
+from .poi_usage import add_poi_usage
+from .route_snapshot import PoiRecord, PointRecord
 from ..models import (
     Poi,
     Route,
@@ -9,47 +17,101 @@ from ..models import (
 )
 
 
-def build_route_for_user(
-        user,
-        days_count: int,
-        max_budget: Optional[int] = None,
-) -> Route:
-    profile = getattr(user, "profile", None)
+SQL_ENGINE = "sql"
+NUMPY_ENGINE = "numpy"
+
+DEFAULT_ROUTE_NAME = "Индивидуальный маршрут по Тыве"
+HOURS_PER_DAY = 8.0
+
+
+# варианты маршрута (services.route_alternatives) берут кандидатов с запасом:
+# 8 часов в день при посещениях от 0.5 ч
+_POOL_PER_DAY = 16
+
+BEST_VARIANT = "best"
+
 
+def _ranked_pois_sql(profile):
     qs = Poi.objects.all()
     if profile:
-        qs = apply_profile_preferences(qs, profile)
-    else:
-        qs = qs.order_by("-avg_rating", "base_cost")
+        return apply_profile_preferences(qs, profile)
+    return qs.order_by("-avg_rating", "-usage_count", "base_cost")
 
-    route = Route.objects.create(
-        user=user,
-        name="Индивидуальный маршрут по Тыве",
-        days_count=days_count,
+
+def _ranked_pois_numpy(profile, days_count: int, reserve: int = 1) -> list[Poi]:
+    catalog = get_poi_catalog()
+    # больше, чем влезет в маршрут даже из самых коротких посещений
+    ids = catalog.rank(profile, limit=days_count * catalog.max_points_per_day() * reserve)
+    by_id = Poi.objects.in_bulk(ids)
+    return [by_id[pk] for pk in ids if pk in by_id]
+
+
+def _use_numpy(engine: Optional[str]) -> bool:
+    engine = engine or getattr(settings, "ROUTE_BUILDER_ENGINE", SQL_ENGINE)
+    return engine == NUMPY_ENGINE and numpy_available()
+
+
+def candidate_pool(profile, days_count: int, *, engine: Optional[str] = None) -> list[Poi]:
+    """Ранжированные кандидаты с запасом на несколько вариантов — один запрос."""
+    if _use_numpy(engine):
+        return _ranked_pois_numpy(profile, days_count, reserve=2)
+    return list(_ranked_pois_sql(profile)[:days_count * _POOL_PER_DAY])
+
+
+def _poi_record(poi: Poi) -> PoiRecord:
+    return PoiRecord(
+        poi.pk,
+        poi.name,
+        poi.short_description,
+        poi.type,
+        poi.season,
+        poi.physical_level,
+        poi.base_cost,
+        poi.latitude,
+        poi.longitude,
     )
 
+
+@dataclass
+class RoutePlan:
+    """Подобранные точки до записи в БД (черновик или сразу маршрут)."""
+
+    days_count: int
+    points: list[PointRecord]
+    total_duration_hours: int
+    total_cost: Optional[int]
+    equipment: str
+    variant: str = BEST_VARIANT
+
+
+def pack_route(
+        pois: Iterable[Poi],
+        days_count: int,
+        max_budget: Optional[int],
+        profile,
+        *,
+        variant: str = BEST_VARIANT,
+) -> RoutePlan:
+    """Раскладывает POI по дням в заданном порядке (до 8 часов в день, в пределах бюджета)."""
     current_day = 1
     current_hours = 0.0
     order_index = 1
     total_cost = 0
+    points = []
 
-    for poi in qs:
+    for poi in pois:
         visit_hours = float(poi.visit_duration_hours or 2.0)
 
-        if current_hours + visit_hours > 8.0:
+        if current_hours + visit_hours > HOURS_PER_DAY:
             current_day += 1
             current_hours = 0.0
             order_index = 1
             if current_day > days_count:
                 break
 
-        RoutePoint.objects.create(
-            route=route,
-            poi=poi,
-            day_number=current_day,
-            order_index=order_index,
-            visit_time_estimate=visit_hours,
-        )
+        points.append(PointRecord(
+            None, current_day, order_index, "", Decimal(f"{visit_hours:.1f}"), _poi_record(poi)
+        ))
         current_hours += visit_hours
         order_index += 1
 
@@ -59,9 +121,66 @@ def build_route_for_user(
         if max_budget is not None and total_cost > max_budget:
             break
 
-    route.total_duration_hours = int((current_day - 1) * 8 + current_hours)
-    route.total_cost = total_cost or None
-    route.save()
-    update_route_equipment(route)
+    return RoutePlan(
+        days_count=days_count,
+        points=points,
+        total_duration_hours=int((current_day - 1) * HOURS_PER_DAY + current_hours),
+        total_cost=total_cost or None,
+        equipment=build_equipment(points=points, profile=profile),
+        variant=variant,
+    )
+
 
+def plan_route_for_user(
+        user,
+        days_count: int,
+        max_budget: Optional[int] = None,
+        *,
+        engine: Optional[str] = None,
+) -> RoutePlan:
+    """Подбор без записи в БД; точки — те же записи, что рисуют страницы маршрута."""
+    profile = getattr(user, "profile", None)
+
+    if _use_numpy(engine):
+        pois = _ranked_pois_numpy(profile, days_count)
+    else:
+        pois = _ranked_pois_sql(profile)
+
+    return pack_route(pois, days_count, max_budget, profile)
+
+
+def save_route_plan(user, plan: RoutePlan, *, logistics: Optional[dict] = None) -> Route:
+    """Маршрут и все точки: одна вставка Route и одна пачка RoutePoint."""
+    with transaction.atomic():
+        route = Route.objects.create(
+            user=user,
+            name=DEFAULT_ROUTE_NAME,
+            days_count=plan.days_count,
+            total_duration_hours=plan.total_duration_hours,
+            total_cost=plan.total_cost,
+            equipment=plan.equipment,
+            logistics=logistics or {},
+        )
+        # одной вставкой; bulk_create не шлёт post_save, счётчики POI — вручную
+        RoutePoint.objects.bulk_create([
+            RoutePoint(
+                route=route,
+                poi_id=p.poi.pk,
+                day_number=p.day_number,
+                order_index=p.order_index,
+                visit_time_estimate=p.visit_time_estimate,
+            )
+            for p in plan.points
+        ])
+        add_poi_usage(p.poi.pk for p in plan.points)
     return route
+
+
+def build_route_for_user(
+        user,
+        days_count: int,
+        max_budget: Optional[int] = None,
+        *,
+        engine: Optional[str] = None,
+) -> Route:
+    return save_route_plan(user, plan_route_for_user(user, days_count, max_budget, engine=engine))
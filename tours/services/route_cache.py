@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import time
+from datetime import datetime, timezone as dt_timezone
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.utils import timezone
+
+from .catalog_version import aget_catalog_version, get_catalog_version
+from .route_snapshot import RouteSnapshot, abuild_route_snapshot, build_route_snapshot
+from ..models import Route
+
+# Ключи содержат версию маршрута и версию каталога (в данных страницы —
+# названия, координаты и часы POI): после правки маршрута или POI старые
+# записи просто перестают читаться и вытесняются по таймауту.
+
+
+def bump_route_version(route: Route, *, expected_version: Optional[int] = None, **fields) -> bool:
+    """
+    Атомарно увеличивает Route.version (вместе с переданными полями)
+    и подтягивает новое значение в объект. С expected_version запись
+    идёт, только если версию с тех пор никто не поднял; False — не записано.
+    """
+    fields["updated_at"] = timezone.now()
+    qs = Route.objects.filter(pk=route.pk)
+    if expected_version is not None:
+        qs = qs.filter(version=expected_version)
+    if not qs.update(version=F("version") + 1, **fields):
+        return False
+    for name, value in fields.items():
+        setattr(route, name, value)
+    route.refresh_from_db(fields=["version"])
+    return True
+
+
+def conditions_epoch() -> int:
+    """Номер окна свежести внешних условий (EXTERNAL_CONDITIONS_MAX_AGE секунд)."""
+    return int(time.time() // settings.EXTERNAL_CONDITIONS_MAX_AGE)
+
+
+def route_data_version(route: Route, catalog_version: int) -> str:
+    return f"v{route.version}-c{catalog_version}"
+
+
+def route_etag(route: Route, catalog_version: int, *, with_conditions: bool = False, viewer: str = "") -> str:
+    """
+    Сильный ETag по версиям маршрута и каталога. Для панели условий в него
+    входит ещё и окно свежести погоды, чтобы ответ устаревал вместе с ней;
+    для страниц с шапкой под пользователя — метка зрителя (viewer).
+    """
+    tag = f"r{route.pk}-{route_data_version(route, catalog_version)}"
+    if with_conditions:
+        tag += f"-w{conditions_epoch()}"
+    if viewer:
+        tag += f"-{viewer}"
+    return f'"{tag}"'
+
+
+def route_last_modified(route: Route, *, with_conditions: bool = False) -> datetime:
+    last_modified = route.updated_at
+    if with_conditions:
+        epoch_start = datetime.fromtimestamp(
+            conditions_epoch() * settings.EXTERNAL_CONDITIONS_MAX_AGE, tz=dt_timezone.utc
+        )
+        last_modified = max(last_modified, epoch_start)
+    return last_modified
+
+
+def route_cache_key(route: Route, part: str, catalog_version: int) -> str:
+    return f"tours:route:{route.pk}:{route_data_version(route, catalog_version)}:{part}"
+
+
+def _pack(snapshot: RouteSnapshot) -> dict:
+    return {"points": snapshot.points, "map_points_json": snapshot.map_points_json()}
+
+
+def _unpack(route: Route, data: dict) -> tuple[RouteSnapshot, str]:
+    return RouteSnapshot(route, data["points"]), data["map_points_json"]
+
+
+def get_route_page_data(route: Route) -> tuple[RouteSnapshot, str]:
+    """Снапшот точек и JSON для карты текущей версии маршрута."""
+    key = route_cache_key(route, "page", get_catalog_version())
+    data = cache.get(key)
+    if data is None:
+        data = _pack(build_route_snapshot(route))
+        cache.set(key, data, settings.ROUTE_CACHE_TIMEOUT)
+    return _unpack(route, data)
+
+
+async def aget_route_page_data(route: Route) -> tuple[RouteSnapshot, str]:
+    key = route_cache_key(route, "page", await aget_catalog_version())
+    data = await cache.aget(key)
+    if data is None:
+        data = _pack(await abuild_route_snapshot(route))
+        await cache.aset(key, data, settings.ROUTE_CACHE_TIMEOUT)
+    return _unpack(route, data)
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .route_builder import DEFAULT_ROUTE_NAME, RoutePlan, save_route_plan
+from .route_history import log_route_generation
+from .route_logistics import estimate_route_logistics, schedule_logistics_refresh
+from .route_snapshot import RouteSnapshot
+from .route_templates import get_route_plans
+from ..models import Route
+
+# Подбор на главной ничего не пишет в БД: план лежит в кеше как черновик и
+# показывается теми же шаблонами и презентерами, что и маршрут. Route,
+# точки и запись истории появляются только по кнопке «Сохранить».
+# Индекс живых черновиков (INDEX_KEY) нужен лимиту на пользователя и
+# команде sweep_route_drafts: не все бэкенды кеша сами удаляют
+# просроченные записи (файловый, БД). Индекс меняется только под
+# блокировкой INDEX_LOCK_KEY (cache.add), иначе параллельные подборы
+# затирают записи друг друга.
+# Кеш — отдельный алиас CACHES["route_drafts"], общий для всех процессов.
+
+INDEX_KEY = "tours:drafts:index"
+INDEX_LOCK_KEY = "tours:drafts:index:lock"
+# блокировка, брошенная упавшим процессом, истекает сама
+INDEX_LOCK_TIMEOUT = 10
+# сколько ждать, пока параллельное «Сохранить» того же черновика допишет маршрут
+SAVE_WAIT_S = 10.0
+POLL_S = 0.05
+
+
+def _cache():
+    return caches["route_drafts"]
+
+
+def draft_key(token: str) -> str:
+    return f"tours:draft:{token}"
+
+
+def _saved_key(token: str) -> str:
+    return f"tours:draft:{token}:saved"
+
+
+def _timeout() -> int:
+    return getattr(settings, "ROUTE_DRAFT_TIMEOUT", 60 * 60 * 2)
+
+
+@dataclass
+class RouteDraft:
+    token: str
+    user_id: int
+    max_budget: Optional[int]
+    plan: RoutePlan
+    # варианты того же подбора: [(token, variant)], включая этот черновик
+    siblings: list[tuple[str, str]] = field(default_factory=list)
+    created_at: float = field(default_factory=time.time)
+
+    @property
+    def expires_at(self) -> float:
+        return self.created_at + _timeout()
+
+    def as_route(self) -> Route:
+        """Несохранённый Route (pk=None) для шаблонов и презентеров."""
+        return Route(
+            user_id=self.user_id,
+            name=DEFAULT_ROUTE_NAME,
+            days_count=self.plan.days_count,
+            total_duration_hours=self.plan.total_duration_hours,
+            total_cost=self.plan.total_cost,
+            equipment=self.plan.equipment,
+        )
+
+    def snapshot(self, route: Route) -> RouteSnapshot:
+        return RouteSnapshot(route, self.plan.points)
+
+
+def _store(draft: RouteDraft) -> None:
+    remaining = int(draft.expires_at - time.time())
+    if remaining > 0:
+        _cache().set(draft_key(draft.token), draft, remaining)
+
+
+@contextmanager
+def _index_lock():
+    cache = _cache()
+    while not cache.add(INDEX_LOCK_KEY, 1, INDEX_LOCK_TIMEOUT):
+        time.sleep(POLL_S)
+    try:
+        yield cache
+    finally:
+        cache.delete(INDEX_LOCK_KEY)
+
+
+def _register(drafts: list[RouteDraft]) -> None:
+    """Добавляет черновики в индекс; старые черновики пользователя сверх лимита удаляются."""
+    user_id = drafts[0].user_id
+    limit = max(getattr(settings, "ROUTE_DRAFTS_PER_USER", 8), len(drafts))
+    with _index_lock() as cache:
+        index = cache.get(INDEX_KEY) or {}
+        own = sorted(
+            (expires, token) for token, (owner, expires) in index.items() if owner == user_id
+        )
+        evicted = [token for _, token in own[:max(0, len(own) + len(drafts) - limit)]]
+        if evicted:
+            cache.delete_many([draft_key(token) for token in evicted])
+            for token in evicted:
+                index.pop(token, None)
+        for draft in drafts:
+            index[draft.token] = (draft.user_id, draft.expires_at)
+        cache.set(INDEX_KEY, index, None)
+
+
+def _unregister(token: str) -> None:
+    with _index_lock() as cache:
+        index = cache.get(INDEX_KEY) or {}
+        if index.pop(token, None) is not None:
+            cache.set(INDEX_KEY, index, None)
+
+
+def create_route_drafts(user, days_count: int, max_budget: Optional[int] = None, *, k: int = 1) -> list[RouteDraft]:
+    """
+    Черновики подбора: k > 1 — варианты из одного пула кандидатов
+    (services.route_alternatives). Планы берутся из шаблонов (services.route_templates).
+    """
+    plans = get_route_plans(user, days_count, max_budget, k=k)
+
+    drafts = [
+        RouteDraft(token=uuid.uuid4().hex, user_id=user.pk, max_budget=max_budget, plan=plan)
+        for plan in plans
+    ]
+    siblings = [(d.token, d.plan.variant) for d in drafts]
+    for draft in drafts:
+        draft.siblings = siblings
+        _store(draft)
+    _register(drafts)
+    return drafts
+
+
+def get_route_draft(user, token: str) -> Optional[RouteDraft]:
+    draft = _cache().get(draft_key(token))
+    if draft is None or draft.user_id != user.pk:
+        return None
+    return draft
+
+
+async def aget_route_draft(user, token: str) -> Optional[RouteDraft]:
+    draft = await _cache().aget(draft_key(token))
+    if draft is None or draft.user_id != user.pk:
+        return None
+    return draft
+
+
+def save_route_draft(user, token: str) -> Optional[Route]:
+    """
+    Записывает черновик в БД. Повторное «Сохранить» (двойной клик) вернёт
+    уже созданный маршрут; None — черновик истёк или чужой.
+    """
+    cache = _cache()
+    saved_key = _saved_key(token)
+    # 0 — сохранение идёт прямо сейчас, иначе id готового маршрута
+    if not cache.add(saved_key, 0, _timeout()):
+        return _wait_saved_route(user, saved_key)
+
+    try:
+        draft = get_route_draft(user, token)
+        if draft is None:
+            cache.delete(saved_key)
+            return None
+        # оценка по прямой сразу, ответы провайдера — в фоне после коммита
+        route = draft.as_route()
+        logistics = estimate_route_logistics(route, draft.snapshot(route))
+        route = save_route_plan(user, draft.plan, logistics=logistics)
+        log_route_generation(
+            user=user, route=route, days_count=draft.plan.days_count, max_budget=draft.max_budget
+        )
+    except BaseException:
+        cache.delete(saved_key)
+        raise
+
+    cache.set(saved_key, route.pk, _timeout())
+    cache.delete(draft_key(token))
+    _unregister(token)
+    schedule_logistics_refresh(route)
+    return route
+
+
+def _wait_saved_route(user, saved_key: str) -> Optional[Route]:
+    """Маршрут, который сохраняет (или уже сохранил) параллельный запрос."""
+    cache = _cache()
+    deadline = time.monotonic() + SAVE_WAIT_S
+    route_id = cache.get(saved_key)
+    while route_id == 0 and time.monotonic() < deadline:
+        time.sleep(POLL_S)
+        route_id = cache.get(saved_key)
+    return Route.objects.filter(pk=route_id, user=user).first() if route_id else None
+
+
+def sweep_route_drafts() -> int:
+    """Удаляет просроченные черновики из кеша и индекса; возвращает их число."""
+    with _index_lock() as cache:
+        index = cache.get(INDEX_KEY) or {}
+        now = time.time()
+        expired = [token for token, (_, expires) in index.items() if expires <= now]
+        if expired:
+            cache.delete_many([draft_key(token) for token in expired])
+            cache.set(INDEX_KEY, {t: v for t, v in index.items() if v[1] > now}, None)
+    return len(expired)
@@ -3,8 +3,12 @@ from __future__ import annotations
 from django.db import transaction
 from django.shortcuts import get_object_or_404
 from django.db.models import Max
+from django.utils import timezone
 
 from .route_equipment import update_route_equipment
+from .route_cache import bump_route_version
+from .route_logistics import estimate_route_logistics, schedule_logistics_refresh
+from .route_sharing import sync_share_snapshot
 from ..models import Route, RoutePoint
 
 
@@ -18,6 +22,7 @@ def delete_route_point(*, user, route_pk: int, point_pk: int) -> Route:
         _reindex_day(route, day)
         _recalc_route_totals(route)
 
+    _route_changed(route)
     return route
 
 
@@ -42,6 +47,7 @@ def move_route_point_up(*, user, route_pk: int, point_pk: int) -> Route:
         point.save(update_fields=["order_index"])
         neighbor.save(update_fields=["order_index"])
 
+    _route_changed(route)
     return route
 
 
@@ -66,6 +72,7 @@ def move_route_point_down(*, user, route_pk: int, point_pk: int) -> Route:
         point.save(update_fields=["order_index"])
         neighbor.save(update_fields=["order_index"])
 
+    _route_changed(route)
     return route
 
 
@@ -93,9 +100,19 @@ def add_route_point(*, user, route_pk: int, poi, day_number: int, note: str = ""
         _reindex_day(route, day_number)
         _recalc_route_totals(route)
 
+    _route_changed(route)
     return route
 
 
+def _route_changed(route: Route) -> None:
+    # после коммита: новая версия (сбрасывает кеш страниц) с оценкой
+    # логистики по новым соседним парам и свежий снапшот публичной страницы;
+    # у провайдера новые ноги запрашиваются в фоне, не задерживая ответ
+    bump_route_version(route, edited_at=timezone.now(), logistics=estimate_route_logistics(route))
+    sync_share_snapshot(route)
+    schedule_logistics_refresh(route)
+
+
 def _reindex_day(route: Route, day_number: int) -> None:
     points = (
         RoutePoint.objects.filter(route=route, day_number=day_number)
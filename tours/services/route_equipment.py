@@ -2,9 +2,9 @@ from __future__ import annotations
 
 from typing import Iterable, Optional
 
+from .route_snapshot import PointRecord, build_route_snapshot
 from ..models import (
     Route,
-    RoutePoint,
     PoiType,
     PhysicalLevel,
     Season,
@@ -22,7 +22,7 @@ def _uniq(items: list[str]) -> list[str]:
     return out
 
 
-def build_equipment(*, points: Iterable[RoutePoint], profile: Optional[UserProfile]) -> str:
+def build_equipment(*, points: Iterable[PointRecord], profile: Optional[UserProfile]) -> str:
     base = [
         "Паспорт/документы, банковская карта, немного наличных",
         "Телефон + powerbank, зарядка",
@@ -81,8 +81,7 @@ def build_equipment(*, points: Iterable[RoutePoint], profile: Optional[UserProfi
 
 
 def update_route_equipment(route: Route) -> None:
-    points = RoutePoint.objects.filter(route=route).select_related("poi")
     profile = getattr(route.user, "profile", None)
 
-    route.equipment = build_equipment(points=points, profile=profile)
+    route.equipment = build_equipment(points=build_route_snapshot(route).points, profile=profile)
     route.save(update_fields=["equipment"])
@@ -1,5 +1,22 @@
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
 from ..models import RouteGeneration
 
+
+def history_window_start() -> datetime:
+    """
+    С какого момента история показывается пользователю: начало дня
+    ROUTE_HISTORY_WINDOW_DAYS дней назад (окно сдвигается раз в сутки, на
+    этом держится кеш счётчика). Условие по created_at даёт PostgreSQL
+    отсечь старые секции таблицы (см. history_partitions).
+    """
+    day = timezone.localdate() - timedelta(days=getattr(settings, "ROUTE_HISTORY_WINDOW_DAYS", 365))
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
 def log_route_generation(*, user, route, days_count: int, max_budget):
     RouteGeneration.objects.create(
         user=user,
@@ -1,41 +1,199 @@
 from __future__ import annotations
 
-from typing import Any
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Optional
+
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
 
 from .external_conditions import get_external_provider
+from .external_conditions.real_http import fallback_leg
+from .route_cache import bump_route_version
+from .route_snapshot import RouteSnapshot, build_route_snapshot
+from ..models import Route
+
+logger = logging.getLogger(__name__)
+
+# ноги, посчитанные без OSRM: их переспрашивает фоновое обновление
+ESTIMATE_SOURCE = "fallback:haversine"
+FALLBACK_SOURCES = {"rate_limited", ESTIMATE_SOURCE}
+# сколько раз пересчитать логистику, если маршрут правят параллельно
+REFRESH_ATTEMPTS = 3
+
+# Страницы (GET) показывают только сохранённую логистику. Правка маршрута
+# сразу сохраняет оценку новых ног по прямой (estimate_route_logistics), а
+# у провайдера они запрашиваются после ответа — в фоновом потоке
+# (schedule_logistics_refresh) или командой refresh_route_logistics.
+_EXECUTOR = ThreadPoolExecutor(max_workers=2, thread_name_prefix="route-logistics")
+
+Coords = tuple[float, float]
+
+
+def _day_coords(points: list[Any]) -> list[Coords]:
+    pts = []
+    for p in points:
+        poi = getattr(p, "poi", None)
+        lat = getattr(poi, "latitude", None) if poi else None
+        lon = getattr(poi, "longitude", None) if poi else None
+        if lat is None or lon is None:
+            continue
+        pts.append((float(lat), float(lon)))
+    return pts
+
+
+# Логистика хранится в Route.logistics:
+#
+# {"legs": {"<lat,lon;lat,lon>": [km, minutes, source]},
+#  "days": {"1": {"distance_km": .., "time_minutes": ..}},
+#  "total_km": .., "total_minutes": .., "pending": <есть ноги из FALLBACK_SOURCES>}
+#
+# Ноги кешируются по паре координат, поэтому после правки маршрута
+# у провайдера запрашиваются только новые соседние пары.
 
-def compute_logistics_for_days(days: dict[int, list[Any]]):
-    provider = get_external_provider()
 
-    day_stats: dict[int, dict[str, Any]] = {}
+def _leg_key(a: Coords, b: Coords) -> str:
+    return f"{a[0]:.6f},{a[1]:.6f};{b[0]:.6f},{b[1]:.6f}"
+
+
+def _day_pairs(days: dict[int, list[Any]]) -> dict[int, list[tuple[Coords, Coords]]]:
+    out = {}
+    for day, points in days.items():
+        pts = _day_coords(points)
+        out[day] = [(pts[i], pts[i + 1]) for i in range(len(pts) - 1)]
+    return out
+
+
+def _missing_pairs(pairs_by_day, legs: dict[str, list], *, retry_fallback: bool) -> list[tuple[Coords, Coords]]:
+    missing = {}
+    for pairs in pairs_by_day.values():
+        for a, b in pairs:
+            key = _leg_key(a, b)
+            leg = legs.get(key)
+            if leg is None or (retry_fallback and leg[2] in FALLBACK_SOURCES):
+                missing[key] = (a, b)
+    return list(missing.values())
+
+
+def _build_logistics(pairs_by_day, legs: dict[str, list]) -> dict[str, Any]:
+    used: dict[str, list] = {}
+    days: dict[str, dict[str, Any]] = {}
     total_km = 0.0
     total_min = 0
 
-    for day, points in days.items():
-        pts = []
-        for p in points:
-            poi = getattr(p, "poi", None)
-            lat = getattr(poi, "latitude", None) if poi else None
-            lon = getattr(poi, "longitude", None) if poi else None
-            if lat is None or lon is None:
-                continue
-            pts.append((float(lat), float(lon)))
-
-        if len(pts) < 2:
-            day_stats[day] = {"distance_km": None, "time_minutes": None}
+    for day, pairs in pairs_by_day.items():
+        if not pairs:
+            days[str(day)] = {"distance_km": None, "time_minutes": None}
             continue
 
         d_km = 0.0
         t_min = 0
-        for i in range(len(pts) - 1):
-            lat1, lon1 = pts[i]
-            lat2, lon2 = pts[i + 1]
-            leg = provider.driving_leg(lat1, lon1, lat2, lon2)
-            d_km += float(leg.distance_km)
-            t_min += int(leg.duration_min)
-
-        day_stats[day] = {"distance_km": d_km, "time_minutes": t_min}
+        for a, b in pairs:
+            key = _leg_key(a, b)
+            km, minutes, _source = used[key] = legs[key]
+            d_km += float(km)
+            t_min += int(minutes)
+
+        days[str(day)] = {"distance_km": d_km, "time_minutes": t_min}
         total_km += d_km
         total_min += t_min
 
-    return day_stats, total_km, total_min
+    pending = any(leg[2] in FALLBACK_SOURCES for leg in used.values())
+    return {"legs": used, "days": days, "total_km": total_km, "total_minutes": total_min, "pending": pending}
+
+
+def _prepare(route: Route, snapshot: RouteSnapshot, retry_fallback: bool):
+    pairs_by_day = _day_pairs(snapshot.days)
+    legs = dict((route.logistics or {}).get("legs") or {})
+    return pairs_by_day, legs, _missing_pairs(pairs_by_day, legs, retry_fallback=retry_fallback)
+
+
+def _leg_row(leg) -> list:
+    return [float(leg.distance_km), int(leg.duration_min), getattr(leg, "source", None)]
+
+
+def estimate_route_logistics(route: Route, snapshot: Optional[RouteSnapshot] = None) -> dict[str, Any]:
+    """
+    Логистика из сохранённых ног; недостающие оцениваются по прямой, без
+    внешних запросов и записи в БД.
+    """
+    snapshot = snapshot or build_route_snapshot(route)
+    pairs_by_day, legs, missing = _prepare(route, snapshot, retry_fallback=False)
+    for a, b in missing:
+        legs[_leg_key(a, b)] = _leg_row(fallback_leg(*a, *b, ESTIMATE_SOURCE))
+    return _build_logistics(pairs_by_day, legs)
+
+
+def logistics_pending(route: Route) -> bool:
+    logistics = route.logistics or {}
+    return not logistics or bool(logistics.get("pending"))
+
+
+def pending_logistics_routes():
+    """Маршруты, где логистика не посчитана или в ней есть оценки вместо ответов провайдера."""
+    return Route.objects.filter(Q(logistics={}) | Q(logistics__pending=True))
+
+
+def refresh_route_logistics(route: Route, snapshot: Optional[RouteSnapshot] = None) -> dict[str, Any]:
+    """
+    Запрашивает у провайдера недостающие и оценочные ноги и сохраняет
+    логистику (с новой версией маршрута). Ходит во внешний сервис — только
+    для фона и команд, не для обработчиков запросов.
+    Запись условная: если маршрут правили, пока шли запросы, логистика
+    пересчитывается по новым точкам (полученные ноги не запрашиваются
+    повторно), а не затирает оценку правки.
+    """
+    fetched: dict[str, list] = {}
+    for _ in range(REFRESH_ATTEMPTS):
+        version = route.version
+        snapshot = snapshot or build_route_snapshot(route)
+        pairs_by_day = _day_pairs(snapshot.days)
+        legs = {**((route.logistics or {}).get("legs") or {}), **fetched}
+        missing = [
+            (a, b) for a, b in _missing_pairs(pairs_by_day, legs, retry_fallback=True)
+            if _leg_key(a, b) not in fetched
+        ]
+
+        if missing:
+            provider = get_external_provider()
+            for a, b in missing:
+                fetched[_leg_key(a, b)] = legs[_leg_key(a, b)] = _leg_row(provider.driving_leg(*a, *b))
+
+        logistics = _build_logistics(pairs_by_day, legs)
+        if logistics == route.logistics:
+            return logistics
+        # логистика выводится на страницах — новая версия сбрасывает их кеш
+        if bump_route_version(route, expected_version=version, logistics=logistics):
+            return logistics
+        route.refresh_from_db()
+        snapshot = None
+
+    logger.warning("Маршрут %s меняется быстрее, чем обновляется логистика", route.pk)
+    return route.logistics
+
+
+def _refresh_in_background(route_id: int) -> None:
+    close_old_connections()
+    try:
+        route = Route.objects.filter(pk=route_id).first()
+        if route is not None:
+            refresh_route_logistics(route)
+    except Exception:
+        logger.exception("Не удалось обновить логистику маршрута %s", route_id)
+    finally:
+        # поток пула живёт долго — соединение не должно висеть в нём
+        connection.close()
+
+
+def schedule_logistics_refresh(route: Route) -> None:
+    """После коммита запросить у провайдера оценочные ноги маршрута в фоне."""
+    if route.pk is not None and logistics_pending(route):
+        route_id = route.pk
+        transaction.on_commit(lambda: _EXECUTOR.submit(_refresh_in_background, route_id))
+
+
+def stored_day_stats(route: Route) -> tuple[dict[int, dict[str, Any]], float, int]:
+    """Сохранённая логистика в виде (по дням, всего км, всего минут)."""
+    data = route.logistics or {}
+    day_stats = {int(day): st for day, st in (data.get("days") or {}).items()}
+    return day_stats, float(data.get("total_km") or 0.0), int(data.get("total_minutes") or 0)
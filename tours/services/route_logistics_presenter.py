@@ -2,11 +2,12 @@ from __future__ import annotations
 
 from typing import Any
 
-from .route_logistics import compute_logistics_for_days
+from .route_logistics import estimate_route_logistics, stored_day_stats
+from .route_snapshot import RouteSnapshot
+from ..models import Route
 
-def build_logistics_context(days: dict[int, list[Any]]) -> dict[str, Any]:
-    day_stats, total_km, total_min = compute_logistics_for_days(days)
 
+def _logistics_context(days, day_stats, total_km, total_min) -> dict[str, Any]:
     day_blocks = []
     for day, points in days.items():
         st = day_stats.get(day) or {}
@@ -25,3 +26,21 @@ def build_logistics_context(days: dict[int, list[Any]]) -> dict[str, Any]:
         "logistics_total_km": total_km if total_km > 0 else None,
         "logistics_total_minutes": total_min if total_min > 0 else None,
     }
+
+
+def build_day_blocks(days: dict[int, list[Any]]) -> list[dict[str, Any]]:
+    """Дни без логистики — она подгружается на странице отдельным запросом."""
+    return _logistics_context(days, {}, 0, 0)["day_blocks"]
+
+
+def build_logistics_context(route: Route, snapshot: RouteSnapshot) -> dict[str, Any]:
+    # Только сохранённая логистика: GET ничего не пишет и не ходит к OSRM.
+    # У черновика (pk=None) сохранённой нет — оценка по прямой в памяти.
+    if route.pk is None:
+        route.logistics = estimate_route_logistics(route, snapshot)
+    return _logistics_context(snapshot.days, *stored_day_stats(route))
+
+
+async def abuild_logistics_context(route: Route, snapshot: RouteSnapshot) -> dict[str, Any]:
+    # без запросов к БД и провайдеру — можно прямо в event loop
+    return build_logistics_context(route, snapshot)
@@ -1,38 +1,16 @@
 from __future__ import annotations
 
-import json
-
-from django.core.serializers.json import DjangoJSONEncoder
-
-from ..models import Route, RoutePoint
+from ..models import Route
+from .route_snapshot import abuild_route_snapshot, build_route_snapshot
 
 
 def get_route_map_points(route: Route) -> list[dict]:
-    qs = (
-        RoutePoint.objects
-        .filter(
-            route=route,
-            poi__latitude__isnull=False,
-            poi__longitude__isnull=False,
-        )
-        .select_related("poi")
-        .order_by("day_number", "order_index", "id")
-    )
-
-    points: list[dict] = []
-    for rp in qs:
-        poi = rp.poi
-        points.append(
-            {
-                "lat": float(poi.latitude),
-                "lng": float(poi.longitude),
-                "name": poi.name,
-                "day": rp.day_number,
-                "order": rp.order_index,
-            }
-        )
-    return points
+    return build_route_snapshot(route).map_points()
 
 
 def get_route_map_points_json(route: Route) -> str:
-    return json.dumps(get_route_map_points(route), cls=DjangoJSONEncoder)
+    return build_route_snapshot(route).map_points_json()
+
+
+async def aget_route_map_points_json(route: Route) -> str:
+    return (await abuild_route_snapshot(route)).map_points_json()
@@ -1,8 +1,12 @@
 from __future__ import annotations
 
 from django.db import transaction
+from django.utils import timezone
 
 from .geo import haversine_km
+from .route_cache import bump_route_version
+from .route_logistics import estimate_route_logistics, schedule_logistics_refresh
+from .route_sharing import sync_share_snapshot
 from ..models import Route, RoutePoint
 
 
@@ -53,8 +57,17 @@ def _optimize_day(points: list[RoutePoint]) -> list[RoutePoint]:
     return out
 
 
-@transaction.atomic
 def optimize_route_points(route: Route) -> Route:
+    _reorder_route_points(route)
+    # провайдер — в фоне после ответа (см. route_editing._route_changed)
+    bump_route_version(route, edited_at=timezone.now(), logistics=estimate_route_logistics(route))
+    sync_share_snapshot(route)
+    schedule_logistics_refresh(route)
+    return route
+
+
+@transaction.atomic
+def _reorder_route_points(route: Route) -> None:
     qs = (
         RoutePoint.objects.select_for_update()
         .select_related("poi")
@@ -72,5 +85,3 @@ def optimize_route_points(route: Route) -> Route:
             if rp.order_index != idx:
                 rp.order_index = idx
                 rp.save(update_fields=["order_index"])
-
-    return route
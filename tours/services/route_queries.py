@@ -1,4 +1,11 @@
-from ..models import Route, RoutePoint, RouteGeneration
+from datetime import datetime, time, timedelta
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from ..models import Route, RouteGeneration
+from .route_history import history_window_start
+from .route_snapshot import abuild_route_snapshot, build_route_snapshot
 
 
 def get_user_routes(user):
@@ -6,24 +13,47 @@ def get_user_routes(user):
 
 
 def get_route_days(route: Route):
-    points = (
-        RoutePoint.objects
-        .filter(route=route)
-        .select_related("poi")
-        .order_by("day_number", "order_index")
-    )
+    return build_route_snapshot(route).days
 
-    days = {}
-    for point in points:
-        days.setdefault(point.day_number, []).append(point)
 
-    return days
+async def aget_route_days(route: Route):
+    return (await abuild_route_snapshot(route)).days
 
 
 def get_user_history(user):
     return (
         RouteGeneration.objects
-        .filter(user=user)
+        .filter(user=user, created_at__gte=history_window_start())
         .select_related("route")
         .order_by("-created_at")
-    )
\ No newline at end of file
+    )
+
+
+# ключи keyset-пагинации истории: (-created_at, id)
+HISTORY_KEYS = [("created_at", True), ("id", False)]
+
+
+def _seconds_to_next_day() -> int:
+    tomorrow = timezone.localdate() + timedelta(days=1)
+    return max(1, int((timezone.make_aware(datetime.combine(tomorrow, time.min)) - timezone.now()).total_seconds()))
+
+
+def get_user_history_count(user) -> int:
+    """
+    Число записей истории в окне. Ключ кеша — начало окна и время самой
+    свежей записи (её берёт индекс (user, -created_at)): новая генерация в
+    любом воркере и сдвиг окна дают новый ключ, сбрасывать ничего не нужно.
+    Записи живут до конца суток — дальше окно всё равно сдвинется.
+    """
+    window_start = history_window_start()
+    history = RouteGeneration.objects.filter(user=user, created_at__gte=window_start)
+    newest = history.order_by("-created_at").values_list("created_at", flat=True).first()
+    if newest is None:
+        return 0
+
+    key = f"tours:history:{user.pk}:count:{window_start:%Y%m%d}:{newest.timestamp()}"
+    total = cache.get(key)
+    if total is None:
+        total = history.count()
+        cache.set(key, total, _seconds_to_next_day())
+    return total
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Callable, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .poi_usage import add_poi_usage
+from .route_builder import DEFAULT_ROUTE_NAME
+from ..models import Route, RouteGeneration, RoutePoint
+
+# «Брошенный» маршрут: его записал сам подбор (Route.autosaved, до
+# черновиков), название автоматическое, ни разу не открывался по ссылке,
+# владелец его не правил и давно не смотрел. Маршруты, сохранённые кнопкой
+# «Сохранить», не удаляются, даже с автоназванием. Такие маршруты
+# удаляются пачками в коротких транзакциях — без долгих блокировок и
+# одного огромного DELETE, после которого VACUUM разбирает всю таблицу.
+
+
+def touch_interval() -> timedelta:
+    return timedelta(seconds=getattr(settings, "ROUTE_VIEW_TOUCH_INTERVAL", 60 * 60 * 24))
+
+
+def _view_is_stale(route: Route, now) -> bool:
+    return route.last_viewed_at is None or route.last_viewed_at < now - touch_interval()
+
+
+def touch_route_viewed(route: Route) -> None:
+    """Отмечает просмотр владельцем; пишет не чаще раза в ROUTE_VIEW_TOUCH_INTERVAL."""
+    now = timezone.now()
+    if _view_is_stale(route, now):
+        # update() не трогает updated_at и версию — кеш и ETag страниц живут дальше
+        Route.objects.filter(pk=route.pk).update(last_viewed_at=now)
+        route.last_viewed_at = now
+
+
+async def atouch_route_viewed(route: Route) -> None:
+    now = timezone.now()
+    if _view_is_stale(route, now):
+        await Route.objects.filter(pk=route.pk).aupdate(last_viewed_at=now)
+        route.last_viewed_at = now
+
+
+def abandoned_routes(*, older_than_days: int, unviewed_days: int):
+    now = timezone.now()
+    viewed_before = now - timedelta(days=unviewed_days)
+    return Route.objects.filter(
+        Q(last_viewed_at__isnull=True) | Q(last_viewed_at__lt=viewed_before),
+        autosaved=True,
+        name=DEFAULT_ROUTE_NAME,
+        is_shared=False,
+        shared_at__isnull=True,
+        edited_at__isnull=True,
+        created_at__lt=now - timedelta(days=older_than_days),
+    )
+
+
+@dataclass
+class PurgeProgress:
+    batches: int = 0
+    routes: int = 0
+    points: int = 0
+    total: int = 0
+
+
+def _delete_points(route_ids: list[int]) -> int:
+    """Точки маршрутов одним DELETE, без сигналов: usage_count уже уменьшен."""
+    qn = connection.ops.quote_name
+    placeholders = ", ".join(["%s"] * len(route_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {qn(RoutePoint._meta.db_table)} WHERE route_id IN ({placeholders})", route_ids
+        )
+        return cursor.rowcount
+
+
+def _delete_batch(qs, batch_size: int) -> tuple[int, int]:
+    with transaction.atomic():
+        # строки, которые сейчас правит владелец, пропускаем до следующего запуска
+        ids = list(
+            qs.select_for_update(skip_locked=True).order_by("pk").values_list("pk", flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0, 0
+
+        # счётчики POI одним UPDATE на кратность вместо post_delete на каждую точку
+        add_poi_usage(RoutePoint.objects.filter(route_id__in=ids).values_list("poi_id", flat=True), sign=-1)
+        deleted_points = _delete_points(ids)
+        RouteGeneration.objects.filter(route_id__in=ids).update(route=None)
+        Route.objects.filter(pk__in=ids).delete()
+    return len(ids), deleted_points
+
+
+def purge_abandoned_routes(
+    *,
+    older_than_days: int,
+    unviewed_days: int,
+    batch_size: int = 500,
+    pause: float = 0.0,
+    dry_run: bool = False,
+    on_batch: Optional[Callable[[PurgeProgress], None]] = None,
+) -> PurgeProgress:
+    """
+    Удаляет брошенные маршруты пачками по batch_size, делая паузу pause
+    секунд между пачками (успевает отработать autovacuum и реплики).
+    """
+    qs = abandoned_routes(older_than_days=older_than_days, unviewed_days=unviewed_days)
+    progress = PurgeProgress(total=qs.count())
+    if dry_run:
+        progress.routes = progress.total
+        progress.points = RoutePoint.objects.filter(route__in=qs).count()
+        return progress
+
+    while True:
+        routes, points = _delete_batch(qs, batch_size)
+        if not routes:
+            return progress
+        progress.batches += 1
+        progress.routes += routes
+        progress.points += points
+        if on_batch:
+            on_batch(progress)
+        if pause:
+            time.sleep(pause)
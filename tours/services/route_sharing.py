@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import json
+import uuid
+from typing import Any, Optional
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+
+from .catalog_version import get_catalog_version
+from .route_cache import bump_route_version, get_route_page_data, route_data_version
+from .route_logistics import stored_day_stats
+from .route_logistics_presenter import build_day_blocks
+from ..models import Route
+
+# Снапшот публичной страницы маршрута:
+#   shared_routes/<share_uuid>/v<version>-c<catalog>.body.html — готовое тело страницы
+#   shared_routes/<share_uuid>/v<version>-c<catalog>.json — дни, точки и логистика
+# Шапка сайта (меню вошедшего пользователя, csrf-токен) в снапшот не входит:
+# она рендерится на каждый запрос вокруг готового тела.
+# Версии маршрута и каталога в имени файла: после правки маршрута или POI
+# старый снапшот просто не находится.
+
+SNAPSHOT_ROOT = "shared_routes"
+
+
+def _snapshot_dir(share_uuid) -> str:
+    return f"{SNAPSHOT_ROOT}/{share_uuid}"
+
+
+def _snapshot_name(route: Route, ext: str) -> str:
+    return f"{_snapshot_dir(route.share_uuid)}/{route_data_version(route, get_catalog_version())}.{ext}"
+
+
+def _share_context(route: Route, snapshot, map_points_json: str) -> dict[str, Any]:
+    return {
+        "route": route,
+        "days": snapshot.days,
+        "day_blocks": build_day_blocks(snapshot.days),
+        "map_points_json": map_points_json,
+        "yandex_maps_api_key": settings.YANDEX_MAPS_API_KEY,
+        "route_cache_timeout": settings.ROUTE_CACHE_TIMEOUT,
+        "conditions_url": reverse("route_share_conditions", args=[route.share_uuid]),
+    }
+
+
+def _share_json(route: Route, snapshot) -> dict[str, Any]:
+    day_stats, total_km, total_min = stored_day_stats(route)
+    return {
+        "version": route.version,
+        "name": route.name,
+        "days_count": route.days_count,
+        "total_duration_hours": route.total_duration_hours,
+        "total_cost": route.total_cost,
+        "total_km": total_km or None,
+        "total_minutes": total_min or None,
+        "days": [
+            {
+                "day": day,
+                **(day_stats.get(day) or {"distance_km": None, "time_minutes": None}),
+                "points": [
+                    {
+                        "poi": p.poi.pk,
+                        "name": p.poi.name,
+                        "hours": p.visit_time_estimate,
+                        "note": p.note,
+                        "lat": p.poi.latitude,
+                        "lng": p.poi.longitude,
+                    }
+                    for p in points
+                ],
+            }
+            for day, points in snapshot.days.items()
+        ],
+    }
+
+
+def _write(name: str, content: str) -> None:
+    """
+    Имя снапшота версионное, содержимое под ним всегда одно: готовый файл не
+    перезаписываем. Если тот же снапшот параллельно записал другой воркер,
+    хранилище отдаст имя с суффиксом — такую копию никто не прочтёт, удаляем.
+    """
+    if default_storage.exists(name):
+        return
+    saved = default_storage.save(name, ContentFile(content.encode("utf-8")))
+    if saved != name:
+        default_storage.delete(saved)
+
+
+def _clear_dir(share_uuid, *, keep: tuple[str, ...] = ()) -> None:
+    directory = _snapshot_dir(share_uuid)
+    try:
+        _, files = default_storage.listdir(directory)
+    except FileNotFoundError:
+        return
+    for filename in files:
+        name = f"{directory}/{filename}"
+        if name not in keep:
+            default_storage.delete(name)
+
+
+def publish_share_snapshot(route: Route) -> str:
+    """Рендерит тело публичной страницы текущей версии маршрута и кладёт его в хранилище."""
+    snapshot, map_points_json = get_route_page_data(route)
+    html = render_to_string("tours/_route_share_body.html", _share_context(route, snapshot, map_points_json))
+    data = json.dumps(_share_json(route, snapshot), cls=DjangoJSONEncoder, ensure_ascii=False)
+
+    html_name, json_name = _snapshot_name(route, "body.html"), _snapshot_name(route, "json")
+    _write(html_name, html)
+    _write(json_name, data)
+    _clear_dir(route.share_uuid, keep=(html_name, json_name))
+    return html
+
+
+def unpublish_share_snapshot(share_uuid) -> None:
+    _clear_dir(share_uuid)
+
+
+def sync_share_snapshot(route: Route) -> None:
+    """Вызывается после правки маршрута: снапшот нужен только расшаренным."""
+    if route.is_shared:
+        publish_share_snapshot(route)
+
+
+def read_share_snapshot(route: Route) -> Optional[str]:
+    name = _snapshot_name(route, "body.html")
+    if not default_storage.exists(name):
+        return None
+    with default_storage.open(name, "rb") as f:
+        return f.read().decode("utf-8")
+
+
+async def aget_share_body_html(route: Route) -> str:
+    """
+    Тело страницы из снапшота; если снапшота этой версии нет (например, версию
+    подняло фоновое обновление логистики или правка POI) — публикуем заново.
+    """
+    html = await sync_to_async(read_share_snapshot)(route)
+    if html is None:
+        html = await sync_to_async(publish_share_snapshot)(route)
+    return html
+
+
+def set_route_shared(route: Route, is_shared: bool) -> None:
+    # shared_at — первое открытие доступа, при закрытии он остаётся
+    shared_at = route.shared_at or (timezone.now() if is_shared else None)
+    bump_route_version(route, is_shared=is_shared, shared_at=shared_at)
+    if is_shared:
+        publish_share_snapshot(route)
+    else:
+        unpublish_share_snapshot(route.share_uuid)
+
+
+def regenerate_share_uuid(route: Route) -> None:
+    old_uuid = route.share_uuid
+    bump_route_version(route, share_uuid=uuid.uuid4())
+    unpublish_share_snapshot(old_uuid)
+    sync_share_snapshot(route)
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import json
+from decimal import Decimal
+from typing import Optional
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from ..models import Route, RoutePoint
+
+
+class PoiRecord:
+    """Только те поля POI, которые нужны страницам маршрута (без detailed_description)."""
+
+    __slots__ = (
+        "pk",
+        "name",
+        "short_description",
+        "type",
+        "season",
+        "physical_level",
+        "base_cost",
+        "latitude",
+        "longitude",
+    )
+
+    def __init__(self, pk, name, short_description, type, season, physical_level, base_cost, latitude, longitude):
+        self.pk = pk
+        self.name = name
+        self.short_description = short_description
+        self.type = type
+        self.season = season
+        self.physical_level = physical_level
+        self.base_cost = base_cost
+        self.latitude = float(latitude) if latitude is not None else None
+        self.longitude = float(longitude) if longitude is not None else None
+
+    @property
+    def has_coords(self) -> bool:
+        return self.latitude is not None and self.longitude is not None
+
+
+class PointRecord:
+    __slots__ = ("pk", "day_number", "order_index", "note", "visit_time_estimate", "poi")
+
+    def __init__(self, pk, day_number, order_index, note, visit_time_estimate: Decimal, poi: PoiRecord):
+        self.pk = pk
+        self.day_number = day_number
+        self.order_index = order_index
+        self.note = note
+        self.visit_time_estimate = visit_time_estimate
+        self.poi = poi
+
+
+_FIELDS = (
+    "id",
+    "day_number",
+    "order_index",
+    "note",
+    "visit_time_estimate",
+    "poi_id",
+    "poi__name",
+    "poi__short_description",
+    "poi__type",
+    "poi__season",
+    "poi__physical_level",
+    "poi__base_cost",
+    "poi__latitude",
+    "poi__longitude",
+)
+
+
+def _points_qs(route: Route):
+    return (
+        RoutePoint.objects
+        .filter(route=route)
+        .order_by("day_number", "order_index", "id")
+        .values_list(*_FIELDS)
+    )
+
+
+def _record(row: tuple) -> PointRecord:
+    pk, day, order, note, hours, poi_pk, *poi = row
+    return PointRecord(pk, day, order, note, hours, PoiRecord(poi_pk, *poi))
+
+
+class RouteSnapshot:
+    """
+    Точки маршрута, загруженные одним запросом. Один снапшот на запрос
+    отдаётся логистике, внешним условиям, карте и шаблонам.
+    """
+
+    __slots__ = ("route", "points", "_days")
+
+    def __init__(self, route: Route, points: list[PointRecord]):
+        self.route = route
+        self.points = points
+        self._days: Optional[dict[int, list[PointRecord]]] = None
+
+    @property
+    def days(self) -> dict[int, list[PointRecord]]:
+        if self._days is None:
+            days: dict[int, list[PointRecord]] = {}
+            for p in self.points:
+                days.setdefault(p.day_number, []).append(p)
+            self._days = days
+        return self._days
+
+    def map_points(self) -> list[dict]:
+        return [
+            {
+                "lat": p.poi.latitude,
+                "lng": p.poi.longitude,
+                "name": p.poi.name,
+                "day": p.day_number,
+                "order": p.order_index,
+            }
+            for p in self.points
+            if p.poi.has_coords
+        ]
+
+    def map_points_json(self) -> str:
+        return json.dumps(self.map_points(), cls=DjangoJSONEncoder)
+
+
+def build_route_snapshot(route: Route) -> RouteSnapshot:
+    return RouteSnapshot(route, [_record(row) for row in _points_qs(route)])
+
+
+async def abuild_route_snapshot(route: Route) -> RouteSnapshot:
+    return RouteSnapshot(route, [_record(row) async for row in _points_qs(route)])
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import replace
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .catalog_version import get_catalog_version
+from .poi_preferences import interest_tokens
+from .route_alternatives import plan_route_alternatives, unique_plans
+from .route_builder import HOURS_PER_DAY, RoutePlan, plan_route_for_user
+from .route_equipment import build_equipment
+
+# Шаблоны подбора: одинаковые профили с одинаковым числом дней получают
+# одни и те же планы, поэтому ранжирование, раскладка и экипировка
+# считаются один раз на (сигнатуру профиля, дни, число вариантов, версию
+# каталога). Бюджет в ключ не входит: раскладка идёт по порядку кандидатов
+# и обрывается на превышении бюджета, так что план с бюджетом — ровно
+# префикс плана без него (apply_budget). Срок жизни — ROUTE_TEMPLATE_TIMEOUT
+# (там же — почему avg_rating и usage_count версию не меняют).
+
+
+def profile_signature(profile) -> str:
+    if profile is None:
+        return "anon"
+    data = [
+        profile.travel_style,
+        profile.budget_level,
+        profile.physical_level,
+        profile.preferred_season,
+        bool(profile.with_children),
+        sorted(interest_tokens(profile.interests)),
+    ]
+    return hashlib.sha1(json.dumps(data, ensure_ascii=False).encode()).hexdigest()[:16]
+
+
+def template_key(profile, days_count: int, k: int) -> str:
+    return f"tours:route-template:v{get_catalog_version()}:{profile_signature(profile)}:{days_count}:{k}"
+
+
+def apply_budget(template: RoutePlan, max_budget: Optional[int], profile) -> RoutePlan:
+    """План шаблона, урезанный так же, как его урезал бы pack_route с max_budget."""
+    if max_budget is None:
+        return template
+
+    total_cost = 0
+    for index, point in enumerate(template.points):
+        total_cost += point.poi.base_cost or 0
+        if total_cost > max_budget:
+            break
+    else:
+        return template
+
+    points = template.points[:index + 1]
+    last = points[-1]
+    day_hours = sum(float(p.visit_time_estimate) for p in points if p.day_number == last.day_number)
+    return replace(
+        template,
+        points=points,
+        total_duration_hours=int((last.day_number - 1) * HOURS_PER_DAY + day_hours),
+        total_cost=total_cost or None,
+        equipment=build_equipment(points=points, profile=profile),
+    )
+
+
+def get_route_plans(user, days_count: int, max_budget: Optional[int] = None, *, k: int = 1) -> list[RoutePlan]:
+    """Планы подбора (k > 1 — варианты) из шаблона; промах считает и кладёт шаблон."""
+    profile = getattr(user, "profile", None)
+    key = template_key(profile, days_count, k)
+    templates = cache.get(key)
+    if templates is None:
+        if k > 1:
+            templates = plan_route_alternatives(user, days_count, None, k=k)
+        else:
+            templates = [plan_route_for_user(user, days_count, None)]
+        cache.set(key, templates, getattr(settings, "ROUTE_TEMPLATE_TIMEOUT", 60 * 60))
+
+    return unique_plans([apply_budget(t, max_budget, profile) for t in templates])
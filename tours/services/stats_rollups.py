@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from ..models import DailyStats, Poi, PoiUsageDaily, Review, Route, RouteGeneration, RoutePoint
+
+# Админ-статистика читает только DailyStats / PoiUsageDaily; сами COUNT и
+# GROUP BY по большим таблицам выполняет команда rollup_stats (по cron),
+# причём только за последние дни — старые строки не пересчитываются.
+
+COUNTER_FIELDS = ("routes_created", "reviews_created", "routes_shared", "generations")
+
+CHART_WIDTH = 300
+CHART_HEIGHT = 60
+
+
+def _day_start(day: date) -> datetime:
+    """
+    Начало дня в текущем часовом поясе. Фильтр «поле >= момент» идёт по
+    индексу и отсекает секции, а __date__gte оборачивает колонку в функцию.
+    """
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _per_day(qs, date_field: str, start: Optional[date]) -> dict[date, int]:
+    if start is not None:
+        qs = qs.filter(**{f"{date_field}__gte": _day_start(start)})
+    rows = (
+        qs.order_by()
+        .annotate(day=TruncDate(date_field))
+        .values("day")
+        .annotate(n=Count("id"))
+    )
+    return {row["day"]: row["n"] for row in rows}
+
+
+def _counters(start: Optional[date]) -> dict[date, dict[str, int]]:
+    sources = {
+        "routes_created": _per_day(Route.objects.all(), "created_at", start),
+        "reviews_created": _per_day(Review.objects.all(), "created_at", start),
+        "routes_shared": _per_day(Route.objects.filter(shared_at__isnull=False), "shared_at", start),
+        "generations": _per_day(RouteGeneration.objects.all(), "created_at", start),
+    }
+    days: dict[date, dict[str, int]] = {}
+    for field, per_day in sources.items():
+        for day, n in per_day.items():
+            days.setdefault(day, dict.fromkeys(COUNTER_FIELDS, 0))[field] = n
+    return days
+
+
+def _poi_usage(start: Optional[date]) -> list[PoiUsageDaily]:
+    # по дню добавления точки: точка, добавленная в старый маршрут, попадает
+    # в пересчитываемое окно
+    qs = RoutePoint.objects.all()
+    if start is not None:
+        qs = qs.filter(created_at__gte=_day_start(start))
+    rows = (
+        qs.order_by()
+        .annotate(day=TruncDate("created_at"))
+        .values("day", "poi_id")
+        .annotate(n=Count("id"))
+    )
+    return [PoiUsageDaily(day=row["day"], poi_id=row["poi_id"], points=row["n"]) for row in rows]
+
+
+def rollup_daily_stats(days: Optional[int] = 3) -> int:
+    """
+    Пересчитывает срезы за последние `days` дней (None — за всю историю)
+    и общие итоги на сегодня. Возвращает число записанных дней.
+    """
+    today = timezone.localdate()
+    start = None if days is None else today - timedelta(days=days - 1)
+
+    counters = _counters(start)
+    # дни окна без событий тоже пишем (нулями), чтобы затереть старые значения
+    window = [today] if start is None else [start + timedelta(days=offset) for offset in range(days)]
+    for day in window:
+        counters.setdefault(day, dict.fromkeys(COUNTER_FIELDS, 0))
+
+    totals = {
+        "poi_total": Poi.objects.count(),
+        "routes_total": Route.objects.count(),
+        "reviews_total": Review.objects.count(),
+        "shared_total": Route.objects.filter(is_shared=True).count(),
+    }
+    usage = _poi_usage(start)
+
+    with transaction.atomic():
+        DailyStats.objects.bulk_create(
+            [DailyStats(day=day, **values) for day, values in counters.items()],
+            update_conflicts=True,
+            unique_fields=["day"],
+            update_fields=[*COUNTER_FIELDS, "computed_at"],
+        )
+        DailyStats.objects.filter(day=today).update(computed_at=timezone.now(), **totals)
+
+        stale = PoiUsageDaily.objects.all()
+        if start is not None:
+            stale = stale.filter(day__gte=start)
+        stale.delete()
+        PoiUsageDaily.objects.bulk_create(usage, batch_size=1000)
+
+    return len(counters)
+
+
+# --- чтение для дашборда ---
+
+
+def _chart(values: list[int]) -> dict:
+    """Точки polyline для SVG-спарклайна (рисуется прямо в шаблоне)."""
+    peak = max(values, default=0) or 1
+    step = CHART_WIDTH / max(len(values) - 1, 1)
+    points = " ".join(
+        f"{i * step:.1f},{CHART_HEIGHT - value * CHART_HEIGHT / peak:.1f}" for i, value in enumerate(values)
+    )
+    return {"points": points, "peak": max(values, default=0), "total": sum(values)}
+
+
+def dashboard_stats(*, trend_days: int = 90, short_days: int = 30) -> dict:
+    today = timezone.localdate()
+    start = today - timedelta(days=trend_days - 1)
+    rows = {row.day: row for row in DailyStats.objects.filter(day__gte=start)}
+    latest = DailyStats.objects.exclude(routes_total=None).order_by("-day").first()
+
+    series = {field: [] for field in COUNTER_FIELDS}
+    for offset in range(trend_days):
+        row = rows.get(start + timedelta(days=offset))
+        for field in COUNTER_FIELDS:
+            series[field].append(getattr(row, field) if row else 0)
+
+    week = {field: sum(values[-7:]) for field, values in series.items()}
+    charts = {
+        field: {"short": _chart(values[-short_days:]), "long": _chart(values)}
+        for field, values in series.items()
+    }
+    return {
+        "totals": latest,
+        "week": week,
+        "charts": charts,
+        "trend_days": trend_days,
+        "short_days": short_days,
+        "chart_width": CHART_WIDTH,
+        "chart_height": CHART_HEIGHT,
+    }
+
+
+def top_poi_by_usage(*, days: Optional[int] = None, limit: int = 10) -> list[dict]:
+    if days is None:
+        # за всё время — готовый счётчик на Poi (индекс poi_usage_count_idx)
+        rows = Poi.objects.filter(usage_count__gt=0).order_by("-usage_count", "name")[:limit]
+        return [
+            {"poi_id": pk, "poi__name": name, "uses": uses}
+            for pk, name, uses in rows.values_list("id", "name", "usage_count")
+        ]
+    return list(
+        PoiUsageDaily.objects.filter(day__gte=timezone.localdate() - timedelta(days=days - 1))
+        .values("poi_id", "poi__name")
+        .annotate(uses=Sum("points"))
+        .order_by("-uses", "poi__name")[:limit]
+    )
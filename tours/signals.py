@@ -1,8 +1,12 @@
 from django.contrib.auth import get_user_model
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_init, post_save
 from django.dispatch import receiver
 
-from .models import UserProfile
+from .models import Poi, Review, RoutePoint, UserProfile
+from .services.catalog_version import bump_catalog_version
+from .services.poi_ratings import apply_review_change
+from .services.poi_search import SEARCH_VECTOR_FIELDS, update_poi_search_vectors
+from .services.poi_usage import add_poi_usage
 
 User = get_user_model()
 
@@ -11,3 +15,63 @@ User = get_user_model()
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
         UserProfile.objects.create(user=instance)
+
+
+@receiver(post_save, sender=Poi)
+def update_poi_search_vector(sender, instance, update_fields=None, **kwargs):
+    # save(update_fields=["avg_rating"]) и т.п. текст не меняют
+    if update_fields is not None and not set(update_fields) & set(SEARCH_VECTOR_FIELDS):
+        return
+    update_poi_search_vectors(Poi.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Poi)
+@receiver(post_delete, sender=Poi)
+def bump_catalog_on_poi_change(sender, **kwargs):
+    bump_catalog_version()
+
+
+# --- счётчики оценок Poi ---
+
+
+@receiver(post_init, sender=Review)
+def remember_review_rating(sender, instance, **kwargs):
+    # оценка на момент загрузки: при правке отзыва счётчики сдвигаются на разницу
+    # (через __dict__, чтобы не догружать отложенное поле)
+    instance._saved_rating = instance.__dict__.get("rating") if instance.pk else None
+
+
+@receiver(post_save, sender=Review)
+def count_review_rating(sender, instance, created, **kwargs):
+    old = None if created else instance._saved_rating
+    apply_review_change(instance.poi_id, old, instance.rating)
+    instance._saved_rating = instance.rating
+
+
+@receiver(post_delete, sender=Review)
+def uncount_review_rating(sender, instance, **kwargs):
+    apply_review_change(instance.poi_id, instance._saved_rating, None)
+
+
+# --- Poi.usage_count ---
+
+
+@receiver(post_init, sender=RoutePoint)
+def remember_route_point_poi(sender, instance, **kwargs):
+    instance._saved_poi_id = instance.__dict__.get("poi_id") if instance.pk else None
+
+
+@receiver(post_save, sender=RoutePoint)
+def count_route_point_usage(sender, instance, created, **kwargs):
+    old = None if created else instance._saved_poi_id
+    if old != instance.poi_id:
+        if old is not None:
+            add_poi_usage([old], sign=-1)
+        add_poi_usage([instance.poi_id])
+    instance._saved_poi_id = instance.poi_id
+
+
+@receiver(post_delete, sender=RoutePoint)
+def uncount_route_point_usage(sender, instance, **kwargs):
+    if instance._saved_poi_id is not None:
+        add_poi_usage([instance._saved_poi_id], sign=-1)
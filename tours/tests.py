@@ -1,3 +1,750 @@
-from django.test import TestCase
+import json
+import tempfile
+import threading
+import time
+import unittest
+from datetime import timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.db.models import Avg, Count, Q, Sum
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from .models import (
+    DailyStats,
+    Poi,
+    PoiType,
+    PoiUsageDaily,
+    Review,
+    Route,
+    RouteGeneration,
+    RoutePoint,
+    UpstreamRateBucket,
+)
+from .services import poi_catalog, route_drafts, route_sharing
+from .services.external_conditions import get_external_conditions_provider
+from .services.external_conditions.async_http import AsyncRealHttpExternalConditionsProvider
+from .services.external_conditions.provider import DrivingLeg
+from .services.external_conditions.replay import RECORD, FixtureSession
+from .services.external_conditions.rate_limit import OSRM
+from .services.keyset import KeysetPaginator, _seek, encode_cursor
+from .services.poi_preferences import apply_profile_preferences, interest_terms
+from .services.poi_ratings import RATING_VALUES, recount_poi_ratings
+from .services.route_builder import DEFAULT_ROUTE_NAME, plan_route_for_user, save_route_plan
+from .services.route_cache import bump_route_version
+from .services.route_editing import add_route_point, delete_route_point
+from .services.route_history import history_window_start
+from .services.route_logistics import estimate_route_logistics, refresh_route_logistics
+from .services.route_queries import get_user_history_count
+from .services.route_retention import purge_abandoned_routes
+from .services.route_sharing import set_route_shared
+from .services.stats_rollups import rollup_daily_stats
+
+LEG = (51.7, 94.4, 51.6, 95.0)
+User = get_user_model()
+
+
+def make_poi(name: str = "Место", **fields) -> Poi:
+    defaults = {
+        "short_description": "Описание",
+        "type": PoiType.NATURE,
+        "latitude": Decimal("51.7"),
+        "longitude": Decimal("94.4"),
+        "base_cost": 100,
+    }
+    return Poi.objects.create(name=name, **{**defaults, **fields})
+
+
+def make_route(user, pois, **fields) -> Route:
+    route = Route.objects.create(user=user, name=fields.pop("name", "Маршрут"), **fields)
+    for index, poi in enumerate(pois, start=1):
+        RoutePoint.objects.create(route=route, poi=poi, day_number=1, order_index=index)
+    return route
+
+
+class _OsrmStandIn(BaseHTTPRequestHandler):
+    """Локальная заглушка OSRM: на любой маршрут отвечает 12 км / 15 минут."""
+
+    hits: list[str] = []
+
+    def do_GET(self):
+        self.hits.append(self.path)
+        body = json.dumps({"routes": [{"distance": 12000, "duration": 900}]}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class UpstreamRateLimitTests(TransactionTestCase):
+    """
+    Лимитер против локального сервера: провайдер ходит в сеть, пока в ведре
+    есть токены, дальше сразу отдаёт запасной вариант. TransactionTestCase —
+    асинхронный провайдер проверяет лимит из потоков пула, им нужны
+    закоммиченные строки ведра.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), _OsrmStandIn)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{cls.server.server_port}"
+        cls.overrides = override_settings(
+            EXTERNAL_CONDITIONS_PROVIDER="real_http",
+            EXTERNAL_CONDITIONS_BASE_URLS={OSRM: url},
+            # пополнение почти нулевое: за время теста токены не появятся
+            EXTERNAL_CONDITIONS_RATE_LIMITS={OSRM: {"rate_per_s": 0.001, "burst": 2}},
+        )
+        cls.overrides.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.overrides.disable()
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        _OsrmStandIn.hits.clear()
+
+    def test_burst_goes_to_server_then_falls_back(self):
+        provider = get_external_conditions_provider()
+        sources = [provider.driving_leg(*LEG).source for _ in range(4)]
+
+        self.assertEqual(sources, ["osrm", "osrm", "rate_limited", "rate_limited"])
+        self.assertEqual(len(_OsrmStandIn.hits), 2)
+
+    def test_bucket_is_shared_between_providers(self):
+        first = get_external_conditions_provider()
+        first.driving_leg(*LEG)
+        first.driving_leg(*LEG)
+
+        # другой экземпляр (как другой воркер) видит то же ведро в БД
+        second = get_external_conditions_provider()
+        self.assertEqual(second.driving_leg(*LEG).source, "rate_limited")
+        self.assertEqual(len(_OsrmStandIn.hits), 2)
+
+    def test_tokens_refill_over_time(self):
+        provider = get_external_conditions_provider()
+        for _ in range(3):
+            provider.driving_leg(*LEG)
+
+        # 1000 с при 0.001 токена/с — ровно один токен
+        UpstreamRateBucket.objects.filter(upstream=OSRM).update(refilled_at=time.time() - 1000)
+        self.assertEqual(provider.driving_leg(*LEG).source, "osrm")
+        self.assertEqual(provider.driving_leg(*LEG).source, "rate_limited")
+        self.assertEqual(len(_OsrmStandIn.hits), 3)
+
+    def test_async_provider_uses_the_same_bucket(self):
+        get_external_conditions_provider().driving_leg(*LEG)
+
+        async def run():
+            # по очереди: параллельные записи в SQLite упираются в блокировку
+            # таблицы, и лимитер (fail-open) пропустил бы запрос
+            provider = AsyncRealHttpExternalConditionsProvider()
+            try:
+                return [await provider.driving_leg(*LEG) for _ in range(3)]
+            finally:
+                await provider.aclose()
+
+        legs = async_to_sync(run)()
+
+        self.assertEqual([leg.source for leg in legs], ["osrm", "rate_limited", "rate_limited"])
+        self.assertEqual(len(_OsrmStandIn.hits), 2)
+        self.assertEqual({leg.distance_km for leg in legs if leg.source == "osrm"}, {12.0})
+
+    @override_settings(EXTERNAL_CONDITIONS_RATE_LIMITS={})
+    def test_upstream_without_limit_is_not_throttled(self):
+        provider = get_external_conditions_provider()
+        sources = {provider.driving_leg(*LEG).source for _ in range(5)}
+
+        self.assertEqual(sources, {"osrm"})
+        self.assertFalse(UpstreamRateBucket.objects.exists())
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(prefix="tours-tests-"))
+class ShareSnapshotViewerTests(TestCase):
+    """Шапка публичной страницы своя у каждого зрителя, и 304 — тоже."""
+
+    def setUp(self):
+        self.owner = User.objects.create_user("owner", password="pw")
+        self.route = make_route(self.owner, [make_poi("Озеро Чагытай")])
+        set_route_shared(self.route, True)
+        self.url = f"/routes/share/{self.route.share_uuid}/"
+
+    def test_anonymous_validator_does_not_match_logged_in_page(self):
+        self.client.force_login(self.owner)
+        self.client.get(self.url)  # выставляет csrf-куку
+        logged_in = self.client.get(self.url)
+        self.assertContains(logged_in, "csrfmiddlewaretoken")
+        self.assertIn("private", logged_in["Cache-Control"])
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=logged_in["ETag"]).status_code, 304)
+
+        self.client.logout()
+        anonymous = self.client.get(self.url, HTTP_IF_NONE_MATCH=logged_in["ETag"])
+        self.assertEqual(anonymous.status_code, 200)
+        self.assertNotContains(anonymous, "csrfmiddlewaretoken")
+        self.assertIn("public", anonymous["Cache-Control"])
+        self.assertContains(anonymous, "Озеро Чагытай")
+
+    def test_republish_keeps_the_file_readers_use(self):
+        name = route_sharing._snapshot_name(self.route, "body.html")
+        with mock.patch.object(default_storage, "delete", wraps=default_storage.delete) as delete:
+            route_sharing.publish_share_snapshot(self.route)
+
+        self.assertNotIn(mock.call(name), delete.call_args_list)
+        self.assertIsNotNone(route_sharing.read_share_snapshot(self.route))
+
+    def test_concurrent_write_leaves_no_suffixed_copy(self):
+        name = route_sharing._snapshot_name(self.route, "body.html")
+        directory = route_sharing._snapshot_dir(self.route.share_uuid)
+        before = sorted(default_storage.listdir(directory)[1])
+
+        # другой воркер записал снапшот между exists() и save() этого:
+        # первая проверка файла его ещё не видит
+        real_exists, checked = default_storage.exists, set()
+
+        def exists(path):
+            if path in checked:
+                return real_exists(path)
+            checked.add(path)
+            return False
+
+        with mock.patch.object(default_storage, "exists", side_effect=exists):
+            route_sharing._write(name, "<main></main>")
+
+        self.assertEqual(sorted(default_storage.listdir(directory)[1]), before)
+
+    def test_other_user_gets_own_chrome(self):
+        self.client.force_login(self.owner)
+        etag = self.client.get(self.url)["ETag"]
+
+        self.client.force_login(User.objects.create_user("guest", password="pw"))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "guest")
+
+
+class LogisticsRefreshTests(TestCase):
+    """Фоновое обновление логистики не затирает правку, сделанную во время запросов."""
+
+    def setUp(self):
+        self.user = User.objects.create_user("u", password="pw")
+        self.pois = [
+            make_poi(f"Место {i}", latitude=Decimal("51.7") + i, longitude=Decimal("94.4")) for i in range(3)
+        ]
+        self.route = make_route(self.user, self.pois[:2])
+        bump_route_version(self.route, logistics=estimate_route_logistics(self.route))
+
+    def _provider(self, on_call=None):
+        provider = mock.Mock()
+
+        def driving_leg(*coords):
+            if on_call is not None:
+                on_call()
+            return DrivingLeg(distance_km=100.0, duration_min=60, source="osrm")
+
+        provider.driving_leg.side_effect = driving_leg
+        return provider
+
+    def _edit(self):
+        # правка из другого запроса: своя копия строки, третья точка и оценка
+        route = Route.objects.get(pk=self.route.pk)
+        RoutePoint.objects.create(route=route, poi=self.pois[2], day_number=1, order_index=3)
+        bump_route_version(route, logistics=estimate_route_logistics(route))
+
+    def test_refresh_replaces_estimates(self):
+        version = self.route.version
+        with mock.patch("tours.services.route_logistics.get_external_provider", return_value=self._provider()):
+            logistics = refresh_route_logistics(self.route)
+
+        self.assertFalse(logistics["pending"])
+        self.assertEqual(logistics["total_km"], 100.0)
+        self.assertEqual(Route.objects.get(pk=self.route.pk).version, version + 1)
+
+    def test_concurrent_edit_is_not_overwritten(self):
+        edits = []
+
+        def edit_once():
+            if not edits:
+                edits.append(1)
+                self._edit()
+
+        provider = self._provider(on_call=edit_once)
+        with mock.patch("tours.services.route_logistics.get_external_provider", return_value=provider):
+            refresh_route_logistics(self.route)
+
+        stored = Route.objects.get(pk=self.route.pk).logistics
+        # обе ноги трёх точек посчитаны провайдером, первая — без повторного запроса
+        self.assertEqual(stored["total_km"], 200.0)
+        self.assertFalse(stored["pending"])
+        self.assertEqual(provider.driving_leg.call_count, 2)
+
+
+class PurgeAbandonedRoutesTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("u", password="pw")
+        self.poi = make_poi()
+
+    def _old_route(self, **fields) -> Route:
+        route = make_route(self.user, [self.poi], name=DEFAULT_ROUTE_NAME, **fields)
+        long_ago = timezone.now() - timedelta(days=400)
+        Route.objects.filter(pk=route.pk).update(created_at=long_ago, last_viewed_at=long_ago)
+        return route
+
+    def test_only_autosaved_routes_are_purged(self):
+        autosaved = self._old_route(autosaved=True)
+        saved = self._old_route()
+
+        progress = purge_abandoned_routes(older_than_days=90, unviewed_days=90)
+
+        self.assertEqual((progress.routes, progress.points), (1, 1))
+        self.assertFalse(Route.objects.filter(pk=autosaved.pk).exists())
+        self.assertTrue(Route.objects.filter(pk=saved.pk).exists())
+
+    def test_edited_or_shared_autosaved_routes_are_kept(self):
+        edited = self._old_route(autosaved=True, edited_at=timezone.now())
+        shared = self._old_route(autosaved=True, shared_at=timezone.now())
+
+        self.assertEqual(purge_abandoned_routes(older_than_days=90, unviewed_days=90).routes, 0)
+        self.assertEqual(Route.objects.filter(pk__in=[edited.pk, shared.pk]).count(), 2)
+
+
+def interest_profile(interests: str) -> SimpleNamespace:
+    return SimpleNamespace(
+        interests=interests,
+        travel_style="MIXED",
+        preferred_season="SUMMER",
+        physical_level="MEDIUM",
+        with_children=False,
+        budget_level="MEDIUM",
+    )
+
+
+class InterestMatchingTests(SimpleTestCase):
+    """
+    Snowball даёт «шаманизм» -> 'шаманизм', «шаманская» -> 'шаманск',
+    «горы» -> 'гор', «город» -> 'город'.
+    """
+
+    def test_long_stems_match_by_prefix(self):
+        ((term, prefix),) = interest_terms(["шаманизм"])
+        self.assertTrue(prefix)
+        self.assertTrue("шаманск".startswith(term))
+
+    def test_short_stems_match_whole(self):
+        self.assertEqual(interest_terms(["гор"]), [("гор", False)])
+
+    @unittest.skipUnless(poi_catalog.numpy_available(), "нужен numpy")
+    def test_numpy_engine_uses_the_same_terms(self):
+        def row(pk):
+            values = {"id": pk, "name": f"POI {pk}", "type": PoiType.NATURE, "season": "SUMMER",
+                      "physical_level": "EASY", "price_level": "LOW", "usage_count": 0}
+            return tuple(values.get(name) for name in poi_catalog._FIELDS)
+
+        vectors = ["'шаманск':1A 'троп':2A", "'город':1A"]
+        catalog = poi_catalog.PoiCatalog(
+            1, [row(1), row(2)], [poi_catalog._lexemes(v) for v in vectors], uses_lexemes=True
+        )
+        with mock.patch.object(poi_catalog, "interest_lexemes", return_value=["шаманизм", "гор"]):
+            scores = catalog._scores(interest_profile("шаманизм горы"))
+
+        self.assertGreater(scores[0], 0)
+        self.assertEqual(scores[1], 0)
+
+
+@unittest.skipUnless(connection.vendor == "postgresql", "полнотекстовый поиск — только PostgreSQL")
+class InterestSearchPostgresTests(TestCase):
+    def test_shamanism_matches_shamanic_but_mountains_do_not_match_city(self):
+        shamanic = make_poi("Шаманская тропа")
+        city = make_poi("Город Кызыл")
+
+        qs = apply_profile_preferences(Poi.objects.all(), interest_profile("шаманизм, горы"))
+        scores = dict(qs.values_list("pk", "interest_score"))
+
+        self.assertGreater(scores[shamanic.pk], 0)
+        self.assertEqual(scores[city.pk], 0)
+
+
+class HistoryCountTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("u", password="pw")
+
+    def _generation(self) -> RouteGeneration:
+        # прямо через ORM, как запись из другого воркера: локальный кеш никто не сбрасывает
+        return RouteGeneration.objects.create(user=self.user, days_count=1)
+
+    def test_count_follows_new_generations(self):
+        self._generation()
+        self.assertEqual(get_user_history_count(self.user), 1)
+
+        self._generation()
+        self.assertEqual(get_user_history_count(self.user), 2)
+
+    def test_entries_outside_window_are_not_counted(self):
+        old, _ = self._generation(), self._generation()
+        self.assertEqual(get_user_history_count(self.user), 2)
+
+        RouteGeneration.objects.filter(pk=old.pk).update(created_at=history_window_start() - timedelta(days=1))
+        self._generation()
+        self.assertEqual(get_user_history_count(self.user), 2)
+
+
+class PoiRatingCountersTests(TestCase):
+    """Счётчики оценок POI сдвигаются на разницу и совпадают с агрегатами по Review."""
+
+    def setUp(self):
+        self.poi = make_poi()
+        self.users = [User.objects.create_user(f"u{i}", password="pw") for i in range(4)]
+
+    def assertCountersMatchReviews(self):
+        poi = Poi.objects.get(pk=self.poi.pk)
+        reviews = Review.objects.filter(poi=poi)
+        expected = reviews.aggregate(
+            avg=Avg("rating"), count=Count("id"), total=Sum("rating"),
+            **{f"r{v}": Count("id", filter=Q(rating=v)) for v in RATING_VALUES},
+        )
+        self.assertEqual(poi.rating_count, expected["count"])
+        self.assertEqual(poi.rating_sum, expected["total"] or 0)
+        if expected["avg"] is None:
+            self.assertIsNone(poi.avg_rating)
+        else:
+            self.assertAlmostEqual(poi.avg_rating, expected["avg"])
+        for v in RATING_VALUES:
+            self.assertEqual(getattr(poi, f"rating_{v}"), expected[f"r{v}"], f"rating_{v}")
+
+    def _review(self, user, rating) -> Review:
+        return Review.objects.create(user=user, poi=self.poi, rating=rating)
+
+    def test_create(self):
+        for user, rating in zip(self.users, (5, 4, 4, 1)):
+            self._review(user, rating)
+        self.assertCountersMatchReviews()
+
+    def test_edit_loaded_review(self):
+        self._review(self.users[0], 5)
+        review = self._review(self.users[1], 2)
+
+        # отзыв, загруженный заново (post_init запоминает старую оценку)
+        review = Review.objects.get(pk=review.pk)
+        review.rating = 4
+        review.save()
+        self.assertCountersMatchReviews()
+
+        # повторная правка того же объекта — от уже сохранённой оценки
+        review.rating = 3
+        review.save()
+        review.text = "без смены оценки"
+        review.save()
+        self.assertCountersMatchReviews()
+
+    def test_delete(self):
+        first = self._review(self.users[0], 5)
+        self._review(self.users[1], 3)
+
+        Review.objects.get(pk=first.pk).delete()
+        self.assertCountersMatchReviews()
+
+        Review.objects.get(user=self.users[1]).delete()
+        self.assertCountersMatchReviews()
+
+    def test_recount_repairs_counters(self):
+        for user, rating in zip(self.users, (5, 2, 2)):
+            self._review(user, rating)
+        Poi.objects.filter(pk=self.poi.pk).update(rating_sum=0, rating_count=7, rating_2=0, avg_rating=1.0)
+
+        recount_poi_ratings(Poi.objects.filter(pk=self.poi.pk))
+        self.assertCountersMatchReviews()
+
+
+class PoiUsageCountTests(TestCase):
+    """
+    usage_count ведут три пути: сигналы RoutePoint, add_poi_usage после
+    bulk_create в save_route_plan и пакетное удаление purge_abandoned_routes.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user("u", password="pw")
+        self.pois = [make_poi(f"Место {i}", base_cost=100 * i) for i in range(6)]
+
+    def assertUsageMatchesPoints(self):
+        expected = dict(
+            RoutePoint.objects.order_by().values("poi").annotate(n=Count("id")).values_list("poi", "n")
+        )
+        actual = dict(Poi.objects.values_list("pk", "usage_count"))
+        self.assertEqual(actual, {pk: expected.get(pk, 0) for pk in actual})
+
+    def test_save_edit_and_delete_keep_usage_in_sync(self):
+        first = save_route_plan(self.user, plan_route_for_user(self.user, 2))
+        second = save_route_plan(self.user, plan_route_for_user(self.user, 1))
+        self.assertTrue(first.points.exists())
+        self.assertUsageMatchesPoints()
+
+        add_route_point(user=self.user, route_pk=first.pk, poi=self.pois[0], day_number=1)
+        add_route_point(user=self.user, route_pk=first.pk, poi=self.pois[0], day_number=2)
+        self.assertUsageMatchesPoints()
+
+        point = first.points.order_by("id").first()
+        delete_route_point(user=self.user, route_pk=first.pk, point_pk=point.pk)
+        self.assertUsageMatchesPoints()
+
+        # точку перевесили на другой POI
+        point = RoutePoint.objects.get(pk=second.points.order_by("id").first().pk)
+        point.poi = self.pois[5]
+        point.save()
+        self.assertUsageMatchesPoints()
+
+        second.delete()
+        self.assertUsageMatchesPoints()
+
+    def test_purge_keeps_usage_in_sync(self):
+        kept = make_route(self.user, self.pois[:3])
+        purged = make_route(self.user, self.pois[1:4] + self.pois[1:2], name=DEFAULT_ROUTE_NAME, autosaved=True)
+        long_ago = timezone.now() - timedelta(days=400)
+        Route.objects.filter(pk=purged.pk).update(created_at=long_ago, last_viewed_at=long_ago)
+
+        self.assertEqual(purge_abandoned_routes(older_than_days=90, unviewed_days=90).routes, 1)
+        self.assertTrue(Route.objects.filter(pk=kept.pk).exists())
+        self.assertUsageMatchesPoints()
+
+
+class RouteDraftLifecycleTests(TestCase):
+    """Подбор -> черновик в кеше -> «Сохранить» (в том числе дважды) -> уборка."""
+
+    def setUp(self):
+        # шаблоны подбора лежат в кеше по версии каталога, а версия после
+        # отката транзакции теста повторяется
+        cache.clear()
+        self.user = User.objects.create_user("u", password="pw")
+        for i in range(8):
+            make_poi(f"Место {i}", latitude=Decimal("51.5") + Decimal(i) / 10, base_cost=100 * i)
+        self.client.force_login(self.user)
+
+    def _draft_url(self) -> str:
+        response = self.client.post("/", {"days_count": 2, "max_budget": ""})
+        self.assertEqual(response.status_code, 302)
+        return response["Location"]
+
+    def test_generation_writes_nothing_until_save(self):
+        url = self._draft_url()
+
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertFalse(Route.objects.exists())
+        self.assertFalse(RouteGeneration.objects.exists())
+
+    def test_draft_is_private(self):
+        token = route_drafts.create_route_drafts(self.user, 1)[0].token
+        stranger = User.objects.create_user("stranger", password="pw")
+
+        self.assertIsNone(route_drafts.get_route_draft(stranger, token))
+        self.assertIsNone(route_drafts.save_route_draft(stranger, token))
+        self.assertIsNotNone(route_drafts.get_route_draft(self.user, token))
+
+    def test_double_save_returns_the_same_route(self):
+        url = self._draft_url()
+
+        first = self.client.post(url + "save/")
+        second = self.client.post(url + "save/")
+
+        route = Route.objects.get()
+        self.assertEqual(first["Location"], f"/routes/{route.pk}/")
+        self.assertEqual(second["Location"], first["Location"])
+        self.assertEqual(RouteGeneration.objects.get().route, route)
+        self.assertFalse(route.autosaved)
+        self.assertTrue(route.points.exists())
+        # черновик после сохранения больше не открывается
+        self.assertRedirects(self.client.get(url), "/", fetch_redirect_response=False)
+
+    def test_save_waits_for_a_save_in_progress(self):
+        token = route_drafts.create_route_drafts(self.user, 1)[0].token
+        saved_key = route_drafts._saved_key(token)
+        other = make_route(self.user, [])
+        # параллельный запрос уже начал сохранение (маркер 0) и допишет id
+        route_drafts._cache().add(saved_key, 0)
+
+        def other_request_finishes(_seconds):
+            route_drafts._cache().set(saved_key, other.pk)
+
+        with mock.patch.object(route_drafts.time, "sleep", side_effect=other_request_finishes):
+            self.assertEqual(route_drafts.save_route_draft(self.user, token), other)
+
+    @override_settings(ROUTE_DRAFTS_PER_USER=2)
+    def test_oldest_drafts_are_evicted_over_the_limit(self):
+        tokens = [route_drafts.create_route_drafts(self.user, 1)[0].token for _ in range(3)]
+
+        self.assertIsNone(route_drafts.get_route_draft(self.user, tokens[0]))
+        self.assertIsNotNone(route_drafts.get_route_draft(self.user, tokens[2]))
+        self.assertEqual(set(route_drafts._cache().get(route_drafts.INDEX_KEY)), set(tokens[1:]))
+
+    def test_sweep_removes_expired_drafts(self):
+        drafts = route_drafts.create_route_drafts(self.user, 1, k=2)
+        self.assertEqual(route_drafts.sweep_route_drafts(), 0)
+
+        later = drafts[0].expires_at + 1
+        with mock.patch.object(route_drafts.time, "time", return_value=later):
+            self.assertEqual(route_drafts.sweep_route_drafts(), len(drafts))
+
+        self.assertEqual(route_drafts._cache().get(route_drafts.INDEX_KEY), {})
+        self.assertIsNone(route_drafts.get_route_draft(self.user, drafts[0].token))
+
+
+class KeysetPaginatorTests(TestCase):
+    """Листание вперёд и назад совпадает с обычной сортировкой, в том числе на равных ключах."""
+
+    def setUp(self):
+        user = User.objects.create_user("u", password="pw")
+        now = timezone.now().replace(microsecond=123456)
+        for i in range(7):
+            RouteGeneration.objects.create(user=user, days_count=1 + i % 2)
+        # три пары записей с одинаковым created_at
+        for i, gen in enumerate(RouteGeneration.objects.order_by("id")):
+            RouteGeneration.objects.filter(pk=gen.pk).update(created_at=now - timedelta(minutes=i // 2))
+        self.qs = RouteGeneration.objects.all()
+
+    def _walk(self, keys, per_page=3):
+        paginator = KeysetPaginator(self.qs, keys, per_page)
+        pages = [paginator.page()]
+        while pages[-1].has_next:
+            pages.append(paginator.page(after=pages[-1].next_cursor))
+        back = [pages[-1]]
+        while back[-1].has_previous:
+            back.append(paginator.page(before=back[-1].previous_cursor))
+        return pages, back
+
+    def _ids(self, pages):
+        return [obj.pk for page in pages for obj in page.object_list]
+
+    def test_next_and_previous_across_ties(self):
+        keys = [("created_at", True), ("id", False)]
+        expected = list(self.qs.order_by("-created_at", "id").values_list("pk", flat=True))
+
+        pages, back = self._walk(keys)
+
+        self.assertEqual(self._ids(pages), expected)
+        self.assertEqual(self._ids(reversed(back)), expected)
+        self.assertFalse(pages[0].has_previous)
+        self.assertEqual([p.object_list for p in back], [p.object_list for p in reversed(pages)])
+
+    def test_mixed_directions(self):
+        keys = [("days_count", False), ("created_at", True), ("id", True)]
+        expected = list(self.qs.order_by("days_count", "-created_at", "-id").values_list("pk", flat=True))
+
+        pages, back = self._walk(keys, per_page=2)
+
+        self.assertEqual(self._ids(pages), expected)
+        self.assertEqual(self._ids(reversed(back)), expected)
+
+    def test_seek_is_strictly_after_values(self):
+        keys = [("days_count", False), ("created_at", True), ("id", True)]
+        ordered = list(self.qs.order_by("days_count", "-created_at", "-id"))
+        pivot = ordered[3]
+        values = [pivot.days_count, pivot.created_at, pivot.id]
+
+        after = self.qs.filter(_seek(keys, values, forward=True))
+        before = self.qs.filter(_seek(keys, values, forward=False))
+
+        self.assertEqual({g.pk for g in after}, {g.pk for g in ordered[4:]})
+        self.assertEqual({g.pk for g in before}, {g.pk for g in ordered[:3]})
+
+    def test_bad_cursor_gives_first_page(self):
+        paginator = KeysetPaginator(self.qs, [("created_at", True), ("id", False)], 3)
+        first = [g.pk for g in paginator.page().object_list]
+        bad = [
+            "не base64!",
+            encode_cursor({"id": 1}),
+            encode_cursor({"created_at": "вчера", "id": 1}),
+            encode_cursor({"created_at": "2026-01-01T00:00:00", "id": 1}),
+            encode_cursor({"created_at": timezone.now(), "id": None}),
+            encode_cursor({"created_at": timezone.now(), "id": True}),
+            encode_cursor({"created_at": timezone.now(), "id": [1]}),
+        ]
+        for cursor in bad:
+            with self.subTest(cursor=cursor):
+                for page in (paginator.page(after=cursor), paginator.page(before=cursor)):
+                    self.assertEqual([g.pk for g in page.object_list], first)
+                    self.assertFalse(page.has_previous)
+
+
+class StatsRollupTests(TestCase):
+    """rollup_stats пересчитывает только последние дни — события должны попадать в них."""
+
+    def setUp(self):
+        self.user = User.objects.create_user("u", password="pw")
+        self.poi = make_poi("Старое место")
+        self.today = timezone.localdate()
+
+    def test_point_added_to_old_route_counts_today(self):
+        route = make_route(self.user, [self.poi])
+        month_ago = timezone.now() - timedelta(days=30)
+        Route.objects.filter(pk=route.pk).update(created_at=month_ago)
+        RoutePoint.objects.filter(route=route).update(created_at=month_ago)
+
+        add_route_point(user=self.user, route_pk=route.pk, poi=make_poi("Новое место"), day_number=1)
+        rollup_daily_stats(3)
+
+        usage = PoiUsageDaily.objects.get(day=self.today)
+        self.assertEqual(usage.poi.name, "Новое место")
+        self.assertEqual(usage.points, 1)
+        self.assertEqual(DailyStats.objects.get(day=self.today).routes_created, 0)
+
+    def test_closed_share_still_counts_on_its_day(self):
+        shared = make_route(self.user, [])
+        closed = make_route(self.user, [])
+        with override_settings(MEDIA_ROOT=tempfile.mkdtemp(prefix="tours-share-")):
+            set_route_shared(shared, True)
+            set_route_shared(closed, True)
+            set_route_shared(closed, False)
+            first_opened = closed.shared_at
+            set_route_shared(closed, True)
+            set_route_shared(closed, False)
+
+        self.assertEqual(closed.shared_at, first_opened)
+        rollup_daily_stats(3)
+
+        stats = DailyStats.objects.get(day=self.today)
+        self.assertEqual(stats.routes_shared, 2)
+        self.assertEqual(stats.shared_total, 1)
+
+
+class ReplayRecordTests(SimpleTestCase):
+    def _session(self, fixtures_dir, *responses):
+        session = FixtureSession(
+            mode=RECORD, fixtures_dir=fixtures_dir, base_urls={"osrm": "http://osrm"}, profiles={}
+        )
+        session._live = mock.Mock()
+        session._live.request.side_effect = [
+            SimpleNamespace(url="http://osrm/route", status_code=status, json=lambda payload=payload: payload)
+            for status, payload in responses
+        ]
+        return session
+
+    def test_errors_do_not_replace_recorded_fixture(self):
+        with tempfile.TemporaryDirectory() as fixtures_dir:
+            session = self._session(fixtures_dir, (200, {"routes": []}), (429, {"message": "Too Many Requests"}))
+
+            session.get("http://osrm/route")
+            self.assertEqual(session.get("http://osrm/route").status_code, 429)
+
+            (fixture,) = (session.fixtures_dir / "osrm").iterdir()
+            saved = json.loads(fixture.read_text(encoding="utf-8"))
+            self.assertEqual((saved["status_code"], saved["payload"]), (200, {"routes": []}))
+
+    def test_errors_are_not_recorded(self):
+        with tempfile.TemporaryDirectory() as fixtures_dir:
+            session = self._session(fixtures_dir, (503, None))
+
+            self.assertEqual(session.get("http://osrm/route").status_code, 503)
+            self.assertFalse((session.fixtures_dir / "osrm").exists())
@@ -6,16 +6,28 @@ urlpatterns = [
     path("", views.home, name="home"),
     path("profile/", views.profile_view, name="profile"),
     path("my-routes/", views.my_routes, name="my_routes"),
+    path("routes/draft/<slug:token>/", views.route_draft, name="route_draft"),
+    path("routes/draft/<slug:token>/conditions/", views.route_draft_conditions, name="route_draft_conditions"),
+    path("routes/draft/<slug:token>/save/", views.route_draft_save, name="route_draft_save"),
     path("routes/<int:pk>/", views.route_detail, name="route_detail"),
+    path("routes/<int:pk>/conditions/", views.route_conditions, name="route_conditions"),
     path("routes/<int:pk>/print/", views.route_print, name="route_print"),
     path("routes/<int:pk>/share-toggle/", views.route_share_toggle, name="route_share_toggle"),
     path("routes/share/<uuid:share_uuid>/", views.route_share_detail, name="route_share_detail"),
+    path(
+        "routes/share/<uuid:share_uuid>/conditions/",
+        views.route_share_conditions,
+        name="route_share_conditions",
+    ),
     path("dashboard/", views.admin_stats, name="admin_stats"),
     path("history/", views.history_view, name="history"),
     path("routes/<int:pk>/optimize/", views.route_optimize, name="route_optimize"),
 
     path("places/", views.poi_list, name="poi_list"),
+    path("places/autocomplete/", views.poi_autocomplete, name="poi_autocomplete"),
     path("places/<int:pk>/", views.poi_detail, name="poi_detail"),
+    path("places/<int:pk>/reviews/", views.poi_reviews, name="poi_reviews"),
+    path("places/<int:pk>/photos/", views.poi_photos, name="poi_photos"),
 
     path("routes/<int:route_pk>/points/add/",
          views.route_point_add,
@@ -1,37 +1,65 @@
+import asyncio
+import hashlib
 import json
 
-from django.db.models import Q
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.core.serializers.json import DjangoJSONEncoder
+from django.contrib import messages
 from django.contrib.auth import login
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import UserCreationForm
-from django.shortcuts import get_object_or_404, redirect, render
-from django.db.models import Avg
-from django.core.paginator import Paginator
+from django.shortcuts import aget_object_or_404, get_object_or_404, redirect, render
+from django.http import Http404, HttpResponse, JsonResponse
+from django.template.loader import render_to_string
+from django.utils.formats import number_format
 from django.urls import reverse
-from datetime import timedelta
 from django.contrib.admin.views.decorators import staff_member_required
-from django.db.models import Count
-from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.utils.safestring import mark_safe
+from django.views.decorators.cache import cache_control
 from django.views.decorators.http import require_POST
+from django.views.decorators.vary import vary_on_cookie
 
-from .models import RoutePoint
 from .forms import RouteRequestForm, UserProfileForm
 from .models import Route
-from .models import Poi, PoiPhoto, Review
+from .models import Poi
 from .forms import PoiFilterForm
 from .forms import ReviewForm
 from .forms import RoutePointAddForm
 
-from .services.external_conditions.presenter import build_external_conditions_context
+from .services.external_conditions.presenter import abuild_external_conditions_context
 from .services.route_optimizer import optimize_route_points
-from .services.route_logistics_presenter import build_logistics_context
-from .services.route_map import get_route_map_points_json
-from .services.route_queries import get_user_history
-from .services.route_history import log_route_generation
-from .services.route_builder import build_route_for_user
-from .services.route_queries import get_user_routes, get_route_days
+from .services.route_logistics_presenter import (
+    abuild_logistics_context,
+    build_day_blocks,
+    build_logistics_context,
+)
+from .services.stats_rollups import dashboard_stats, top_poi_by_usage
+from .services.catalog_version import aget_catalog_version, get_catalog_version
+from .services.route_sharing import aget_share_body_html, set_route_shared
+from .services.route_cache import (
+    aget_route_page_data,
+    get_route_page_data,
+    route_etag,
+    route_last_modified,
+)
+from .services.keyset import KeysetPaginator
+from .services.poi_detail import photos_page, rating_summary, reviews_page, user_review
+from .services.poi_facets import get_catalog_page, get_facet_counts, normalize_filters
+from .services.route_queries import HISTORY_KEYS, get_user_history, get_user_history_count
+from .services.poi_search import autocomplete_pois
+from .templatetags.timefmt import minutes_human
+from .services.route_alternatives import VARIANT_LABELS
+from .services.route_drafts import (
+    aget_route_draft,
+    create_route_drafts,
+    get_route_draft,
+    save_route_draft,
+)
+from .services.route_queries import get_user_routes
+from .services.route_retention import atouch_route_viewed, touch_route_viewed
 from .services.route_editing import (
     add_route_point as svc_add_route_point,
     delete_route_point as svc_delete_route_point,
@@ -49,87 +77,69 @@ def home(request):
         if form.is_valid():
             days_count = form.cleaned_data["days_count"]
             max_budget = form.cleaned_data["max_budget"]
-            route = build_route_for_user(
-                user=request.user,
-                days_count=days_count,
-                max_budget=max_budget,
+            # только черновик в кеше; в БД маршрут попадёт по кнопке «Сохранить»
+            drafts = create_route_drafts(
+                request.user, days_count, max_budget, k=settings.ROUTE_ALTERNATIVES
             )
-            log_route_generation(user=request.user, route=route, days_count=days_count, max_budget=max_budget)
-            return redirect("route_detail", pk=route.pk)
+            return redirect("route_draft", token=drafts[0].token)
     else:
         form = RouteRequestForm()
 
     return render(request, "tours/home.html", {"form": form})
 
 
+@cache_control(public=True, max_age=60)
+def poi_autocomplete(request):
+    return JsonResponse({"results": autocomplete_pois(request.GET.get("q", ""))})
+
+
 def poi_list(request):
     form = PoiFilterForm(request.GET or None)
-    qs = Poi.objects.all()
-
-    if form.is_valid():
-        q = form.cleaned_data.get("q")
-        poi_type = form.cleaned_data.get("type")
-        region = form.cleaned_data.get("region")
-        season = form.cleaned_data.get("season")
-        price_level = form.cleaned_data.get("price_level")
-        physical_level = form.cleaned_data.get("physical_level")
-
-        if q:
-            qs = qs.filter(Q(name__icontains=q) | Q(short_description__icontains=q))
-        if poi_type:
-            qs = qs.filter(type=poi_type)
-        if region:
-            qs = qs.filter(region__icontains=region)
-        if season:
-            qs = qs.filter(season=season)
-        if price_level:
-            qs = qs.filter(price_level=price_level)
-        if physical_level:
-            qs = qs.filter(physical_level=physical_level)
-
-    qs = qs.order_by("-avg_rating", "base_cost", "name")
-
-    paginator = Paginator(qs, 12)
-    page_obj = paginator.get_page(request.GET.get("page"))
+    filters = normalize_filters(form.cleaned_data if form.is_valid() else None)
+
+    # счётчики фасетов и упорядоченные id выдачи берутся из кеша
+    # (ключ — сигнатура фильтра и версия каталога)
+    facets = get_facet_counts(filters)
+    form.apply_facet_counts(facets)
+    page_obj = get_catalog_page(
+        filters, 12, after=request.GET.get("after"), before=request.GET.get("before")
+    )
 
     params = request.GET.copy()
-    params.pop("page", None)
+    for name in ("after", "before", "page"):
+        params.pop(name, None)
     base_qs = params.urlencode()
 
     return render(
         request,
         "tours/poi_list.html",
-        {"form": form, "page_obj": page_obj, "base_qs": base_qs},
+        {"form": form, "page_obj": page_obj, "base_qs": base_qs, "region_facets": facets["region"]},
     )
 
 
 def poi_detail(request, pk: int):
     poi = get_object_or_404(Poi, pk=pk)
-
-    user_review = None
-    if request.user.is_authenticated:
-        user_review = Review.objects.filter(poi=poi, user=request.user).first()
+    own_review = user_review(poi, request.user)
 
     if request.method == "POST":
         if not request.user.is_authenticated:
             return redirect("login")
 
-        form = ReviewForm(request.POST, instance=user_review)
+        form = ReviewForm(request.POST, instance=own_review)
         if form.is_valid():
             review = form.save(commit=False)
             review.user = request.user
             review.poi = poi
+            # счётчики и avg_rating обновляет сигнал (services.poi_ratings)
             review.save()
 
-            poi.avg_rating = Review.objects.filter(poi=poi).aggregate(v=Avg("rating"))["v"]
-            poi.save(update_fields=["avg_rating"])
-
             return redirect("poi_detail", pk=poi.pk)
     else:
-        form = ReviewForm(instance=user_review)
+        form = ReviewForm(instance=own_review)
 
-    photos = PoiPhoto.objects.filter(poi=poi).order_by("-created_at")
-    reviews = Review.objects.filter(poi=poi).select_related("user").order_by("-created_at")
+    # первые порции отзывов и фото, остальное — через poi_reviews / poi_photos
+    photos = photos_page(poi.pk)
+    reviews = reviews_page(poi.pk)
 
     map_point = None
     if poi.latitude is not None and poi.longitude is not None:
@@ -139,14 +149,33 @@ def poi_detail(request, pk: int):
         "poi": poi,
         "photos": photos,
         "reviews": reviews,
+        "rating_summary": rating_summary(poi),
         "review_form": form,
-        "user_review": user_review,  # <-- ВАЖНО
+        "user_review": own_review,  # <-- ВАЖНО
         "map_point_json": json.dumps(map_point, cls=DjangoJSONEncoder) if map_point else "",
         "yandex_maps_api_key": settings.YANDEX_MAPS_API_KEY,
     }
     return render(request, "tours/poi_detail.html", context)
 
 
+def _fragment_response(request, template: str, page, url_name: str, pk: int) -> JsonResponse:
+    html = render_to_string(template, {"page": page}, request=request)
+    next_url = None
+    if page.has_next:
+        next_url = f"{reverse(url_name, args=[pk])}?after={page.next_cursor}"
+    return JsonResponse({"html": html, "next_url": next_url})
+
+
+def poi_reviews(request, pk: int):
+    page = reviews_page(pk, after=request.GET.get("after"))
+    return _fragment_response(request, "tours/_poi_reviews.html", page, "poi_reviews", pk)
+
+
+def poi_photos(request, pk: int):
+    page = photos_page(pk, after=request.GET.get("after"))
+    return _fragment_response(request, "tours/_poi_photos.html", page, "poi_photos", pk)
+
+
 @login_required
 def profile_view(request):
     profile = request.user.profile
@@ -166,10 +195,66 @@ def my_routes(request):
     return render(request, "tours/my_routes.html", {"routes": routes})
 
 
+async def _route_page_context(route: Route) -> dict:
+    """
+    Только данные из БД: погода, часы работы и километраж по дням
+    подгружаются страницей отдельно (route_conditions / route_share_conditions).
+    """
+    snapshot, map_points_json = await aget_route_page_data(route)
+    return {
+        "route": route,
+        "days": snapshot.days,
+        "day_blocks": build_day_blocks(snapshot.days),
+        "map_points_json": map_points_json,
+        "route_cache_timeout": settings.ROUTE_CACHE_TIMEOUT,
+        "yandex_maps_api_key": settings.YANDEX_MAPS_API_KEY,
+    }
+
+
+def _logistics_label(distance_km, time_minutes) -> str:
+    if not distance_km:
+        return ""
+    return f"~{number_format(distance_km, 1)} км, ~{minutes_human(time_minutes)}"
+
+
+async def _route_conditions_response(request, route: Route, snapshot=None):
+    """
+    Логистика и внешние условия друг от друга не зависят —
+    собираем их параллельно, ответ ждёт только самый медленный сервис.
+    """
+    if snapshot is None:
+        snapshot, _ = await aget_route_page_data(route)
+    logistics, conditions = await asyncio.gather(
+        abuild_logistics_context(route, snapshot),
+        abuild_external_conditions_context(route=route, snapshot=snapshot),
+    )
+
+    conditions_html = render_to_string("tours/_route_conditions.html", conditions)
+    if request.GET.get("format") == "html":
+        return HttpResponse(conditions_html)
+
+    return JsonResponse({
+        "conditions_html": conditions_html,
+        "total_label": _logistics_label(
+            logistics["logistics_total_km"], logistics["logistics_total_minutes"]
+        ),
+        "days": [
+            {
+                "day": b["day"],
+                "distance_km": b["distance_km"],
+                "time_minutes": b["time_minutes"],
+                "label": _logistics_label(b["distance_km"], b["time_minutes"]),
+            }
+            for b in logistics["day_blocks"]
+        ],
+    })
+
+
 @login_required
-def route_detail(request, pk: int):
-    route = get_object_or_404(Route, pk=pk, user=request.user)
-    days = get_route_days(route)
+async def route_detail(request, pk: int):
+    user = await request.auser()
+    route = await aget_object_or_404(Route, pk=pk, user=user)
+    await atouch_route_viewed(route)
 
     add_point_form = RoutePointAddForm(initial={"day_number": 1})
 
@@ -180,16 +265,67 @@ def route_detail(request, pk: int):
         )
 
     context = {
-        "route": route,
-        "days": days,
-        **build_logistics_context(days),
-        **build_external_conditions_context(route=route),
-        "map_points_json": get_route_map_points_json(route),
-        "yandex_maps_api_key": settings.YANDEX_MAPS_API_KEY,
+        **await _route_page_context(route),
+        "conditions_url": reverse("route_conditions", args=[route.pk]),
         "add_point_form": add_point_form,
         "share_url": share_url,
     }
-    return render(request, "tours/route_detail.html", context)
+    # шаблон трогает request.user и queryset формы — рендерим в sync-потоке
+    return await sync_to_async(render)(request, "tours/route_detail.html", context)
+
+
+@login_required
+@cache_control(private=True, max_age=settings.EXTERNAL_CONDITIONS_MAX_AGE)
+async def route_conditions(request, pk: int):
+    user = await request.auser()
+    route = await aget_object_or_404(Route, pk=pk, user=user)
+    return await _route_conditions_response(request, route)
+
+
+@login_required
+def route_draft(request, token: str):
+    draft = get_route_draft(request.user, token)
+    if draft is None:
+        messages.warning(request, "Черновик маршрута устарел — подберите маршрут ещё раз.")
+        return redirect("home")
+
+    route = draft.as_route()
+    snapshot = draft.snapshot(route)
+    return render(request, "tours/route_draft.html", {
+        "route": route,
+        "draft": draft,
+        "day_blocks": build_day_blocks(snapshot.days),
+        "map_points_json": snapshot.map_points_json(),
+        "conditions_url": reverse("route_draft_conditions", args=[token]),
+        "variants": [
+            {"token": t, "label": VARIANT_LABELS.get(v, v), "active": t == token}
+            for t, v in draft.siblings
+        ] if len(draft.siblings) > 1 else [],
+        "draft_hours": settings.ROUTE_DRAFT_TIMEOUT // 3600,
+        "yandex_maps_api_key": settings.YANDEX_MAPS_API_KEY,
+    })
+
+
+@login_required
+@cache_control(private=True, max_age=settings.EXTERNAL_CONDITIONS_MAX_AGE)
+async def route_draft_conditions(request, token: str):
+    user = await request.auser()
+    draft = await aget_route_draft(user, token)
+    if draft is None:
+        raise Http404
+    route = draft.as_route()
+    return await _route_conditions_response(request, route, draft.snapshot(route))
+
+
+@login_required
+@require_POST
+def route_draft_save(request, token: str):
+    route = save_route_draft(request.user, token)
+    if route is None:
+        messages.warning(request, "Черновик маршрута устарел — подберите маршрут ещё раз.")
+        return redirect("home")
+    return redirect("route_detail", pk=route.pk)
+
 
 def signup(request):
     if request.method == "POST":
@@ -244,11 +380,14 @@ def route_point_add(request, route_pk: int):
 @login_required
 def route_print(request, pk: int):
     route = get_object_or_404(Route, pk=pk, user=request.user)
-    days = get_route_days(route)
+    touch_route_viewed(route)
+    snapshot, _ = get_route_page_data(route)
 
     context = {
         "route": route,
-        **build_logistics_context(days),
+        **build_logistics_context(route, snapshot),
+        "route_cache_timeout": settings.ROUTE_CACHE_TIMEOUT,
+        "catalog_version": get_catalog_version(),
     }
     return render(request, "tours/route_print.html", context)
 
@@ -257,46 +396,79 @@ def route_print(request, pk: int):
 @require_POST
 def route_share_toggle(request, pk: int):
     route = get_object_or_404(Route, pk=pk, user=request.user)
-    route.is_shared = not route.is_shared
-    route.save(update_fields=["is_shared"])
+    set_route_shared(route, not route.is_shared)
     return redirect("route_detail", pk=route.pk)
 
 
-def route_share_detail(request, share_uuid):
-    route = get_object_or_404(Route, share_uuid=share_uuid, is_shared=True)
-    days = get_route_days(route)
+async def _conditional_route_response(
+        request, route: Route, build, *, with_conditions: bool = False, viewer: str = "",
+):
+    """
+    ETag/Last-Modified считаются по уже загруженной строке маршрута,
+    поэтому условный GET получает 304, не запуская ни одного презентера.
+    """
+    etag = route_etag(route, await aget_catalog_version(), with_conditions=with_conditions, viewer=viewer)
+    last_modified = int(route_last_modified(route, with_conditions=with_conditions).timestamp())
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = await build()
+
+    if request.method in ("GET", "HEAD"):
+        response.headers.setdefault("ETag", etag)
+        response.headers.setdefault("Last-Modified", http_date(last_modified))
+    return response
+
+
+async def _share_viewer(request) -> str:
+    """
+    Метка зрителя для ETag публичной страницы: шапка у вошедшего —
+    его меню и csrf-токен формы выхода, поэтому 304 допустим только
+    тому же пользователю с той же csrf-кукой.
+    """
+    user = await request.auser()
+    if not user.is_authenticated:
+        return "anon"
+    csrf = request.COOKIES.get(settings.CSRF_COOKIE_NAME, "")
+    return f"u{user.pk}-{hashlib.sha1(csrf.encode()).hexdigest()[:8]}"
+
+
+@vary_on_cookie
+async def route_share_detail(request, share_uuid):
+    route = await aget_object_or_404(Route, share_uuid=share_uuid, is_shared=True)
+    viewer = await _share_viewer(request)
+
+    async def build():
+        # тело — готовый снапшот из хранилища (ни точек, ни внешних сервисов),
+        # шапка с меню пользователя и csrf-токеном — под этот запрос
+        body = await aget_share_body_html(route)
+        context = {"route": route, "share_body": mark_safe(body)}
+        return await sync_to_async(render)(request, "tours/route_share.html", context)
+
+    response = await _conditional_route_response(request, route, build, viewer=viewer)
+    # общим кешам — только анонимная версия
+    if viewer == "anon":
+        patch_cache_control(response, public=True, max_age=settings.ROUTE_SHARE_MAX_AGE)
+    else:
+        patch_cache_control(response, private=True, max_age=settings.ROUTE_SHARE_MAX_AGE)
+    return response
 
-    context = {
-        "route": route,
-        "days": days,
-        **build_logistics_context(days),
-        **build_external_conditions_context(route=route),
-        "map_points_json": get_route_map_points_json(route),
-        "yandex_maps_api_key": settings.YANDEX_MAPS_API_KEY,
-    }
-    return render(request, "tours/route_share.html", context)
+
+@cache_control(public=True, max_age=settings.EXTERNAL_CONDITIONS_MAX_AGE)
+async def route_share_conditions(request, share_uuid):
+    route = await aget_object_or_404(Route, share_uuid=share_uuid, is_shared=True)
+    return await _conditional_route_response(
+        request,
+        route,
+        lambda: _route_conditions_response(request, route),
+        with_conditions=True,
+    )
 
 
 @staff_member_required
 def admin_stats(request):
-    now = timezone.now()
-    week_ago = now - timedelta(days=7)
-
-    total_poi = Poi.objects.count()
-    total_routes = Route.objects.count()
-    total_reviews = Review.objects.count()
-    shared_routes = Route.objects.filter(is_shared=True).count()
-
-    routes_7d = Route.objects.filter(created_at__gte=week_ago).count()
-    reviews_7d = Review.objects.filter(created_at__gte=week_ago).count()
-
-    top_poi_by_usage = (
-        RoutePoint.objects
-        .values("poi__id", "poi__name")
-        .annotate(uses=Count("id"))
-        .order_by("-uses")[:10]
-    )
-
+    # только готовые срезы: считает их команда rollup_stats
+    stats = dashboard_stats()
     top_poi_by_rating = (
         Poi.objects
         .exclude(avg_rating__isnull=True)
@@ -304,21 +476,20 @@ def admin_stats(request):
     )
 
     return render(request, "tours/admin_stats.html", {
-        "total_poi": total_poi,
-        "total_routes": total_routes,
-        "total_reviews": total_reviews,
-        "shared_routes": shared_routes,
-        "routes_7d": routes_7d,
-        "reviews_7d": reviews_7d,
-        "top_poi_by_usage": top_poi_by_usage,
+        **stats,
+        "top_poi_by_usage": top_poi_by_usage(),
+        "top_poi_by_usage_30d": top_poi_by_usage(days=stats["short_days"]),
         "top_poi_by_rating": top_poi_by_rating,
     })
 
 
 @login_required
 def history_view(request):
-    items = get_user_history(request.user)
-    return render(request, "tours/history.html", {"items": items})
+    page_obj = KeysetPaginator(get_user_history(request.user), HISTORY_KEYS, 20).page(
+        after=request.GET.get("after"), before=request.GET.get("before")
+    )
+    page_obj.total = get_user_history_count(request.user)
+    return render(request, "tours/history.html", {"items": page_obj.object_list, "page_obj": page_obj})
 
 
 @login_required
@@ -46,6 +46,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     'django_bootstrap5',
 
@@ -96,6 +97,20 @@ DATABASES = {
     }
 }
 
+# Кеш по умолчанию — свой у каждого процесса. Черновики подбора должны быть
+# видны всем воркерам и команде sweep_route_drafts, поэтому они лежат в
+# таблице БД (создаётся командой createcachetable).
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "route_drafts": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "tours_route_draft_cache",
+        "OPTIONS": {"MAX_ENTRIES": 50000},
+    },
+}
+
 
 YANDEX_MAPS_API_KEY = os.getenv("YANDEX_MAPS_API_KEY", "")
 
@@ -145,3 +160,84 @@ MEDIA_ROOT = BASE_DIR / "media"
 
 EXTERNAL_CONDITIONS_PROVIDER = os.getenv(
     "EXTERNAL_CONDITIONS_PROVIDER", "stub")
+
+# Лимиты на публичные OSRM / open-meteo / Overpass: общий token bucket в БД
+# на все воркеры. Сверх лимита провайдер сразу берёт запасной вариант.
+EXTERNAL_CONDITIONS_RATE_LIMITS = {
+    "osrm": {"rate_per_s": 1.0, "burst": 5},
+    "open_meteo": {"rate_per_s": 2.0, "burst": 10},
+    "overpass": {"rate_per_s": 0.5, "burst": 3},
+}
+
+# Переопределение адресов сервисов (например, локальная заглушка при тестах).
+EXTERNAL_CONDITIONS_BASE_URLS = {}
+
+# Режимы провайдера "record" / "replay": запись реальных ответов в фикстуры и
+# офлайн-воспроизведение с задержками (fixed / uniform / normal / lognormal, мс),
+# долей ошибок 503 и таймаутов по каждому сервису.
+EXTERNAL_CONDITIONS_REPLAY = {
+    "fixtures_dir": BASE_DIR / "fixtures" / "external_conditions",
+    "seed": None,
+    "upstreams": {
+        "osrm": {"latency_ms": {"dist": "lognormal", "median": 250, "sigma": 0.5}},
+        "open_meteo": {"latency_ms": {"dist": "lognormal", "median": 150, "sigma": 0.4}},
+        "overpass": {
+            "latency_ms": {"dist": "lognormal", "median": 900, "sigma": 0.7},
+            "error_rate": 0.05,
+            "timeout_rate": 0.02,
+        },
+    },
+}
+
+# Сколько секунд браузер / прокси может держать панель условий маршрута.
+EXTERNAL_CONDITIONS_MAX_AGE = 300
+
+# Данные страниц маршрута кешируются по ключам с Route.version и версией
+# каталога, так что таймаут нужен только чтобы вытеснять старые версии.
+ROUTE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Публичная страница маршрута: прокси может отдавать её без перепроверки
+# столько секунд, дальше — условный GET по ETag.
+ROUTE_SHARE_MAX_AGE = 60
+
+# Черновики подбора (services.route_drafts) живут в кеше до сохранения;
+# у пользователя хранится не больше ROUTE_DRAFTS_PER_USER последних.
+# Просроченные убирает команда sweep_route_drafts.
+ROUTE_DRAFT_TIMEOUT = 60 * 60 * 2
+ROUTE_DRAFTS_PER_USER = 8
+
+# Сколько вариантов маршрута предлагать за один подбор (1 — только основной).
+ROUTE_ALTERNATIVES = 4
+
+# Шаблоны подбора (services.route_templates): готовые планы по сигнатуре
+# профиля и числу дней, сбрасываются версией каталога. avg_rating (отзывы)
+# и usage_count (каждый сохранённый маршрут) меняются слишком часто, чтобы
+# поднимать версию, а в ранжировании лишь сдвигают порядок: в подбор они
+# попадают не позже этого таймаута (с ним же перестраивается снапшот движка
+# numpy). Модули, которые их меняют, ссылаются сюда.
+ROUTE_TEMPLATE_TIMEOUT = 60 * 60
+
+# purge_abandoned_routes: маршруты с автоназванием, без правок и доступа по
+# ссылке, которые не открывали ROUTE_PURGE_AFTER_DAYS дней. Просмотр
+# отмечается не чаще раза в ROUTE_VIEW_TOUCH_INTERVAL секунд.
+ROUTE_PURGE_AFTER_DAYS = 90
+ROUTE_VIEW_TOUCH_INTERVAL = 60 * 60 * 24
+
+# Движок подбора POI в build_route_for_user: "sql" (аннотации Case/When)
+# или "numpy" (колоночный снапшот каталога в памяти воркера, нужен numpy).
+ROUTE_BUILDER_ENGINE = os.getenv("ROUTE_BUILDER_ENGINE", "sql")
+
+# Как часто воркер сверяет CatalogVersion с БД (секунды).
+CATALOG_VERSION_CHECK_S = 5.0
+
+# Фасеты каталога: кеш счётчиков и списков id выдачи (сбрасывается версией
+# каталога); выдачи длиннее POI_FACETS_MAX_IDS листаются запросом к БД.
+POI_FACETS_CACHE_TIMEOUT = 3600
+POI_FACETS_MAX_IDS = 5000
+
+# История подборов: пользователю показываются последние ROUTE_HISTORY_WINDOW_DAYS
+# дней; команда route_history_retention архивирует и удаляет месяцы старше
+# ROUTE_HISTORY_RETENTION_MONTHS (на PostgreSQL — целыми секциями).
+ROUTE_HISTORY_WINDOW_DAYS = 365
+ROUTE_HISTORY_RETENTION_MONTHS = 13
+ROUTE_HISTORY_ARCHIVE_DIR = BASE_DIR / "archive" / "route_history"